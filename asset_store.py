@@ -0,0 +1,295 @@
+import argparse
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+from PIL import Image
+
+DEFAULT_STORE_PATH = 'generated_images.db'
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024  # 1 GiB
+# Reads of the image blobs go through a memory map of the database file instead of read() calls
+MMAP_SIZE = 1024 * 1024 * 1024
+# Seconds another process may hold the write lock before an insert gives up
+BUSY_TIMEOUT_MS = 30000
+# last_used is rewritten at most this often per asset, so cache hits rarely need the write lock
+TOUCH_INTERVAL = 60.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS assets (
+    key TEXT PRIMARY KEY,
+    model TEXT,
+    prompt TEXT,
+    mime_type TEXT,
+    width INTEGER,
+    height INTEGER,
+    bytes INTEGER NOT NULL,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL,
+    data BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS assets_last_used ON assets (last_used);
+"""
+
+MIME_TYPES = {'PNG': 'image/png', 'JPEG': 'image/jpeg', 'WEBP': 'image/webp', 'GIF': 'image/gif'}
+
+
+def make_cache_key(model_name, prompt, parameters=None):
+    """Hash the model name, final prompt and request parameters into a cache key"""
+    payload = json.dumps(
+        {"model": model_name, "prompt": prompt, "parameters": parameters or {}},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def describe_image(data):
+    """Return (mime type, width, height) from the image header, or Nones if it is not an image"""
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            return MIME_TYPES.get(img.format, 'application/octet-stream'), img.width, img.height
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None, None, None
+
+
+class AssetStore:
+    """Generated images and their metadata in one SQLite database, keyed by the image cache key
+
+    The generators use it as their image cache (get/put) and as the place their images are
+    kept. The database runs in WAL mode: worker threads and build processes insert
+    concurrently, each insert is one atomic transaction, and readers are never blocked by a
+    writer. With reuse=False, get() always misses so every image is generated again, but new
+    images are still stored. put() evicts the least recently used images once more than
+    max_bytes are stored (None for no limit); gc() (python asset_store.py gc) also deletes
+    by age.
+    """
+
+    def __init__(self, path=DEFAULT_STORE_PATH, reuse=True, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.reuse = reuse
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        conn = self._connection()
+        with conn:
+            conn.executescript(SCHEMA)
+
+    def _connection(self):
+        """Return this thread's connection; sqlite3 connections are not shared between threads"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False)
+            # Only takes effect on a new database, before the first table is created
+            conn.execute("PRAGMA page_size = 16384")
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+            conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+            self._local.conn = conn
+            with self._lock:
+                # Worker threads come and go with each build; close what finished threads left behind
+                for thread, old in self._connections:
+                    if not thread.is_alive():
+                        old.close()
+                self._connections = [(thread, old) for thread, old in self._connections if thread.is_alive()]
+                self._connections.append((threading.current_thread(), conn))
+        return conn
+
+    def read(self, key):
+        """Return the stored bytes for key, or None; unlike get() this ignores reuse"""
+        conn = self._connection()
+        row = conn.execute("SELECT data, last_used FROM assets WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        data, last_used = row
+        now = time.time()
+        if now - last_used >= TOUCH_INTERVAL:
+            with conn:
+                conn.execute("UPDATE assets SET last_used = ? WHERE key = ?", (now, key))
+        return data
+
+    def get(self, key):
+        """Return the cached bytes for key, or None on a miss"""
+        if not self.reuse:
+            return None
+        return self.read(key)
+
+    def contains(self, key):
+        row = self._connection().execute("SELECT 1 FROM assets WHERE key = ?", (key,)).fetchone()
+        return row is not None
+
+    def put(self, key, data, prompt=None, model=None):
+        """Store data under key with its prompt and model and evict least recently used images
+        over max_bytes; replaces an earlier image for key"""
+        data = bytes(data)
+        mime_type, width, height = describe_image(data)
+        now = time.time()
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "INSERT INTO assets (key, model, prompt, mime_type, width, height, bytes, created, last_used, data)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (key) DO UPDATE SET model = excluded.model, prompt = excluded.prompt,"
+                " mime_type = excluded.mime_type, width = excluded.width, height = excluded.height,"
+                " bytes = excluded.bytes, last_used = excluded.last_used, data = excluded.data",
+                (key, model, prompt, mime_type, width, height, len(data), now, now, data))
+            if self.max_bytes is not None:
+                # Evicted pages are reused by later inserts, so there is nothing to vacuum here
+                self._evict(conn, self.max_bytes, keep=key)
+
+    @staticmethod
+    def _evict(conn, max_bytes, keep=None):
+        """Delete the least recently used assets other than keep until at most max_bytes remain;
+        runs inside the caller's write transaction and returns (assets deleted, bytes freed)"""
+        total = conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM assets").fetchone()[0]
+        if total <= max_bytes:
+            return 0, 0
+        doomed = []
+        freed = 0
+        for key, size in conn.execute("SELECT key, bytes FROM assets ORDER BY last_used").fetchall():
+            if total <= max_bytes:
+                break
+            if key == keep:
+                continue
+            doomed.append((key,))
+            total -= size
+            freed += size
+        conn.executemany("DELETE FROM assets WHERE key = ?", doomed)
+        return len(doomed), freed
+
+    def find(self, prefix):
+        """Return the keys starting with prefix"""
+        rows = self._connection().execute(
+            "SELECT key FROM assets WHERE substr(key, 1, ?) = ? ORDER BY key", (len(prefix), prefix))
+        return [key for key, in rows]
+
+    def entries(self, limit=None):
+        """Metadata of the most recently used assets (without their bytes)"""
+        query = ("SELECT key, model, prompt, mime_type, width, height, bytes, created, last_used"
+                 " FROM assets ORDER BY last_used DESC")
+        params = ()
+        if limit:
+            query += " LIMIT ?"
+            params = (limit,)
+        columns = ('key', 'model', 'prompt', 'mime_type', 'width', 'height', 'bytes', 'created', 'last_used')
+        return [dict(zip(columns, row)) for row in self._connection().execute(query, params)]
+
+    def stats(self):
+        conn = self._connection()
+        count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM assets").fetchone()
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        file_bytes = sum(os.path.getsize(path) for path in (self.path, f"{self.path}-wal") if os.path.exists(path))
+        return {"assets": count, "bytes": total, "file_bytes": file_bytes, "free_bytes": free_pages * page_size}
+
+    def gc(self, unused_for=None, max_bytes=None):
+        """Delete assets unused for unused_for seconds, then the least recently used ones
+        until at most max_bytes remain; returns (assets deleted, bytes freed)"""
+        conn = self._connection()
+        deleted = freed = 0
+        with conn:
+            # Take the write lock first so builds inserting meanwhile wait instead of racing the sums
+            conn.execute("BEGIN IMMEDIATE")
+            if unused_for is not None:
+                cutoff = time.time() - unused_for
+                count, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM assets"
+                                           " WHERE last_used < ?", (cutoff,)).fetchone()
+                conn.execute("DELETE FROM assets WHERE last_used < ?", (cutoff,))
+                deleted, freed = deleted + count, freed + size
+            if max_bytes is not None:
+                count, size = self._evict(conn, max_bytes)
+                deleted, freed = deleted + count, freed + size
+        # Hand the freed pages back to the file system without rewriting the whole database
+        # executescript steps the pragma to completion; execute() would free a single page
+        conn.executescript("PRAGMA incremental_vacuum;")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return deleted, freed
+
+    def compact(self):
+        """Rewrite the database without free space or fragmentation; waits for other writers"""
+        conn = self._connection()
+        conn.execute("VACUUM")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def close(self):
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for _, conn in connections:
+            conn.close()
+        self._local = threading.local()
+
+
+def _size(value):
+    return f"{value / 1e6:.1f} MB"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect and clean up the generated image store.")
+    parser.add_argument('--store', default=DEFAULT_STORE_PATH, help="database file")
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('stats', help="number of images and space used")
+    list_parser = commands.add_parser('list', help="most recently used images")
+    list_parser.add_argument('--limit', type=int, default=20)
+    export_parser = commands.add_parser('export', help="write one image to a file")
+    export_parser.add_argument('key', help="asset key or a unique prefix of it")
+    export_parser.add_argument('path', nargs='?', default=None, help="output file (default: <key prefix>.<ext>)")
+    gc_parser = commands.add_parser('gc', help="delete images that were not used recently")
+    gc_parser.add_argument('--unused-days', type=float, default=None, help="delete images unused for this long")
+    gc_parser.add_argument('--max-mb', type=float, default=None, help="then delete the least recently used "
+                                                                      "images until at most this much remains")
+    commands.add_parser('compact', help="rewrite the database to reclaim all free space")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.store):
+        print(f"Error: {args.store} not found.")
+        return
+    store = AssetStore(args.store)
+    if args.command == 'stats':
+        stats = store.stats()
+        print(f"📦 {args.store}: {stats['assets']} images, {_size(stats['bytes'])} of image data, "
+              f"{_size(stats['file_bytes'])} on disk ({_size(stats['free_bytes'])} free)")
+    elif args.command == 'list':
+        for entry in store.entries(args.limit):
+            used = datetime.fromtimestamp(entry['last_used']).strftime('%Y-%m-%d %H:%M')
+            print(f"{entry['key'][:12]}  {used}  {entry['bytes'] // 1024:>6} KB  {entry['width']}x{entry['height']}  "
+                  f"{entry['model']}  {(entry['prompt'] or '')[:50]}")
+    elif args.command == 'export':
+        keys = store.find(args.key)
+        if not keys:
+            print(f"Error: no image matches {args.key!r}.")
+            return
+        if len(keys) > 1:
+            print(f"Error: {len(keys)} images match {args.key!r}; give a longer prefix.")
+            return
+        data = store.read(keys[0])
+        mime_type = describe_image(data)[0] or ''
+        path = args.path or f"{keys[0][:12]}.{'jpg' if mime_type == 'image/jpeg' else 'png'}"
+        with open(path, 'wb') as f:
+            f.write(data)
+        print(f"✅ {keys[0][:12]} written to {path}")
+    elif args.command == 'gc':
+        if args.unused_days is None and args.max_mb is None:
+            print("Error: give --unused-days and/or --max-mb.")
+            return
+        deleted, freed = store.gc(args.unused_days * 86400 if args.unused_days is not None else None,
+                                  int(args.max_mb * 1e6) if args.max_mb is not None else None)
+        print(f"🧹 Deleted {deleted} images, freed {_size(freed)}")
+    elif args.command == 'compact':
+        before = store.stats()['file_bytes']
+        store.compact()
+        print(f"🗜️  {args.store}: {_size(before)} -> {_size(store.stats()['file_bytes'])}")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import http_client
+from key_pool import load_key_pool
+
+
+def deck_file_name(name, used, fallback):
+    """Return name as a file name that stays inside the output directory and is not in used yet
+
+    Path separators and other unsafe characters become underscores, so "../x" and "/abs/x"
+    cannot escape the directory; a repeated name gets a _2, _3... suffix instead of
+    overwriting the earlier deck and its log.
+    """
+    base = re.sub(r'[^\w.-]+', '_', str(name)).strip('._') or fallback
+    candidate = base
+    suffix = 2
+    # Compared case-insensitively, as the output directory may be on such a file system
+    while candidate.lower() in used:
+        candidate = f"{base}_{suffix}"
+        suffix += 1
+    used.add(candidate.lower())
+    if candidate != name:
+        print(f"⚠️  Deck {name!r} is written as {candidate!r}")
+    return candidate
+
+
+def iter_decks(source):
+    """Yield (name, slides) for every deck in a directory of JSON files or a JSONL stream"""
+    used = set()
+    if os.path.isdir(source):
+        for filename in sorted(os.listdir(source)):
+            if filename.endswith('.json'):
+                name = os.path.splitext(filename)[0]
+                yield deck_file_name(name, used, name), {"json_file": os.path.join(source, filename)}
+        return
+
+    stream = sys.stdin if source == '-' else open(source, 'r', encoding='utf-8')
+    try:
+        for line_number, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            deck = json.loads(line)
+            fallback = f"deck_{line_number}"
+            if isinstance(deck, list):
+                yield deck_file_name(fallback, used, fallback), {"slides": deck}
+            else:
+                yield deck_file_name(deck.get('name', fallback), used, fallback), {"slides": deck['slides']}
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def build_deck(name, source, output_dir, options):
+    """Build one deck in a worker process, logging its output to <output_dir>/<name>.log"""
+    # Imported here so the parent process does not pay for python-pptx
+    import generate_ppt_with_images_rest as generator
+
+    start = time.perf_counter()
+    log_path = os.path.join(output_dir, f"{name}.log")
+    result = {"name": name, "output_file": None, "error": None, "log": log_path}
+    with open(log_path, 'w', encoding='utf-8') as log, contextlib.redirect_stdout(log):
+        try:
+            result['output_file'] = generator.create_presentation(
+                output_file_base=os.path.join(output_dir, name), **source, **options)
+            if result['output_file'] is None:
+                result['error'] = "no slides loaded"
+        except Exception as e:
+            result['error'] = f"{type(e).__name__}: {e}"
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+
+def run_batch(source, output_dir='decks', workers=None, image_concurrency=8, **options):
+    """Build every deck from source in a process pool sharing one image request budget"""
+    os.makedirs(output_dir, exist_ok=True)
+    if options.get('generate_images', True) and 'api_key' not in options:
+        # Each process gets an equal share of every key's requests-per-minute budget
+        keys = load_key_pool()
+        if keys:
+            options['api_key'] = keys.split(workers or os.cpu_count() or 1)
+    context = multiprocessing.get_context()
+    # One semaphore for all workers keeps the total number of in-flight API calls bounded
+    request_limiter = context.BoundedSemaphore(image_concurrency)
+    results = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=http_client.set_request_limiter,
+                             initargs=(request_limiter,)) as pool:
+        futures = [pool.submit(build_deck, name, deck_source, output_dir, options)
+                   for name, deck_source in iter_decks(source)]
+        for future in as_completed(futures):
+            result = future.result()
+            status = "✅" if not result['error'] else f"❌ {result['error']}"
+            print(f"{status} {result['name']} ({result['seconds']:.1f}s)")
+            results.append(result)
+
+    elapsed = time.perf_counter() - start
+    results.sort(key=lambda r: r['name'])
+    failed = [r for r in results if r['error']]
+    print(f"\n📊 Built {len(results) - len(failed)}/{len(results)} decks in {elapsed:.1f}s")
+    print(f"{'Deck':<40} {'Seconds':>8}  Result")
+    for result in results:
+        print(f"{result['name'][:40]:<40} {result['seconds']:>8.1f}  {result['error'] or result['output_file']}")
+    return {"elapsed": elapsed, "decks": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build many decks in parallel with the REST image generator.")
+    parser.add_argument('source', help="directory of slide JSON files, a JSONL file of decks, or - for stdin")
+    parser.add_argument('--output-dir', default='decks')
+    parser.add_argument('--workers', type=int, default=None, help="deck processes (default: CPU count)")
+    parser.add_argument('--image-concurrency', type=int, default=8,
+                        help="maximum image requests in flight across all decks")
+    parser.add_argument('--summary', help="write the per-deck summary as JSON to this file")
+    parser.add_argument('--no-images', action='store_true', help="build text-only decks with placeholders")
+    parser.add_argument('--resume', action='store_true', help="reuse images checkpointed by an interrupted batch")
+    args = parser.parse_args()
+
+    summary = run_batch(args.source, args.output_dir, args.workers, args.image_concurrency,
+                        generate_images=not args.no_images, max_workers=args.image_concurrency,
+                        resume=args.resume)
+    if args.summary:
+        with open(args.summary, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+    sys.exit(1 if any(r['error'] for r in summary['decks']) else 0)
+
+
+if __name__ == "__main__":
+    main()
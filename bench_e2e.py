@@ -0,0 +1,213 @@
+import argparse
+import glob
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+import zipfile
+
+from bench_render import make_slides
+from stub_server import StubConfig, parse_size, start_stub_server
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# name -> (module, extra create_presentation keyword arguments)
+GENERATORS = {
+    'rest': ('generate_ppt_with_images_rest', {}),
+    'imagen-sdk': ('generate_ppt_with_images', {}),
+    'gemini-image': ('generate_ppt', {}),
+}
+
+IMAGE_METHODS = ('predict', 'generateContent', 'streamGenerateContent')
+
+# Runs in a fresh interpreter per deck so peak RSS is that deck's alone
+BUILD_SCRIPT = """
+import importlib, json, sys
+sys.path.insert(0, sys.argv[1])
+module = importlib.import_module(sys.argv[2])
+module.create_presentation(json_file=sys.argv[3], output_file_base=sys.argv[4], use_cache=False, **json.loads(sys.argv[5]))
+"""
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p * len(values)))]
+
+
+def count_pictures(pptx_file):
+    """Number of pictures on the deck's slides; placeholders are shapes, not pictures"""
+    with zipfile.ZipFile(pptx_file) as deck:
+        return sum(deck.read(name).count(b'<p:pic>') for name in deck.namelist()
+                   if name.startswith('ppt/slides/slide') and name.endswith('.xml'))
+
+
+def count_image_prompts(json_file):
+    with open(json_file, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    slides = data['slides'] if isinstance(data, dict) else data
+    return sum(1 for slide_data in slides if slide_data.get('image_prompt'))
+
+
+def fetch_stats(base_url):
+    with urllib.request.urlopen(f"{base_url}/stats") as response:
+        return json.load(response)['requests']
+
+
+def reset_stats(base_url):
+    request = urllib.request.Request(f"{base_url}/stats/reset", data=b'', method='POST')
+    urllib.request.urlopen(request).close()
+
+
+def build_deck(module, options, json_file, output_base, work_dir, env, log_file):
+    """Build one deck in a child process; returns (exit code, seconds, peak RSS in MiB, pptx path)"""
+    start = time.perf_counter()
+    with open(log_file, 'w', encoding='utf-8') as log:
+        process = subprocess.Popen(
+            [sys.executable, '-c', BUILD_SCRIPT, REPO_DIR, module, json_file, output_base, json.dumps(options)],
+            cwd=work_dir, env=env, stdout=log, stderr=subprocess.STDOUT)
+        _, status, rusage = os.wait4(process.pid, 0)
+        process.returncode = os.waitstatus_to_exitcode(status)
+    seconds = time.perf_counter() - start
+    outputs = sorted(glob.glob(f"{output_base}_*.pptx"), key=os.path.getmtime)
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak_mib = rusage.ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+    return process.returncode, seconds, peak_mib, outputs[-1] if outputs else None
+
+
+def bench_generator(name, base_url, json_file, decks, work_dir, extra_options=None):
+    module, options = GENERATORS[name]
+    options = dict(options, **(extra_options or {}))
+    env = dict(os.environ, GEMINI_API_BASE_URL=base_url, PYTHONUNBUFFERED='1')
+    reset_stats(base_url)
+
+    results = []
+    start = time.perf_counter()
+    for deck in range(decks):
+        output_base = os.path.join(work_dir, f"{name}_{deck+1}")
+        log_file = f"{output_base}.log"
+        code, seconds, peak_mib, output_file = build_deck(module, options, json_file, output_base, work_dir, env, log_file)
+        if code != 0 or not output_file:
+            print(f"  ❌ {name} deck {deck+1} failed (exit {code}), see {log_file}")
+        results.append({
+            "seconds": seconds, "peak_rss_mib": peak_mib, "exit_code": code,
+            "file_bytes": os.path.getsize(output_file) if output_file else None,
+            "pictures": count_pictures(output_file) if output_file else 0,
+        })
+    elapsed = time.perf_counter() - start
+
+    requests = [r for r in fetch_stats(base_url) if r['method'] in IMAGE_METHODS]
+    latencies = [r['latency'] for r in requests if r['status'] == 200]
+    built = [r for r in results if r['file_bytes']]
+    pictures = sum(r['pictures'] for r in built)
+    expected = count_image_prompts(json_file) * len(built)
+    # A generator that fell back to placeholders (e.g. an SDK without the image API) builds
+    # fast decks without asking for a single image; its timings measure nothing
+    error = None
+    if expected and not pictures:
+        error = "no images embedded, every slide got a placeholder"
+        print(f"  ❌ {name}: {error}; its numbers are not comparable (see the logs)")
+    return {
+        "generator": name,
+        "decks": decks,
+        "failed_decks": decks - len(built),
+        "decks_per_min": len(built) / elapsed * 60 if elapsed else 0.0,
+        "deck_seconds_p50": percentile([r['seconds'] for r in results], 0.5),
+        "image_requests": len(requests),
+        "image_errors": sum(1 for r in requests if r['status'] != 200),
+        "images_returned": sum(r['images'] for r in requests),
+        "image_latency_p50": percentile(latencies, 0.5),
+        "image_latency_p99": percentile(latencies, 0.99),
+        "peak_rss_mib": max(r['peak_rss_mib'] for r in results),
+        "file_mib": max(r['file_bytes'] for r in built) / (1024 * 1024) if built else None,
+        "pictures": pictures,
+        "expected_pictures": expected,
+        "valid": error is None,
+        "error": error,
+    }
+
+
+def print_table(rows):
+    def fmt(value, spec, unit, width):
+        return (format(value, spec) + unit if value is not None else '-').rjust(width)
+
+    print(f"\n{'Generator':<14} {'Decks/min':>9} {'Deck p50':>9} {'Img req':>7} {'Err':>4} "
+          f"{'Img p50':>8} {'Img p99':>8} {'Peak RSS':>9} {'File':>9} {'Pictures':>9}  Status")
+    for row in rows:
+        pictures = f"{row['pictures']}/{row['expected_pictures']}"
+        print(f"{row['generator']:<14} {row['decks_per_min']:>9.2f} {fmt(row['deck_seconds_p50'], '.2f', 's', 9)} "
+              f"{row['image_requests']:>7} {row['image_errors']:>4} "
+              f"{fmt(row['image_latency_p50'], '.2f', 's', 8)} {fmt(row['image_latency_p99'], '.2f', 's', 8)} "
+              f"{fmt(row['peak_rss_mib'], '.0f', 'MiB', 9)} {fmt(row['file_mib'], '.1f', 'MiB', 9)} "
+              f"{pictures:>9}  {'ok' if row['valid'] else 'INVALID'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build decks against the local stub API and compare the generators end to end.")
+    parser.add_argument('--generators', nargs='+', choices=sorted(GENERATORS),
+                        help="generators to compare (default: all); a named generator that makes no images fails the run")
+    parser.add_argument('--decks', type=int, default=3, help="decks built per generator, one after another")
+    parser.add_argument('--slides', type=int, default=10, help="synthetic slides per deck (ignored with --json)")
+    parser.add_argument('--json', help="slides JSON to build instead of synthetic slides")
+    parser.add_argument('--base-url', help="use an already running stub_server.py instead of starting one")
+    parser.add_argument('--latency', default='lognormal:1.5,0.4', help="stub latency distribution, see stub_server.py")
+    parser.add_argument('--rate-429', type=float, default=0.0)
+    parser.add_argument('--rate-5xx', type=float, default=0.0)
+    parser.add_argument('--image-size', type=parse_size, default=(1408, 768))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--stream-output', action='store_true', help="build with the streaming .pptx writer")
+    parser.add_argument('--keep', action='store_true', help="keep the work directory with decks and logs")
+    parser.add_argument('--summary', help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.base_url
+    if not base_url:
+        config = StubConfig(latency=args.latency, rate_429=args.rate_429, rate_5xx=args.rate_5xx,
+                            image_size=args.image_size, seed=args.seed)
+        server = start_stub_server(config)
+        base_url = server.base_url
+    print(f"🧪 Stub API at {base_url}")
+
+    work_dir = tempfile.mkdtemp(prefix='bench_e2e_')
+    with open(os.path.join(work_dir, '.env'), 'w', encoding='utf-8') as f:
+        f.write('stub-api-key\n')
+    json_file = os.path.abspath(args.json) if args.json else os.path.join(work_dir, 'slides.json')
+    if not args.json:
+        with open(json_file, 'w', encoding='utf-8') as f:
+            json.dump(make_slides(args.slides), f, ensure_ascii=False)
+
+    rows = []
+    extra_options = {'stream_output': True} if args.stream_output else None
+    try:
+        for name in args.generators or GENERATORS:
+            print(f"▶️  {name}: {args.decks} deck(s)")
+            rows.append(bench_generator(name, base_url, json_file, args.decks, work_dir, extra_options))
+    finally:
+        if server:
+            server.shutdown()
+        if args.keep:
+            print(f"📁 Decks and logs kept in {work_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    print_table(rows)
+    if args.summary:
+        with open(args.summary, 'w', encoding='utf-8') as f:
+            json.dump(rows, f, indent=2)
+    invalid = [row['generator'] for row in rows if not row['valid']]
+    if invalid and not args.generators:
+        # The default run includes generators the installed SDKs may not support (imagen-sdk)
+        print(f"\n⚠️  No images from {', '.join(invalid)}; name a generator with --generators to fail on this")
+        invalid = []
+    sys.exit(1 if invalid else 0)
+
+
+if __name__ == "__main__":
+    main()
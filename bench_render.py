@@ -0,0 +1,60 @@
+import argparse
+import io
+import time
+
+import generate_ppt_simple
+
+
+def make_slides(count):
+    """Synthetic deck mixing Korean and English bullets of varying length"""
+    slides = []
+    for i in range(count):
+        slides.append({
+            "title": f"{i+1}. 슬라이드 제목 (Slide Title {i+1})",
+            "content": [f"핵심 내용 {j+1}: key point number {j+1} for slide {i+1}" for j in range(3 + i % 4)],
+            "image_prompt": f"Landscape flashcard background for topic {i+1}, soft gradient, rounded corners",
+        })
+    return slides
+
+
+def render_legacy(slides, fit_text):
+    return generate_ppt_simple.build_presentation(slides, use_templates=False, fit_text=fit_text)
+
+
+def render_template(slides, fit_text):
+    return generate_ppt_simple.build_presentation(slides, use_templates=True, fit_text=fit_text)
+
+
+def bench(name, render, slides, repeat, fit_text):
+    best_render = best_total = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        prs = render(slides, fit_text)
+        rendered = time.perf_counter()
+        prs.save(io.BytesIO())
+        saved = time.perf_counter()
+        best_render = min(best_render or float('inf'), rendered - start)
+        best_total = min(best_total or float('inf'), saved - start)
+    print(f"{name:<11} {'on' if fit_text else 'off':>4} {len(slides):>7} {len(slides) / best_render:>15.0f} "
+          f"{len(slides) / best_total:>20.0f}")
+    return best_render
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare slides/second of the python-pptx and template renderers.")
+    parser.add_argument('--slides', type=int, nargs='+', default=[100, 1000, 3000])
+    parser.add_argument('--repeat', type=int, default=3, help="runs per size; the best is reported")
+    args = parser.parse_args()
+
+    print(f"{'Renderer':<11} {'Fit':>4} {'Slides':>7} {'Render slides/s':>15} {'Render+save slides/s':>20}")
+    for count in args.slides:
+        slides = make_slides(count)
+        # Fitting is the generators' default; without it shows what the renderers alone cost
+        for fit_text in (True, False):
+            legacy = bench("python-pptx", render_legacy, slides, args.repeat, fit_text)
+            template = bench("template", render_template, slides, args.repeat, fit_text)
+            print(f"{'':<11} {'':>4} {'':>7} speedup x{legacy / template:.1f}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import threading
+import time
+
+FAILURE_THRESHOLD = 5    # consecutive failures that open the circuit
+RESET_TIMEOUT = 30.0     # seconds before an open circuit lets a probe through
+MAX_RESET_TIMEOUT = 300.0
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+class CircuitOpenError(Exception):
+    """The backend's circuit is open, so the call was not made"""
+
+
+class CircuitBreaker:
+    """Stop calling a backend that keeps failing, and probe it now and then to see if it is back
+
+    Closed: calls go through and consecutive failures are counted. After failure_threshold
+    of them the circuit opens and calls fail fast. After reset_timeout one probe call is let
+    through (half-open) while other callers keep failing fast; its success closes the
+    circuit, its failure reopens it for twice as long, up to MAX_RESET_TIMEOUT. A call that
+    says nothing about the backend's health (record_neutral) hands the probe to the next
+    caller. Thread-safe; see get_breaker for the shared instances.
+    """
+
+    def __init__(self, name, failure_threshold=FAILURE_THRESHOLD, reset_timeout=RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.base_reset_timeout = reset_timeout
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_started = None
+        # Set while open, so callers sleeping between retries can give up at once
+        self.opened = threading.Event()
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Return True if a call may go out now
+
+        While a probe is out, other callers are refused at once, as if the circuit were still
+        open, so an outage costs them no more than building without images.
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            now = time.monotonic()
+            if self.state == OPEN:
+                if now - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = HALF_OPEN
+                self.probe_started = now
+                print(f"  🔌 {self.name}: probing after {self.reset_timeout:.0f}s")
+                return True
+            # A probe that was neutral or never reported back (e.g. abandoned at a deadline) is replaced
+            if self.probe_started is None or now - self.probe_started >= self.reset_timeout:
+                self.probe_started = now
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != CLOSED:
+                print(f"  ✅ {self.name}: backend is back, circuit closed")
+            self.state = CLOSED
+            self.failures = 0
+            self.reset_timeout = self.base_reset_timeout
+            self.opened.clear()
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN:
+                self.reset_timeout = min(MAX_RESET_TIMEOUT, self.reset_timeout * 2)
+            elif self.state == OPEN or self.failures < self.failure_threshold:
+                return
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+            self.opened.set()
+            print(f"  ⚡ {self.name}: circuit open after {self.failures} consecutive failures, "
+                  f"failing fast for {self.reset_timeout:.0f}s")
+
+    def record_neutral(self):
+        """Report a call that neither succeeded nor failed on the backend's account, such as a
+        429 or a timeout the caller's own deadline cut short; failures keep counting"""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self.probe_started = None
+
+    def sleep(self, seconds):
+        """Sleep between retries, waking early if the circuit opens meanwhile"""
+        self.opened.wait(seconds)
+
+
+def get_breaker(name):
+    """Return the process-wide breaker for a backend, so concurrent builds share what they learn"""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(name)
+        return breaker
@@ -0,0 +1,22 @@
+import threading
+
+import pytest
+
+from stub_server import StubConfig, StubServer
+
+# The test_*.py scripts below call the live Gemini API with the key in .env; run them by hand
+collect_ignore = ['test_api.py', 'test_image_gen.py', 'test_imagen_call.py', 'test_imagen_rest.py']
+
+
+@pytest.fixture
+def stub(monkeypatch, tmp_path):
+    """Local stub API for the REST generator, with the test running in tmp_path so its files land there"""
+    import generate_ppt_with_images_rest as generator
+
+    server = StubServer(('127.0.0.1', 0), StubConfig(image_size=(320, 180), seed=1))
+    threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+    monkeypatch.setattr(generator, 'API_BASE_URL', server.base_url)
+    monkeypatch.chdir(tmp_path)
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,74 @@
+import hashlib
+import json
+import os
+
+from pptx.enum.shapes import MSO_SHAPE_TYPE
+
+MANIFEST_VERSION = 1
+
+
+def manifest_path(output_file_base):
+    return f"{output_file_base}.manifest.json"
+
+
+def _hash(value):
+    payload = json.dumps(value, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def slide_hash(slide_data):
+    """Hash the parts of a slide that affect its rendering"""
+    return _hash({
+        "title": slide_data.get('title', 'No Title'),
+        "content": slide_data.get('content', ''),
+        "image_prompt": slide_data.get('image_prompt', ''),
+    })
+
+
+def image_hash(slide_data):
+    return _hash(slide_data.get('image_prompt', ''))
+
+
+def load_manifest(output_file_base):
+    """Return the manifest of the previous build, or None if there is no usable one"""
+    try:
+        with open(manifest_path(output_file_base), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if manifest.get('version') != MANIFEST_VERSION or not os.path.exists(manifest.get('output_file', '')):
+        return None
+    return manifest
+
+
+def save_manifest(output_file_base, output_file, slide_entries):
+    path = manifest_path(output_file_base)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({"version": MANIFEST_VERSION, "output_file": output_file, "slides": slide_entries},
+                  f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def find_picture(slide):
+    for shape in slide.shapes:
+        if shape.shape_type == MSO_SHAPE_TYPE.PICTURE:
+            return shape
+    return None
+
+
+def clear_slide(slide):
+    """Remove every shape from a slide, dropping relationships to images no longer referenced"""
+    for shape in list(slide.shapes):
+        rId = shape._element.blip_rId if shape.shape_type == MSO_SHAPE_TYPE.PICTURE else None
+        shape._element.getparent().remove(shape._element)
+        if rId:
+            slide.part.drop_rel(rId)
+
+
+def truncate_slides(prs, count):
+    """Delete slides past the first count"""
+    sld_id_lst = prs.slides._sldIdLst
+    for sld_id in list(sld_id_lst)[count:]:
+        prs.part.drop_rel(sld_id.rId)
+        sld_id_lst.remove(sld_id)
@@ -0,0 +1,328 @@
+import argparse
+import json
+import os
+import queue
+import re
+import socketserver
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from pptx import Presentation
+from pptx.util import Inches
+
+import generate_ppt_with_images_rest as generator
+from asset_store import AssetStore
+from image_optimize import make_pool
+from image_score import MAX_CANDIDATES
+
+PPTX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.presentationml.presentation'
+# create_presentation options a request may set, with what each accepts; everything else is fixed by the server
+JOB_OPTIONS = {
+    'generate_images': ('a boolean', lambda value: isinstance(value, bool)),
+    'streaming': ('a boolean', lambda value: isinstance(value, bool)),
+    'stream_output': ('a boolean', lambda value: isinstance(value, bool)),
+    'batch_size': ('a positive integer', lambda value: _is_int(value) and value >= 1),
+    'max_in_flight': ('a positive integer', lambda value: _is_int(value) and value >= 1),
+    'deadline': ('a positive number of seconds or null',
+                 lambda value: value is None or (_is_number(value) and value > 0)),
+    'candidates': (f"an integer from 1 to {MAX_CANDIDATES}",
+                   lambda value: _is_int(value) and 1 <= value <= MAX_CANDIDATES),
+    'image_dpi': ('a positive integer or null', lambda value: value is None or (_is_int(value) and value >= 1)),
+    'output_mime_type': ('"image/png", "image/jpeg" or null',
+                         lambda value: value in (None, 'image/png', 'image/jpeg')),
+}
+# Reports create_presentation writes next to a job's deck, removed along with it
+JOB_REPORTS = ('.deadline.json', '.candidates.json')
+JOB_PATH = re.compile(r'^/jobs/(?P<job_id>[0-9a-f]{32})(?P<pptx>/pptx)?$')
+
+
+def _is_int(value):
+    # bool is an int subclass, but true is not a batch size
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+class TemplatePool:
+    """Fresh 16:9 presentations parsed ahead of time, so a job never waits for Presentation()"""
+
+    def __init__(self, spares=2):
+        self._ready = queue.Queue(maxsize=spares)
+        threading.Thread(target=self._fill, name='template-pool', daemon=True).start()
+
+    def _fill(self):
+        while True:
+            prs = Presentation()
+            prs.slide_width = Inches(13.333)
+            prs.slide_height = Inches(7.5)
+            self._ready.put(prs)
+
+    def take(self):
+        return self._ready.get()
+
+
+class Job:
+    def __init__(self, slides, options):
+        self.id = uuid.uuid4().hex
+        self.slides = slides
+        self.options = options
+        self.status = 'queued'
+        self.slides_done = 0
+        self.slides_total = len(slides)
+        self.output_base = None
+        self.output_file = None
+        self.error = None
+        self.created = time.time()
+        self.seconds = None
+        self.done = threading.Event()
+
+    def to_dict(self):
+        return {
+            "job_id": self.id, "status": self.status, "slides_done": self.slides_done,
+            "slides_total": self.slides_total, "error": self.error, "seconds": self.seconds,
+        }
+
+
+class DeckService:
+    """Builds decks on a warm generator: API key, HTTP session, image cache, templates and the
+    image optimizer's process pool stay loaded"""
+
+    def __init__(self, work_dir='.deck_server', max_jobs=2, keep_jobs=100, generate_images=True, max_workers=4):
+        self.work_dir = work_dir
+        os.makedirs(work_dir, exist_ok=True)
+        self.keep_jobs = keep_jobs
+        self.max_workers = max_workers
+        self.api_key = generator.get_api_key() if generate_images else None
+        self.cache = AssetStore()
+        self.templates = TemplatePool()
+        # Shared by every job asking for image_dpi; workers start on first use
+        self.image_pool = make_pool()
+        self.jobs = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_jobs, thread_name_prefix='deck-job')
+
+    def submit(self, slides, options):
+        job = Job(slides, options)
+        job.output_base = os.path.join(self.work_dir, job.id)
+        with self._lock:
+            self.jobs[job.id] = job
+            self._evict()
+        self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def delete(self, job_id):
+        with self._lock:
+            job = self.jobs.pop(job_id, None)
+        if job:
+            self._remove_output(job)
+        return job
+
+    def _evict(self):
+        finished = [job for job in self.jobs.values() if job.done.is_set()]
+        for job in sorted(finished, key=lambda job: job.created)[:max(0, len(self.jobs) - self.keep_jobs)]:
+            del self.jobs[job.id]
+            self._remove_output(job)
+
+    @staticmethod
+    def _remove_output(job):
+        for path in [job.output_file] + [job.output_base + suffix for suffix in JOB_REPORTS]:
+            if not path:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _run(self, job):
+        job.status = 'running'
+        start = time.perf_counter()
+
+        def progress(slides_done, total):
+            job.slides_done = slides_done
+
+        options = dict(job.options)
+        if not self.api_key:
+            options['generate_images'] = False
+        try:
+            job.output_file = generator.create_presentation(
+                slides=job.slides, output_file_base=job.output_base,
+                save_images=False, max_workers=self.max_workers, api_key=self.api_key, cache=self.cache,
+                prs=self.templates.take(), image_pool=self.image_pool, progress=progress, **options)
+            job.status = 'done' if job.output_file else 'failed'
+        except Exception as e:
+            job.error = f"{type(e).__name__}: {e}"
+            job.status = 'failed'
+        job.slides = None
+        job.seconds = round(time.perf_counter() - start, 3)
+        job.done.set()
+
+
+def check_slide(slide, number):
+    """Raise ValueError unless slide has the shape the generator lays out"""
+    if not isinstance(slide, dict):
+        raise ValueError(f"slide {number}: expected an object")
+    for field in ('title', 'image_prompt'):
+        if not isinstance(slide.get(field, ''), str):
+            raise ValueError(f"slide {number}: {field} must be a string")
+    content = slide.get('content', '')
+    if not (isinstance(content, str) or (isinstance(content, list) and all(isinstance(item, str) for item in content))):
+        raise ValueError(f"slide {number}: content must be a string or a list of strings")
+
+
+def parse_deck_request(body):
+    """Return (slides, options) from a slide list or {"slides": [...], <option>: ...}
+
+    Raises ValueError (sent back as 400) for anything the build would trip over.
+    """
+    data = json.loads(body)
+    if isinstance(data, list):
+        slides, options = data, {}
+    elif isinstance(data, dict) and isinstance(data.get('slides'), list):
+        slides = data['slides']
+        options = {key: value for key, value in data.items() if key not in ('slides', 'name')}
+    else:
+        raise ValueError('expected a list of slides or an object with a "slides" list')
+    unknown = set(options) - set(JOB_OPTIONS)
+    if unknown:
+        raise ValueError(f"unsupported options: {', '.join(sorted(unknown))}")
+    for key, value in options.items():
+        expected, accepts = JOB_OPTIONS[key]
+        if not accepts(value):
+            raise ValueError(f"{key} must be {expected}")
+    for number, slide in enumerate(slides, start=1):
+        check_slide(slide, number)
+    return slides, options
+
+
+class DeckHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'DeckServer/1.0'
+
+    def address_string(self):
+        # Unix socket clients have no address
+        return self.client_address[0] if self.client_address else 'unix'
+
+    def _send(self, status, body, content_type='application/json', headers=None):
+        if not isinstance(body, bytes):
+            body = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_pptx(self, job):
+        with open(job.output_file, 'rb') as f:
+            data = f.read()
+        self._send(200, data, PPTX_CONTENT_TYPE,
+                   {'Content-Disposition': f'attachment; filename="{os.path.basename(job.output_file)}"',
+                    'X-Job-Id': job.id})
+
+    def do_GET(self):
+        service = self.server.service
+        path = urlparse(self.path).path
+        if path == '/health':
+            with service._lock:
+                counts = {}
+                for job in service.jobs.values():
+                    counts[job.status] = counts.get(job.status, 0) + 1
+            self._send(200, {"status": "ok", "jobs": counts, "images": bool(service.api_key)})
+            return
+        match = JOB_PATH.match(path)
+        job = service.get(match.group('job_id')) if match else None
+        if not job:
+            self._send(404, {"error": "no such job"})
+        elif not match.group('pptx'):
+            self._send(200, job.to_dict())
+        elif job.status != 'done':
+            self._send(409, job.to_dict())
+        else:
+            self._send_pptx(job)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != '/decks':
+            self._send(404, {"error": "not found"})
+            return
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        try:
+            slides, options = parse_deck_request(body)
+        except ValueError as e:
+            self._send(400, {"error": str(e)})
+            return
+
+        job = self.server.service.submit(slides, options)
+        if parse_qs(url.query).get('wait', ['0'])[0] in ('1', 'true'):
+            job.done.wait()
+            if job.status == 'done':
+                self._send_pptx(job)
+            else:
+                self._send(500, job.to_dict())
+        else:
+            self._send(202, job.to_dict(), headers={'Location': f"/jobs/{job.id}"})
+
+    def do_DELETE(self):
+        match = JOB_PATH.match(urlparse(self.path).path)
+        job = self.server.service.delete(match.group('job_id')) if match else None
+        self._send(200 if job else 404, job.to_dict() if job else {"error": "no such job"})
+
+
+class DeckServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, service):
+        super().__init__(address, DeckHandler)
+        self.service = service
+
+
+class UnixDeckServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path, service):
+        if os.path.exists(path):
+            os.remove(path)
+        super().__init__(path, DeckHandler)
+        self.service = service
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve deck builds over HTTP with warm clients, caches and templates.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8800)
+    parser.add_argument('--unix-socket', help="listen on this Unix socket instead of TCP")
+    parser.add_argument('--work-dir', default='.deck_server', help="where finished decks are kept until fetched")
+    parser.add_argument('--jobs', type=int, default=2, help="decks built at the same time")
+    parser.add_argument('--image-workers', type=int, default=4, help="image requests in flight per deck")
+    parser.add_argument('--no-images', action='store_true', help="always build text-only decks with placeholders")
+    args = parser.parse_args()
+
+    service = DeckService(args.work_dir, max_jobs=args.jobs, generate_images=not args.no_images,
+                          max_workers=args.image_workers)
+    if args.unix_socket:
+        server = UnixDeckServer(args.unix_socket, service)
+        where = f"unix:{args.unix_socket}"
+    else:
+        server = DeckServer((args.host, args.port), service)
+        where = f"http://{args.host}:{server.server_address[1]}"
+    print(f"🖥️  Deck server on {where} (images {'on' if service.api_key else 'off'})")
+    print("   POST /decks[?wait=1]  GET /jobs/<id>  GET /jobs/<id>/pptx  DELETE /jobs/<id>  GET /health")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
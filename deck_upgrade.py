@@ -0,0 +1,163 @@
+import argparse
+import io
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from pptx import Presentation
+
+import generate_ppt_with_images_rest as generator
+from asset_store import AssetStore
+from deck_manifest import find_picture
+from http_client import CallStats
+from image_optimize import ImageOptimizer
+from run_journal import atomic_write
+
+# The draft pass uses generator.IMAGEN_MODEL (fast); the upgrade pass uses the standard model
+UPGRADE_MODEL = "imagen-4.0-generate-001"
+PROMPT_PREFIX = "Image Prompt: "
+
+
+def slide_prompt(slide):
+    """Return the image prompt recorded in the slide's notes, or None"""
+    if not slide.has_notes_slide:
+        return None
+    text = slide.notes_slide.notes_text_frame.text
+    if not text.startswith(PROMPT_PREFIX):
+        return None
+    return text[len(PROMPT_PREFIX):].strip() or None
+
+
+def swap_picture(slide, picture, image_stream):
+    """Show image_stream in picture's frame; the old image is dropped once no slide uses it"""
+    old_rId = picture._element.blip_rId
+    _, rId = slide.part.get_or_add_image_part(image_stream)
+    if rId != old_rId:
+        picture._element.blipFill.blip.rEmbed = rId
+        slide.part.drop_rel(old_rId)
+
+
+def save_deck(prs, path):
+    """Replace path atomically, so a reader sees either the previous deck or the new one"""
+    buffer = io.BytesIO()
+    prs.save(buffer)
+    atomic_write(path, buffer.getbuffer())
+
+
+def parse_slide_numbers(value):
+    """Parse '1,3,5-8' into a set of 1-based slide numbers"""
+    numbers = set()
+    for part in value.split(','):
+        first, _, last = part.strip().partition('-')
+        numbers.update(range(int(first), int(last or first) + 1))
+    return numbers
+
+
+def upgrade_presentation(pptx_file, slide_numbers=None, model_name=UPGRADE_MODEL, max_workers=4,
+                         api_key=None, use_cache=True, save_every=None, image_dpi=None, output_mime_type=None):
+    """Regenerate the pictures of a finished deck with model_name and update the file in place
+
+    Prompts are read back from the "Image Prompt:" notes, so no slides.json is needed.
+    Only slides in slide_numbers (1-based) are upgraded when it is given; slides showing a
+    placeholder are left alone. Each new image is swapped into the existing picture, keeping
+    its position and size. The deck is saved after every save_every upgraded slides and at
+    the end. Returns the number of slides upgraded.
+
+    image_dpi and output_mime_type should match the draft build, so the upgraded images are
+    downscaled and recompressed the same way instead of embedded at full resolution.
+    """
+    api_key = api_key or generator.get_api_key()
+    if not api_key:
+        print("Error: no API key found, nothing to upgrade.")
+        return 0
+
+    prs = Presentation(pptx_file)
+    targets = []
+    for number, slide in enumerate(prs.slides, start=1):
+        if slide_numbers and number not in slide_numbers:
+            continue
+        picture = find_picture(slide)
+        prompt = slide_prompt(slide)
+        if picture is not None and prompt:
+            targets.append((number, slide, picture, prompt))
+    if not targets:
+        print(f"No pictures to upgrade in {pptx_file}")
+        return 0
+
+    print(f"⬆️  Upgrading {len(targets)} pictures in {pptx_file} with {model_name}...")
+    cache = AssetStore(reuse=use_cache)
+    stats = CallStats()
+    optimizer = ImageOptimizer(generator.IMAGE_FRAME_WIDTH, image_dpi) if image_dpi else None
+    start = time.perf_counter()
+    upgraded = 0
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = {}
+        for number, slide, picture, prompt in targets:
+            generate = generator.generate_image_with_imagen
+            if optimizer:
+                generate = optimizer.wrap(generate, f"Slide {number}")
+            future = executor.submit(generate, prompt, None, api_key, cache, stats, f"Slide {number}",
+                                     model_name=model_name, output_mime_type=output_mime_type)
+            futures[future] = (number, slide, picture)
+        # Pictures are swapped on this thread only; python-pptx objects are not thread-safe
+        for future in as_completed(futures):
+            number, slide, picture = futures[future]
+            image_stream = future.result()
+            if image_stream is None:
+                print(f"  ⚠️  Slide {number}: keeping the draft image")
+                continue
+            swap_picture(slide, picture, image_stream)
+            upgraded += 1
+            print(f"  ✅ Slide {number} upgraded")
+            if save_every and upgraded % save_every == 0 and upgraded < len(targets):
+                save_deck(prs, pptx_file)
+
+    if upgraded:
+        save_deck(prs, pptx_file)
+    stats.print_summary()
+    if optimizer:
+        optimizer.close()
+        optimizer.print_summary()
+    print(f"\n✅ Upgraded {upgraded} of {len(targets)} pictures in {time.perf_counter() - start:.1f}s")
+    return upgraded
+
+
+def start_background_upgrade(pptx_file, model_name=UPGRADE_MODEL, slide_numbers=None, image_dpi=None,
+                             output_mime_type=None):
+    """Run the upgrade pass in a detached process logging to <deck>.upgrade.log; returns the log path"""
+    log_path = f"{os.path.splitext(pptx_file)[0]}.upgrade.log"
+    command = [sys.executable, os.path.abspath(__file__), pptx_file, '--model', model_name]
+    if slide_numbers:
+        command += ['--slides', ','.join(str(number) for number in sorted(slide_numbers))]
+    if image_dpi:
+        command += ['--image-dpi', str(image_dpi)]
+    if output_mime_type:
+        command += ['--api-mime-type', output_mime_type]
+    with open(log_path, 'w', encoding='utf-8') as log:
+        subprocess.Popen(command, stdout=log, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL,
+                         start_new_session=True)
+    return log_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Regenerate a deck's pictures with a higher quality model, in place.")
+    parser.add_argument('pptx_file')
+    parser.add_argument('--model', default=UPGRADE_MODEL, help="Imagen model for the upgraded pictures")
+    parser.add_argument('--slides', type=parse_slide_numbers, default=None,
+                        help="slide numbers to upgrade, e.g. 1,3,5-8 (default: all)")
+    parser.add_argument('--workers', type=int, default=4, help="image requests in flight")
+    parser.add_argument('--save-every', type=int, default=None,
+                        help="also save the deck after every N upgraded pictures")
+    parser.add_argument('--image-dpi', type=int, default=None,
+                        help="downscale and recompress the new images to their frame size at this DPI")
+    parser.add_argument('--api-mime-type', choices=['image/png', 'image/jpeg'], default=None,
+                        help="image format to ask the API for, where it supports outputOptions")
+    args = parser.parse_args()
+    upgrade_presentation(args.pptx_file, args.slides, args.model, args.workers, save_every=args.save_every,
+                         image_dpi=args.image_dpi, output_mime_type=args.api_mime_type)
+
+
+if __name__ == "__main__":
+    main()
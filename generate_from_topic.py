@@ -0,0 +1,232 @@
+import argparse
+import json
+import re
+import time
+
+import generate_ppt_with_images_rest as generator
+from circuit_breaker import get_breaker
+from http_client import CallStats, post_with_retry
+from image_score import MAX_CANDIDATES
+from run_journal import atomic_write
+
+TEXT_MODEL = "gemini-2.5-flash"
+DEFAULT_SLIDE_COUNT = 5
+# The figure style create_academic_ppt.md asks for
+IMAGE_STYLE = "academic figure, IEEE/CVPR paper style, schematic diagram, clean lines, white background"
+SLIDE_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {
+            "title": {"type": "STRING"},
+            "content": {"type": "ARRAY", "items": {"type": "STRING"}},
+            "image_prompt": {"type": "STRING"},
+        },
+        "required": ["title", "content", "image_prompt"],
+        "propertyOrdering": ["title", "content", "image_prompt"],
+    },
+}
+
+# Characters that can open or close an object, outside or inside a JSON string
+_STRUCTURE = re.compile(r'[{}"\\]')
+
+
+def stream_url(model_name):
+    return f"{generator.API_BASE_URL}/v1beta/models/{model_name}:streamGenerateContent"
+
+
+def build_request(topic, slide_count, style=IMAGE_STYLE, language=None):
+    """Request body asking for the deck as a JSON array of slides, written slide by slide"""
+    prompt = (
+        f"Write a presentation about: {topic}\n"
+        f"Return exactly {slide_count} slides as a JSON array. Each slide has a professional 'title', "
+        f"'content' as a list of short bullet points, and an 'image_prompt' describing one picture "
+        f"for the slide in detail, in this style: {style}."
+    )
+    if language:
+        prompt += f"\nWrite the titles and bullet points in {language}; keep the image prompts in English."
+    return {
+        "contents": [{"role": "user", "parts": [{"text": prompt}]}],
+        "generationConfig": {"responseMimeType": "application/json", "responseSchema": SLIDE_SCHEMA},
+    }
+
+
+class SlideStreamParser:
+    """Pick complete top-level JSON objects out of text that arrives in arbitrary pieces
+
+    Anything outside an object (the enclosing array, commas, a markdown fence) is skipped,
+    so each slide is available as soon as its closing brace arrives.
+    """
+
+    def __init__(self):
+        self.pieces = []
+        self.depth = 0
+        self.in_string = False
+        # A backslash ended the previous piece, so this piece's first character is escaped
+        self.escaped = False
+
+    def feed(self, text):
+        """Return the text of every object completed by this piece"""
+        objects = []
+        start = 0
+        skip = 1 if self.escaped else 0
+        self.escaped = False
+        for match in _STRUCTURE.finditer(text, skip):
+            pos = match.start()
+            if pos < skip:
+                continue
+            char = match.group()
+            if self.in_string:
+                if char == '\\':
+                    skip = pos + 2
+                    self.escaped = skip > len(text)
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = self.depth > 0
+            elif char == '{':
+                if self.depth == 0:
+                    start = pos
+                self.depth += 1
+            elif char == '}' and self.depth:
+                self.depth -= 1
+                if self.depth == 0:
+                    self.pieces.append(text[start:pos + 1])
+                    objects.append(''.join(self.pieces))
+                    self.pieces = []
+        if self.depth:
+            self.pieces.append(text[start:])
+        return objects
+
+    @property
+    def incomplete(self):
+        return self.depth > 0
+
+
+def validate_slide(slide):
+    """Return the slide with its fields checked and trimmed; raises ValueError naming the problem"""
+    if not isinstance(slide, dict):
+        raise ValueError("not a JSON object")
+    title = slide.get('title')
+    if not isinstance(title, str) or not title.strip():
+        raise ValueError("missing title")
+    content = slide.get('content', '')
+    if isinstance(content, list):
+        if not all(isinstance(item, str) for item in content):
+            raise ValueError("content items must be strings")
+        content = [item.strip() for item in content if item.strip()]
+    elif isinstance(content, str):
+        content = content.strip()
+    else:
+        raise ValueError("content must be a string or a list of strings")
+    image_prompt = slide.get('image_prompt', '')
+    if not isinstance(image_prompt, str):
+        raise ValueError("image_prompt must be a string")
+    return {"title": title.strip(), "content": content, "image_prompt": image_prompt.strip()}
+
+
+def iter_event_text(response):
+    """Yield the text of each server-sent event of a streamGenerateContent?alt=sse response"""
+    with response:
+        for line in response.iter_lines():
+            if not line.startswith(b'data:'):
+                continue
+            event = json.loads(line[5:])
+            if 'error' in event:
+                raise RuntimeError(event['error'].get('message', 'error in response stream'))
+            block_reason = (event.get('promptFeedback') or {}).get('blockReason')
+            if block_reason:
+                raise RuntimeError(f"prompt blocked: {block_reason}")
+            for candidate in event.get('candidates') or []:
+                for part in (candidate.get('content') or {}).get('parts') or []:
+                    if 'text' in part:
+                        yield part['text']
+
+
+def stream_slides(topic, api_key, slide_count=DEFAULT_SLIDE_COUNT, model_name=TEXT_MODEL, style=IMAGE_STYLE,
+                  language=None, stats=None, received=None):
+    """Yield validated slides for topic as the text model finishes writing each one
+
+    Slides that fail validation are reported and skipped. If the stream breaks off, the
+    slides received so far are kept and the deck ends there. Every slide yielded is also
+    appended to received when it is given.
+    """
+    url = stream_url(model_name) + "?alt=sse"
+    print(f"📝 Writing {slide_count} slides about '{topic}' with {model_name}...")
+    start = time.perf_counter()
+    parser = SlideStreamParser()
+    count = 0
+    try:
+        response = post_with_retry(url, build_request(topic, slide_count, style, language), api_key, stats=stats,
+                                   label='Slide text', stream=True, breaker=get_breaker(model_name))
+        if response.status_code != 200:
+            print(f"  ❌ API Error: {response.status_code} - {response.text[:200]}")
+            return
+        for text in iter_event_text(response):
+            for source in parser.feed(text):
+                try:
+                    slide = validate_slide(json.loads(source))
+                except ValueError as e:
+                    print(f"  ⚠️  Skipping a malformed slide from the text model: {e}")
+                    continue
+                count += 1
+                print(f"  📝 Slide {count} written after {time.perf_counter() - start:.1f}s: {slide['title'][:50]}")
+                if received is not None:
+                    received.append(slide)
+                yield slide
+    except Exception as e:
+        print(f"  ❌ Slide text stream failed after {count} slides: {e}")
+        return
+    if parser.incomplete:
+        print(f"  ⚠️  Text stream ended inside slide {count + 1}; it is left out")
+    print(f"📝 {count} slides written in {time.perf_counter() - start:.1f}s")
+
+
+def create_from_topic(topic, output_file_base='nano_banana_presentation', slide_count=DEFAULT_SLIDE_COUNT,
+                      model_name=TEXT_MODEL, style=IMAGE_STYLE, language=None, **options):
+    """Write the slides for topic and build the deck in one pass; returns the output file name
+
+    Each slide is laid out and its image requested as soon as the text model finishes it,
+    so images for the first slides are generated while later slides are still being
+    written. The slides are also saved to <output_file_base>.slides.json, which the other
+    generators (and --resume) take as input. options are passed on to create_presentation.
+    """
+    api_key = generator.get_api_key()
+    if not api_key:
+        print("Error: no API key found, cannot write the slides.")
+        return None
+    stats = CallStats()
+    received = []
+    slides = stream_slides(topic, api_key, slide_count, model_name, style, language, stats, received)
+    output_file = generator.create_presentation(output_file_base=output_file_base, slides=slides, api_key=api_key,
+                                                **options)
+    stats.print_summary()
+    if received:
+        slides_file = f"{output_file_base}.slides.json"
+        atomic_write(slides_file, json.dumps(received, ensure_ascii=False, indent=2).encode('utf-8'))
+        print(f"📝 Slides saved to {slides_file}")
+    return output_file
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Write slides for a topic with Gemini and build the deck while they stream in.")
+    parser.add_argument('topic')
+    parser.add_argument('--slides', type=int, default=DEFAULT_SLIDE_COUNT, help="number of slides to write")
+    parser.add_argument('--output', default='nano_banana_presentation', help="output file name prefix")
+    parser.add_argument('--model', default=TEXT_MODEL, help="Gemini text model that writes the slides")
+    parser.add_argument('--style', default=IMAGE_STYLE, help="picture style the image prompts ask for")
+    parser.add_argument('--language', default=None, help="language of the slide text, e.g. Korean")
+    parser.add_argument('--candidates', type=int, default=1, choices=range(1, MAX_CANDIDATES + 1), metavar='N',
+                        help="images to request per slide; the one leaving the most room for text is used")
+    parser.add_argument('--deadline', type=float, default=None,
+                        help="time budget in seconds for the images; missing ones become placeholders")
+    parser.add_argument('--image-dpi', type=int, default=None,
+                        help="downscale and recompress images to their frame size at this DPI (e.g. 150)")
+    args = parser.parse_args()
+    create_from_topic(args.topic, args.output, args.slides, args.model, args.style, args.language,
+                      candidates=args.candidates, deadline=args.deadline, image_dpi=args.image_dpi)
+
+
+if __name__ == "__main__":
+    main()
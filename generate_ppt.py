@@ -1,10 +1,18 @@
+import io
 import json
 import os
 import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
 from pptx import Presentation
 from pptx.util import Inches, Pt
 from pptx.enum.text import PP_ALIGN
 from pptx.dml.color import RGBColor
+from asset_store import AssetStore, make_cache_key
+from concurrent.futures import ThreadPoolExecutor
+from slide_pipeline import SlidePipeline
+from pptx_stream import StreamingPptxWriter
+from circuit_breaker import CircuitOpenError, get_breaker
+import text_fit
 
 def get_api_key():
     try:
@@ -14,32 +22,68 @@ def get_api_key():
         print("Error: .env file not found.")
         return None
 
-def generate_image(prompt, output_path, api_key):
-    try:
+# Point at a local stub (see stub_server.py) by setting GEMINI_API_BASE_URL
+API_BASE_URL = os.environ.get('GEMINI_API_BASE_URL')
+
+# Server errors (including timeouts) and network errors mean the backend is down, not the request bad
+OUTAGE_ERRORS = (google_exceptions.ServerError, OSError)
+
+def configure_genai(api_key):
+    if API_BASE_URL:
+        # Only the REST transport can talk to a plain-HTTP endpoint
+        genai.configure(api_key=api_key, transport="rest",
+                        client_options={"api_endpoint": API_BASE_URL.rstrip('/')})
+    else:
         genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-3-pro-image-preview')
+
+IMAGE_MODEL = 'gemini-3-pro-image-preview'
+
+def generate_image(prompt, api_key, store=None):
+    """Return the image bytes for prompt (None on failure), reusing and keeping images in store"""
+    try:
+        cache_key = make_cache_key(IMAGE_MODEL, prompt)
+        if store:
+            image_data = store.get(cache_key)
+            if image_data:
+                print(f"Reusing cached image for prompt: {prompt[:30]}...")
+                return image_data
+
+        breaker = get_breaker(IMAGE_MODEL)
+        if not breaker.allow():
+            raise CircuitOpenError(f"{IMAGE_MODEL} is failing, not calling it")
+
+        configure_genai(api_key)
+        model = genai.GenerativeModel(IMAGE_MODEL)
         
         print(f"Requesting image for prompt: {prompt[:30]}...")
-        response = model.generate_content(prompt)
+        try:
+            response = model.generate_content(prompt)
+        except OUTAGE_ERRORS:
+            breaker.record_failure()
+            raise
+        breaker.record_success()
         
         if response.parts:
             for part in response.parts:
                 if hasattr(part, 'inline_data') and part.inline_data:
                     # Found image data
-                    with open(output_path, 'wb') as f:
-                        f.write(part.inline_data.data)
-                    return True
+                    if store:
+                        store.put(cache_key, part.inline_data.data, prompt=prompt, model=IMAGE_MODEL)
+                    return part.inline_data.data
         
         print("No image found in response.")
-        return False
+        return None
             
+    except CircuitOpenError:
+        print(f"  ⚡ Image backend unavailable, using a placeholder: {prompt[:30]}...")
+        return None
     except Exception as e:
         print(f"Failed to generate image for prompt: {prompt[:30]}... Error: {e}")
-        return False
+        return None
 
 from datetime import datetime
 
-def create_presentation(json_file='slides.json', output_file_base='nano_banana_presentation'):
+def create_presentation(json_file='slides.json', output_file_base='nano_banana_presentation', use_cache=True, max_workers=4, stream_output=False, fit_text=True):
     api_key = get_api_key()
     if not api_key:
         print("Skipping image generation due to missing API key.")
@@ -63,14 +107,65 @@ def create_presentation(json_file='slides.json', output_file_base='nano_banana_p
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     output_file = f"{output_file_base}_{timestamp}.pptx"
 
+    # Images are kept in the asset store; use_cache decides whether earlier ones are reused
+    store = AssetStore(reuse=use_cache) if api_key else None
+
     prs = Presentation()
     # Set slide dimensions to 16:9 aspect ratio
     prs.slide_width = Inches(13.333)
     prs.slide_height = Inches(7.5)
+    # Write each slide into the file as soon as it is finished instead of holding all of them
+    writer = StreamingPptxWriter(prs, output_file) if stream_output else None
 
-    # Create images directory if it doesn't exist
-    if not os.path.exists('generated_images'):
-        os.makedirs('generated_images')
+    # Send every slide's image request up front so they run while the slides are laid out
+    executor = None
+    image_futures = {}
+    if api_key:
+        executor = ThreadPoolExecutor(max_workers=max(1, max_workers))
+        for i, slide_data in enumerate(slides_data):
+            img_prompt = slide_data.get('image_prompt', '')
+            if img_prompt:
+                print(f"Generating image for slide {i+1}...")
+                image_futures[i] = executor.submit(generate_image, img_prompt, api_key, store)
+
+    def finish_slide(i, image_data):
+        slide, img_prompt = waiting_slides.pop(i)
+        
+        if image_data:
+            img_left = Inches(7.0)
+            img_top = Inches(1.5)
+            img_width = Inches(5.8)
+            # Add image
+            slide.shapes.add_picture(io.BytesIO(image_data), img_left, img_top, width=img_width)
+        else:
+            # Placeholder if no image
+            placeholder_left = Inches(7.0)
+            placeholder_top = Inches(1.5)
+            placeholder_width = Inches(5.8)
+            placeholder_height = Inches(4.0)
+            
+            shape = slide.shapes.add_shape(
+                1, # msoShapeRectangle
+                placeholder_left, placeholder_top, placeholder_width, placeholder_height
+            )
+            # Make it look like a placeholder (light gray fill, border)
+            shape.fill.solid()
+            shape.fill.fore_color.rgb = RGBColor(238, 238, 238) # Light gray (0xEEEEEE)
+            shape.line.color.rgb = RGBColor(136, 136, 136) # Darker gray border (0x888888)
+            
+            # Add text to the placeholder
+            p_tf = shape.text_frame
+            p_tf.text = f"Image Placeholder\n\nPrompt:\n{img_prompt}" if img_prompt else "No Image Prompt"
+            p_tf.paragraphs[0].alignment = PP_ALIGN.CENTER
+            p_tf.paragraphs[0].font.bold = True
+
+        if writer:
+            writer.write_slide(slide, i)
+
+    waiting_slides = {}
+    pipeline = SlidePipeline(finish_slide)
+    # Title and content font sizes for every slide, fitted in one pass
+    font_sizes = text_fit.fit_deck(slides_data) if fit_text else None
 
     for i, slide_data in enumerate(slides_data):
         # Use a blank layout for custom positioning
@@ -86,8 +181,11 @@ def create_presentation(json_file='slides.json', output_file_base='nano_banana_p
         title_box = slide.shapes.add_textbox(title_left, title_top, title_width, title_height)
         title_tf = title_box.text_frame
         title_tf.text = slide_data.get('title', 'No Title')
-        title_tf.paragraphs[0].font.size = Pt(40)
+        title_size, content_size = font_sizes[i] if font_sizes else (40, 20)
+        title_tf.paragraphs[0].font.size = Pt(title_size)
         title_tf.paragraphs[0].font.bold = True
+        if font_sizes:
+            title_tf.word_wrap = True
 
         # Content (Text) - Left side
         left = Inches(0.5)
@@ -111,51 +209,27 @@ def create_presentation(json_file='slides.json', output_file_base='nano_banana_p
         
         # Adjust font size for content
         for paragraph in tf.paragraphs:
-            paragraph.font.size = Pt(20)
+            paragraph.font.size = Pt(content_size)
 
-        # Image - Right side
-        img_prompt = slide_data.get('image_prompt', '')
-        img_filename = f"generated_images/slide_{i+1}.png"
-        
-        image_generated = False
-        if api_key and img_prompt:
-            print(f"Generating image for slide {i+1}...")
-            image_generated = generate_image(img_prompt, img_filename, api_key)
-        
-        if image_generated and os.path.exists(img_filename):
-            img_left = Inches(7.0)
-            img_top = Inches(1.5)
-            img_width = Inches(5.8)
-            # Add image
-            slide.shapes.add_picture(img_filename, img_left, img_top, width=img_width)
-        else:
-            # Placeholder if no image
-            placeholder_left = Inches(7.0)
-            placeholder_top = Inches(1.5)
-            placeholder_width = Inches(5.8)
-            placeholder_height = Inches(4.0)
-            
-            shape = slide.shapes.add_shape(
-                1, # msoShapeRectangle
-                placeholder_left, placeholder_top, placeholder_width, placeholder_height
-            )
-            # Make it look like a placeholder (light gray fill, border)
-            shape.fill.solid()
-            shape.fill.fore_color.rgb = RGBColor(238, 238, 238) # Light gray (0xEEEEEE)
-            shape.line.color.rgb = RGBColor(136, 136, 136) # Darker gray border (0x888888)
-            
-            # Add text to the placeholder
-            p_tf = shape.text_frame
-            p_tf.text = f"Image Placeholder\n\nPrompt:\n{img_prompt}" if img_prompt else "No Image Prompt"
-            p_tf.paragraphs[0].alignment = PP_ALIGN.CENTER
-            p_tf.paragraphs[0].font.bold = True
-        
         # Add notes
+        img_prompt = slide_data.get('image_prompt', '')
         notes_slide = slide.notes_slide
         text_frame = notes_slide.notes_text_frame
         text_frame.text = f"Image Prompt: {img_prompt}"
 
-    prs.save(output_file)
+        # Image - Right side, inserted once its request completes
+        waiting_slides[i] = (slide, img_prompt)
+        pipeline.add(i, image_futures.pop(i, None))
+        pipeline.poll()
+
+    pipeline.wait_all()
+    if executor:
+        executor.shutdown()
+
+    if writer:
+        writer.close()
+    else:
+        prs.save(output_file)
     print(f"Presentation saved to {output_file}")
 
 if __name__ == "__main__":
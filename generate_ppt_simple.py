@@ -1,3 +1,4 @@
+import functools
 import json
 import os
 from pptx import Presentation
@@ -5,8 +6,118 @@ from pptx.util import Inches, Pt
 from pptx.enum.text import PP_ALIGN
 from pptx.dml.color import RGBColor
 from datetime import datetime
+from template_render import SlideTemplate
+import text_fit
 
-def create_presentation(json_file='slides.json', output_file_base='nano_banana_presentation', skip_images=True):
+def slide_texts(slide_data):
+    """Return the title, content, placeholder and notes text for a slide"""
+    # Handle content as either string or list
+    content = slide_data.get('content', '')
+    if isinstance(content, list):
+        # Convert list to bullet points
+        content_text = '\n'.join([f"• {item}" for item in content])
+    else:
+        content_text = content
+
+    img_prompt = slide_data.get('image_prompt', '')
+    placeholder_text = f"Image Placeholder\n\nPrompt:\n{img_prompt}" if img_prompt else "No Image Prompt"
+    notes_text = f"Image Prompt: {img_prompt}"
+    return slide_data.get('title', 'No Title'), content_text, placeholder_text, notes_text
+
+def render_slide(slide, slide_data, font_sizes=None):
+    """Lay out one slide; font_sizes is a fitted (title, content) pair in points"""
+    title_text, content_text, placeholder_text, notes_text = slide_texts(slide_data)
+    title_size, content_size = font_sizes or (40, 20)
+
+    # Title
+    title_left = Inches(0.5)
+    title_top = Inches(0.3)
+    title_width = Inches(12)
+    title_height = Inches(1.0)
+    
+    title_box = slide.shapes.add_textbox(title_left, title_top, title_width, title_height)
+    title_tf = title_box.text_frame
+    title_tf.text = title_text
+    title_tf.paragraphs[0].font.size = Pt(title_size)
+    title_tf.paragraphs[0].font.bold = True
+    if font_sizes:
+        # A fitted title may need a second line
+        title_tf.word_wrap = True
+
+    # Content (Text) - Left side
+    left = Inches(0.5)
+    top = Inches(1.5)
+    width = Inches(6.0)
+    height = Inches(5.0)
+    
+    txBox = slide.shapes.add_textbox(left, top, width, height)
+    tf = txBox.text_frame
+    tf.text = content_text
+    tf.word_wrap = True
+    
+    # Adjust font size for content
+    for paragraph in tf.paragraphs:
+        paragraph.font.size = Pt(content_size)
+
+    # Image placeholder - Right side
+    # Always create placeholder for now
+    placeholder_left = Inches(7.0)
+    placeholder_top = Inches(1.5)
+    placeholder_width = Inches(5.8)
+    placeholder_height = Inches(4.0)
+    
+    shape = slide.shapes.add_shape(
+        1, # msoShapeRectangle
+        placeholder_left, placeholder_top, placeholder_width, placeholder_height
+    )
+    # Make it look like a placeholder (light gray fill, border)
+    shape.fill.solid()
+    shape.fill.fore_color.rgb = RGBColor(238, 238, 238) # Light gray (0xEEEEEE)
+    shape.line.color.rgb = RGBColor(136, 136, 136) # Darker gray border (0x888888)
+    
+    # Add text to the placeholder
+    p_tf = shape.text_frame
+    p_tf.text = placeholder_text
+    p_tf.paragraphs[0].alignment = PP_ALIGN.CENTER
+    p_tf.paragraphs[0].font.bold = True
+    p_tf.paragraphs[0].font.size = Pt(14)
+    
+    # Add notes
+    notes_slide = slide.notes_slide
+    text_frame = notes_slide.notes_text_frame
+    text_frame.text = notes_text
+
+def build_presentation(slides_data, use_templates=True, fit_text=True):
+    """Lay out every slide of slides_data in a new 16:9 presentation and return it"""
+    prs = Presentation()
+    # Set slide dimensions to 16:9 aspect ratio
+    prs.slide_width = Inches(13.333)
+    prs.slide_height = Inches(7.5)
+
+    # Title and content font sizes for every slide, fitted in one pass
+    font_sizes = text_fit.fit_deck(slides_data) if fit_text else None
+
+    # Build the slide XML once and clone it per slide instead of re-rendering every shape
+    template = None
+    if use_templates:
+        # With fitting, the prototype gets the wrapping title; each clone then gets its own sizes
+        prototype_sizes = (text_fit.TITLE_BOX.max_size, text_fit.CONTENT_BOX.max_size) if fit_text else None
+        template = SlideTemplate(functools.partial(render_slide, font_sizes=prototype_sizes), slide_texts)
+
+    for i, slide_data in enumerate(slides_data):
+        if template:
+            # The image placeholder keeps its fixed size
+            template.add_slide(prs, slide_data, font_sizes[i] + (None,) if font_sizes else None)
+            continue
+
+        # Use a blank layout for custom positioning
+        slide_layout = prs.slide_layouts[6] 
+        slide = prs.slides.add_slide(slide_layout)
+        render_slide(slide, slide_data, font_sizes[i] if font_sizes else None)
+    return prs
+
+def create_presentation(json_file='slides.json', output_file_base='nano_banana_presentation', skip_images=True, use_templates=True,
+                        fit_text=True):
     try:
         with open(json_file, 'r', encoding='utf-8') as f:
             data = json.load(f)
@@ -26,82 +137,7 @@ def create_presentation(json_file='slides.json', output_file_base='nano_banana_p
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     output_file = f"{output_file_base}_{timestamp}.pptx"
 
-    prs = Presentation()
-    # Set slide dimensions to 16:9 aspect ratio
-    prs.slide_width = Inches(13.333)
-    prs.slide_height = Inches(7.5)
-
-    for i, slide_data in enumerate(slides_data):
-        # Use a blank layout for custom positioning
-        slide_layout = prs.slide_layouts[6] 
-        slide = prs.slides.add_slide(slide_layout)
-
-        # Title
-        title_left = Inches(0.5)
-        title_top = Inches(0.3)
-        title_width = Inches(12)
-        title_height = Inches(1.0)
-        
-        title_box = slide.shapes.add_textbox(title_left, title_top, title_width, title_height)
-        title_tf = title_box.text_frame
-        title_tf.text = slide_data.get('title', 'No Title')
-        title_tf.paragraphs[0].font.size = Pt(40)
-        title_tf.paragraphs[0].font.bold = True
-
-        # Content (Text) - Left side
-        left = Inches(0.5)
-        top = Inches(1.5)
-        width = Inches(6.0)
-        height = Inches(5.0)
-        
-        txBox = slide.shapes.add_textbox(left, top, width, height)
-        tf = txBox.text_frame
-        
-        # Handle content as either string or list
-        content = slide_data.get('content', '')
-        if isinstance(content, list):
-            # Convert list to bullet points
-            content_text = '\n'.join([f"• {item}" for item in content])
-        else:
-            content_text = content
-            
-        tf.text = content_text
-        tf.word_wrap = True
-        
-        # Adjust font size for content
-        for paragraph in tf.paragraphs:
-            paragraph.font.size = Pt(20)
-
-        # Image placeholder - Right side
-        img_prompt = slide_data.get('image_prompt', '')
-        
-        # Always create placeholder for now
-        placeholder_left = Inches(7.0)
-        placeholder_top = Inches(1.5)
-        placeholder_width = Inches(5.8)
-        placeholder_height = Inches(4.0)
-        
-        shape = slide.shapes.add_shape(
-            1, # msoShapeRectangle
-            placeholder_left, placeholder_top, placeholder_width, placeholder_height
-        )
-        # Make it look like a placeholder (light gray fill, border)
-        shape.fill.solid()
-        shape.fill.fore_color.rgb = RGBColor(238, 238, 238) # Light gray (0xEEEEEE)
-        shape.line.color.rgb = RGBColor(136, 136, 136) # Darker gray border (0x888888)
-        
-        # Add text to the placeholder
-        p_tf = shape.text_frame
-        p_tf.text = f"Image Placeholder\n\nPrompt:\n{img_prompt}" if img_prompt else "No Image Prompt"
-        p_tf.paragraphs[0].alignment = PP_ALIGN.CENTER
-        p_tf.paragraphs[0].font.bold = True
-        p_tf.paragraphs[0].font.size = Pt(14)
-        
-        # Add notes
-        notes_slide = slide.notes_slide
-        text_frame = notes_slide.notes_text_frame
-        text_frame.text = f"Image Prompt: {img_prompt}"
-
+    prs = build_presentation(slides_data, use_templates, fit_text)
     prs.save(output_file)
     print(f"✅ Presentation saved to {output_file}")
     print(f"📊 Created {len(slides_data)} slides")
@@ -1,12 +1,20 @@
+import io
 import json
 import os
 import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
 from pptx import Presentation
 from pptx.util import Inches, Pt
 from pptx.enum.text import PP_ALIGN
 from pptx.dml.color import RGBColor
 from datetime import datetime
 import base64
+from concurrent.futures import ThreadPoolExecutor
+from slide_pipeline import SlidePipeline
+from pptx_stream import StreamingPptxWriter
+from circuit_breaker import CircuitOpenError, get_breaker
+import text_fit
+from asset_store import AssetStore, make_cache_key
 
 def get_api_key():
     try:
@@ -19,41 +27,79 @@ def get_api_key():
         print("Error: .env file not found.")
         return None
 
-def generate_image_with_imagen(prompt, output_path, api_key):
-    """Generate image using Imagen 4.0 API"""
-    try:
+# Point at a local stub (see stub_server.py) by setting GEMINI_API_BASE_URL
+API_BASE_URL = os.environ.get('GEMINI_API_BASE_URL')
+
+# Server errors (including timeouts) and network errors mean the backend is down, not the request bad
+OUTAGE_ERRORS = (google_exceptions.ServerError, OSError)
+
+def configure_genai(api_key):
+    if API_BASE_URL:
+        # Only the REST transport can talk to a plain-HTTP endpoint
+        genai.configure(api_key=api_key, transport="rest",
+                        client_options={"api_endpoint": API_BASE_URL.rstrip('/')})
+    else:
         genai.configure(api_key=api_key)
+
+# Use Imagen 4.0 Fast model for faster generation
+IMAGEN_MODEL = "imagen-4.0-fast-generate-001"
+IMAGEN_PARAMETERS = {
+    "number_of_images": 1,
+    "aspect_ratio": "16:9",  # Good for presentations
+    "safety_filter_level": "block_some",
+    "person_generation": "allow_adult"
+}
+
+def generate_image_with_imagen(prompt, api_key, store=None):
+    """Generate image using Imagen 4.0 API
+
+    Returns the image bytes, or None on failure. Images are reused from and kept in store.
+    """
+    try:
+        cache_key = make_cache_key(IMAGEN_MODEL, prompt, IMAGEN_PARAMETERS)
+        if store:
+            image_data = store.get(cache_key)
+            if image_data:
+                print(f"  ♻️  Cached image reused for: {prompt[:50]}...")
+                return image_data
+
+        breaker = get_breaker(IMAGEN_MODEL)
+        if not breaker.allow():
+            raise CircuitOpenError(f"{IMAGEN_MODEL} is failing, not calling it")
+
+        configure_genai(api_key)
         
-        # Use Imagen 4.0 Fast model for faster generation
-        imagen = genai.ImageGenerationModel("imagen-4.0-fast-generate-001")
+        imagen = genai.ImageGenerationModel(IMAGEN_MODEL)
         
         print(f"  Generating image: {prompt[:50]}...")
         
         # Generate image
-        result = imagen.generate_images(
-            prompt=prompt,
-            number_of_images=1,
-            aspect_ratio="16:9",  # Good for presentations
-            safety_filter_level="block_some",
-            person_generation="allow_adult"
-        )
+        try:
+            result = imagen.generate_images(prompt=prompt, **IMAGEN_PARAMETERS)
+        except OUTAGE_ERRORS:
+            breaker.record_failure()
+            raise
+        breaker.record_success()
         
         if result.images:
             # Save the first image
             image_data = result.images[0]._image_bytes
-            with open(output_path, 'wb') as f:
-                f.write(image_data)
-            print(f"  ✅ Image saved to {output_path}")
-            return True
+            if store:
+                store.put(cache_key, image_data, prompt=prompt, model=IMAGEN_MODEL)
+            print(f"  ✅ Image received ({len(image_data) // 1024} KB)")
+            return image_data
         else:
             print(f"  ❌ No image generated")
-            return False
+            return None
             
+    except CircuitOpenError:
+        print(f"  ⚡ Image backend unavailable, using a placeholder: {prompt[:30]}...")
+        return None
     except Exception as e:
         print(f"  ❌ Failed to generate image: {e}")
-        return False
+        return None
 
-def create_presentation(json_file='slides.json', output_file_base='nano_banana_presentation', generate_images=True):
+def create_presentation(json_file='slides.json', output_file_base='nano_banana_presentation', generate_images=True, use_cache=True, max_workers=4, stream_output=False, fit_text=True):
     api_key = None
     if generate_images:
         api_key = get_api_key()
@@ -79,17 +125,67 @@ def create_presentation(json_file='slides.json', output_file_base='nano_banana_p
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     output_file = f"{output_file_base}_{timestamp}.pptx"
 
-    # Create images directory if it doesn't exist
-    if generate_images and not os.path.exists('generated_images'):
-        os.makedirs('generated_images')
+    # Images are kept in the asset store; use_cache decides whether earlier ones are reused
+    store = AssetStore(reuse=use_cache) if generate_images else None
 
     prs = Presentation()
     # Set slide dimensions to 16:9 aspect ratio
     prs.slide_width = Inches(13.333)
     prs.slide_height = Inches(7.5)
+    # Write each slide into the file as soon as it is finished instead of holding all of them
+    writer = StreamingPptxWriter(prs, output_file) if stream_output else None
 
     print(f"\n🎨 Creating presentation with {len(slides_data)} slides...\n")
 
+    # Send every slide's image request up front so they run while the slides are laid out
+    executor = None
+    image_futures = {}
+    if generate_images and api_key:
+        executor = ThreadPoolExecutor(max_workers=max(1, max_workers))
+        for i, slide_data in enumerate(slides_data):
+            img_prompt = slide_data.get('image_prompt', '')
+            if img_prompt:
+                image_futures[i] = executor.submit(generate_image_with_imagen, img_prompt, api_key, store)
+
+    def finish_slide(i, image_data):
+        slide, img_prompt = waiting_slides.pop(i)
+        
+        if image_data:
+            # Add the generated image
+            img_left = Inches(7.0)
+            img_top = Inches(1.5)
+            img_width = Inches(5.8)
+            slide.shapes.add_picture(io.BytesIO(image_data), img_left, img_top, width=img_width)
+        else:
+            # Create placeholder
+            placeholder_left = Inches(7.0)
+            placeholder_top = Inches(1.5)
+            placeholder_width = Inches(5.8)
+            placeholder_height = Inches(4.0)
+            
+            shape = slide.shapes.add_shape(
+                1, # msoShapeRectangle
+                placeholder_left, placeholder_top, placeholder_width, placeholder_height
+            )
+            shape.fill.solid()
+            shape.fill.fore_color.rgb = RGBColor(238, 238, 238)
+            shape.line.color.rgb = RGBColor(136, 136, 136)
+            
+            p_tf = shape.text_frame
+            p_tf.text = f"Image Placeholder\n\nPrompt:\n{img_prompt}" if img_prompt else "No Image Prompt"
+            p_tf.paragraphs[0].alignment = PP_ALIGN.CENTER
+            p_tf.paragraphs[0].font.bold = True
+            p_tf.paragraphs[0].font.size = Pt(14)
+        
+        if writer:
+            writer.write_slide(slide, i)
+        print(f"  ✅ Slide {i+1} completed")
+
+    waiting_slides = {}
+    pipeline = SlidePipeline(finish_slide)
+    # Title and content font sizes for every slide, fitted in one pass
+    font_sizes = text_fit.fit_deck(slides_data) if fit_text else None
+
     for i, slide_data in enumerate(slides_data):
         print(f"📄 Slide {i+1}/{len(slides_data)}: {slide_data.get('title', 'No Title')[:50]}...")
         
@@ -106,8 +202,11 @@ def create_presentation(json_file='slides.json', output_file_base='nano_banana_p
         title_box = slide.shapes.add_textbox(title_left, title_top, title_width, title_height)
         title_tf = title_box.text_frame
         title_tf.text = slide_data.get('title', 'No Title')
-        title_tf.paragraphs[0].font.size = Pt(40)
+        title_size, content_size = font_sizes[i] if font_sizes else (40, 20)
+        title_tf.paragraphs[0].font.size = Pt(title_size)
         title_tf.paragraphs[0].font.bold = True
+        if font_sizes:
+            title_tf.word_wrap = True
 
         # Content (Text) - Left side
         left = Inches(0.5)
@@ -129,51 +228,27 @@ def create_presentation(json_file='slides.json', output_file_base='nano_banana_p
         tf.word_wrap = True
         
         for paragraph in tf.paragraphs:
-            paragraph.font.size = Pt(20)
+            paragraph.font.size = Pt(content_size)
 
-        # Image generation - Right side
-        img_prompt = slide_data.get('image_prompt', '')
-        img_filename = f"generated_images/slide_{i+1}.png"
-        
-        image_generated = False
-        if generate_images and api_key and img_prompt:
-            image_generated = generate_image_with_imagen(img_prompt, img_filename, api_key)
-        
-        if image_generated and os.path.exists(img_filename):
-            # Add the generated image
-            img_left = Inches(7.0)
-            img_top = Inches(1.5)
-            img_width = Inches(5.8)
-            slide.shapes.add_picture(img_filename, img_left, img_top, width=img_width)
-        else:
-            # Create placeholder
-            placeholder_left = Inches(7.0)
-            placeholder_top = Inches(1.5)
-            placeholder_width = Inches(5.8)
-            placeholder_height = Inches(4.0)
-            
-            shape = slide.shapes.add_shape(
-                1, # msoShapeRectangle
-                placeholder_left, placeholder_top, placeholder_width, placeholder_height
-            )
-            shape.fill.solid()
-            shape.fill.fore_color.rgb = RGBColor(238, 238, 238)
-            shape.line.color.rgb = RGBColor(136, 136, 136)
-            
-            p_tf = shape.text_frame
-            p_tf.text = f"Image Placeholder\n\nPrompt:\n{img_prompt}" if img_prompt else "No Image Prompt"
-            p_tf.paragraphs[0].alignment = PP_ALIGN.CENTER
-            p_tf.paragraphs[0].font.bold = True
-            p_tf.paragraphs[0].font.size = Pt(14)
-        
         # Add notes
+        img_prompt = slide_data.get('image_prompt', '')
         notes_slide = slide.notes_slide
         text_frame = notes_slide.notes_text_frame
         text_frame.text = f"Image Prompt: {img_prompt}"
-        
-        print(f"  ✅ Slide {i+1} completed\n")
 
-    prs.save(output_file)
+        # Image - Right side, inserted once its request completes
+        waiting_slides[i] = (slide, img_prompt)
+        pipeline.add(i, image_futures.pop(i, None))
+        pipeline.poll()
+
+    pipeline.wait_all()
+    if executor:
+        executor.shutdown()
+
+    if writer:
+        writer.close()
+    else:
+        prs.save(output_file)
     print(f"\n✅ Presentation saved to {output_file}")
     print(f"📊 Created {len(slides_data)} slides")
 
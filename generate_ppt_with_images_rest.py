@@ -1,223 +1,812 @@
+import argparse
 import json
 import os
-import requests
 import base64
+import binascii
+import io
+import time
 from pptx import Presentation
 from pptx.util import Inches, Pt
 from pptx.enum.text import PP_ALIGN
 from pptx.dml.color import RGBColor
 from datetime import datetime
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from asset_store import AssetStore, make_cache_key
+from image_optimize import ImageOptimizer
+from image_score import MAX_CANDIDATES, CandidatePicker
+from circuit_breaker import CircuitOpenError, get_breaker
+from http_client import CallStats, post_with_retry
+from key_pool import KeyPool, load_key_pool
+from slide_pipeline import SlidePipeline
+from slide_source import is_jsonl, iter_slides
+from run_journal import RunJournal, atomic_write
+from pptx_stream import StreamingPptxWriter
+import text_fit
+import tracing
+from deck_manifest import (clear_slide, find_picture, image_hash, load_manifest, save_manifest,
+                           slide_hash, truncate_slides)
 
 def get_api_key():
-    try:
-        with open('.env', 'r', encoding='utf-8') as f:
-            content = f.read().strip()
-            # Get the last non-empty line
-            lines = [line.strip() for line in content.split('\n') if line.strip() and not line.strip().startswith('#')]
-            return lines[-1] if lines else None
-    except FileNotFoundError:
-        print("Error: .env file not found.")
-        return None
+    """Return a KeyPool of the keys in .env, see key_pool.load_key_pool for the format"""
+    return load_key_pool('.env')
+
+# Part of a deadline kept free for saving the deck: 10% of it, at least DEADLINE_SAVE_RESERVE seconds
+DEADLINE_SAVE_RESERVE = 0.5
+
+# Point at a local stub (see stub_server.py) by setting GEMINI_API_BASE_URL
+API_BASE_URL = os.environ.get('GEMINI_API_BASE_URL', 'https://generativelanguage.googleapis.com').rstrip('/')
+IMAGEN_MODEL = "imagen-4.0-fast-generate-001"
+IMAGEN_PARAMETERS = {
+    "sampleCount": 1,
+    "aspectRatio": "16:9"
+}
+# Imagen can return JPEG instead of PNG where the API supports outputOptions
+API_JPEG_QUALITY = 90
+# Pictures are placed this wide on the slide; their height follows the image's aspect ratio
+IMAGE_FRAME_WIDTH = Inches(5.8)
+STYLE_PROMPT = (
+    "Landscape flashcard background, rounded corners, soft gradient, subtle paper texture,"
+    " ample white space for text"
+)
+
+def image_parameters(picker=None, output_mime_type=None):
+    """Request parameters, asking for picker.count candidates per prompt when picking the best
+    and for output_mime_type (e.g. image/jpeg, to cut transfer bytes) when it is given"""
+    parameters = dict(IMAGEN_PARAMETERS)
+    if picker:
+        parameters["sampleCount"] = picker.count
+    if output_mime_type:
+        parameters["outputOptions"] = {"mimeType": output_mime_type}
+        if output_mime_type == "image/jpeg":
+            parameters["outputOptions"]["compressionQuality"] = API_JPEG_QUALITY
+    return parameters
+
+def build_image_prompt(prompt):
+    """Append the flashcard style unless the prompt already describes a card background"""
+    if "flashcard" not in prompt and "card background" not in prompt:
+        return f"{prompt}, {STYLE_PROMPT}"
+    return prompt
 
-def generate_image_with_imagen(prompt, output_path, api_key):
-    """Generate image using Imagen 4.0 API via REST"""
+PREDICTION_BYTES_KEY = b'"bytesBase64Encoded"'
+
+def predict_url(model_name):
+    return f"{API_BASE_URL}/v1beta/models/{model_name}:predict"
+
+def decode_image_stream(chunks):
+    """Incrementally decode predictions[0].bytesBase64Encoded from raw JSON response chunks"""
+    image = io.BytesIO()
+    head = b''
+    tail = b''
+    in_value = False
+    pending = b''
+    for chunk in chunks:
+        if not in_value:
+            if len(head) < 200:
+                head += chunk[:200 - len(head)]
+            buf = tail + chunk
+            pos = buf.find(PREDICTION_BYTES_KEY)
+            if pos < 0:
+                tail = buf[-len(PREDICTION_BYTES_KEY):]
+                continue
+            quote = buf.find(b'"', pos + len(PREDICTION_BYTES_KEY))
+            if quote < 0:
+                tail = buf[pos:]
+                continue
+            in_value = True
+            chunk = buf[quote + 1:]
+            tail = b''
+
+        end = chunk.find(b'"')
+        # JSON may escape "/" as "\/"; base64 never contains a backslash
+        pending += (chunk if end < 0 else chunk[:end]).replace(b'\\', b'')
+        usable = len(pending) - len(pending) % 4
+        if usable:
+            image.write(binascii.a2b_base64(pending[:usable]))
+            pending = pending[usable:]
+        if end >= 0:
+            if pending:
+                image.write(binascii.a2b_base64(pending))
+            image.seek(0)
+            return image, head
+    return None, head
+
+def generate_image_with_imagen(prompt, output_path, api_key, cache=None, stats=None, label='', streaming=True,
+                               model_name=IMAGEN_MODEL, deadline=None, picker=None, output_mime_type=None):
+    """Generate image using Imagen 4.0 API via REST
+
+    Returns an in-memory image stream ready for add_picture, or None on failure.
+    The image is also written to output_path unless it is None. With a CandidatePicker,
+    picker.count images are requested and the best scoring one is kept (and cached).
+    """
     try:
-        model_name = "imagen-4.0-fast-generate-001"
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/{model_name}:predict?key={api_key}"
+        full_prompt = build_image_prompt(prompt)
+        parameters = image_parameters(picker, output_mime_type)
 
-        headers = {
-            "Content-Type": "application/json"
-        }
+        cache_key = make_cache_key(model_name, full_prompt, parameters)
+        if cache:
+            img_data = cache.get(cache_key)
+            if img_data:
+                if output_path:
+                    atomic_write(output_path, img_data)
+                print(f"  ♻️  Cached image reused for slide image: {prompt[:50]}...")
+                return io.BytesIO(img_data)
+
+        url = predict_url(model_name)
 
-        style_prompt = (
-            "Landscape flashcard background, rounded corners, soft gradient, subtle paper texture,"
-            " ample white space for text"
-        )
-        full_prompt = prompt
-        if "flashcard" not in prompt and "card background" not in prompt:
-            full_prompt = f"{prompt}, {style_prompt}"
-            
         data = {
             "instances": [
                 {
                     "prompt": full_prompt
                 }
             ],
-            "parameters": {
-                "sampleCount": 1,
-                "aspectRatio": "16:9"
-            }
+            "parameters": dict(parameters)
         }
         
         print(f"  Generating image: {prompt[:50]}...")
+        if picker:
+            # Every candidate has to be read before one can be picked
+            streaming = False
         
-        response = requests.post(url, headers=headers, json=data)
+        response = post_with_retry(url, data, api_key, stats=stats, label=label, stream=streaming, deadline=deadline,
+                                   breaker=get_breaker(model_name))
         
-        if response.status_code == 200:
-            result = response.json()
-            if 'predictions' in result and len(result['predictions']) > 0:
-                prediction = result['predictions'][0]
-                
-                img_data = None
-                if 'bytesBase64Encoded' in prediction:
-                    img_data = base64.b64decode(prediction['bytesBase64Encoded'])
-                elif 'mimeType' in prediction and 'bytesBase64Encoded' in prediction:
-                     img_data = base64.b64decode(prediction['bytesBase64Encoded'])
-                
-                if img_data:
-                    with open(output_path, 'wb') as f:
-                        f.write(img_data)
-                    print(f"  ✅ Image saved to {output_path}")
-                    return True
-            
-            print(f"  ❌ No image data in response: {result}")
-            return False
-        else:
+        if response.status_code != 200:
             print(f"  ❌ API Error: {response.status_code} - {response.text[:200]}")
-            return False
-            
+            return None
+
+        # Streaming decode includes reading the body off the socket
+        with tracing.span('image.decode', label=label, streaming=streaming) as decode_span:
+            if streaming:
+                # Decode straight from the socket without holding the JSON text or dict
+                with response:
+                    image, head = decode_image_stream(response.iter_content(chunk_size=64 * 1024))
+                if image is None:
+                    print(f"  ❌ No image data in response: {head[:200]!r}")
+                    return None
+            else:
+                result = response.json()
+                candidates = [base64.b64decode(prediction['bytesBase64Encoded'])
+                              for prediction in result.get('predictions') or [] if 'bytesBase64Encoded' in prediction]
+                if not candidates:
+                    print(f"  ❌ No image data in response: {result}")
+                    return None
+                image = io.BytesIO(candidates[0])
+            decode_span.set(bytes=image.getbuffer().nbytes)
+        if picker and len(candidates) > 1:
+            best = picker.pick([candidates], [label])[0]
+            image = io.BytesIO(candidates[best])
+            print(f"  🎯 Candidate {best+1} of {len(candidates)} picked")
+
+        with image.getbuffer() as img_view:
+            with tracing.span('image.write', label=label, bytes=img_view.nbytes):
+                if cache:
+                    cache.put(cache_key, img_view, prompt=full_prompt, model=model_name)
+                if output_path:
+                    atomic_write(output_path, img_view)
+            if output_path:
+                print(f"  ✅ Image saved to {output_path}")
+            else:
+                print(f"  ✅ Image received ({img_view.nbytes // 1024} KB)")
+        return image
+
+    except CircuitOpenError:
+        print(f"  ⚡ Image backend unavailable, using a placeholder: {prompt[:50]}...")
+        return None
     except Exception as e:
         print(f"  ❌ Failed to generate image: {e}")
-        return False
+        return None
 
-def create_presentation(json_file='slides.json', output_file_base='nano_banana_presentation', generate_images=True):
-    api_key = None
-    if generate_images:
-        api_key = get_api_key()
-        if not api_key:
-            print("⚠️  No API key found. Will create placeholders instead.")
-            generate_images = False
+def generate_images_batch(jobs, api_key, cache=None, stats=None, label='', streaming=True, deadline=None,
+                          picker=None, output_mime_type=None):
+    """Generate images for several slides with one multi-instance predict call
+
+    jobs is a list of (slide_index, prompt, output_path). Returns {slide_index: image stream or None}.
+    Instances missing from the response are retried one at a time. With a CandidatePicker,
+    the candidates of every slide in the batch are scored together in one pass.
+    """
+    parameters = image_parameters(picker, output_mime_type)
+    count = picker.count if picker else 1
+    results = {}
+    pending = []
+    for slide_index, prompt, output_path in jobs:
+        full_prompt = build_image_prompt(prompt)
+        cache_key = make_cache_key(IMAGEN_MODEL, full_prompt, parameters)
+        img_data = cache.get(cache_key) if cache else None
+        if img_data:
+            if output_path:
+                atomic_write(output_path, img_data)
+            print(f"  ♻️  Cached image reused for slide {slide_index+1}")
+            results[slide_index] = io.BytesIO(img_data)
+        else:
+            pending.append((slide_index, prompt, output_path, full_prompt, cache_key))
+
+    if len(pending) > 1:
+        data = {
+            "instances": [{"prompt": job[3]} for job in pending],
+            "parameters": dict(parameters)
+        }
+        print(f"  Generating {len(pending)} images in one request ({label})...")
+        try:
+            response = post_with_retry(predict_url(IMAGEN_MODEL), data, api_key, stats=stats, label=label,
+                                       deadline=deadline, breaker=get_breaker(IMAGEN_MODEL))
+            if response.status_code == 200:
+                with tracing.span('image.parse_batch', label=label, bytes=len(response.content)):
+                    predictions = response.json().get('predictions') or []
+                if len(predictions) == len(pending) * count:
+                    retry = []
+                    received = []
+                    for n, job in enumerate(pending):
+                        slide_index = job[0]
+                        # Each instance's candidates come back next to each other
+                        samples = predictions[n * count:(n + 1) * count]
+                        with tracing.span('image.decode', slide=slide_index) as decode_span:
+                            candidates = [base64.b64decode(sample['bytesBase64Encoded'])
+                                          for sample in samples if 'bytesBase64Encoded' in sample]
+                            decode_span.set(bytes=sum(map(len, candidates)))
+                        if candidates:
+                            received.append((job, candidates))
+                            continue
+                        filtered = [sample['raiFilteredReason'] for sample in samples if 'raiFilteredReason' in sample]
+                        if filtered:
+                            print(f"  ❌ Slide {slide_index+1} image filtered: {filtered[0]}")
+                            results[slide_index] = None
+                        else:
+                            retry.append(job)
+                    choices = [0] * len(received)
+                    if picker:
+                        choices = picker.pick([candidates for _, candidates in received],
+                                              [f"Slide {job[0]+1}" for job, _ in received])
+                    for (job, candidates), best in zip(received, choices):
+                        slide_index, prompt, output_path, full_prompt, cache_key = job
+                        image = io.BytesIO(candidates[best])
+                        with image.getbuffer() as img_view:
+                            with tracing.span('image.write', slide=slide_index, bytes=img_view.nbytes):
+                                if cache:
+                                    cache.put(cache_key, img_view, prompt=full_prompt, model=IMAGEN_MODEL)
+                                if output_path:
+                                    atomic_write(output_path, img_view)
+                        print(f"  ✅ Slide {slide_index+1} image received")
+                        results[slide_index] = image
+                    pending = retry
+                else:
+                    # Filtered instances are dropped without a marker, so positions cannot be trusted
+                    print(f"  ⚠️  Batch returned {len(predictions)} of {len(pending) * count} images; "
+                          f"retrying individually")
+            else:
+                print(f"  ❌ Batch API Error: {response.status_code} - {response.text[:200]}; retrying individually")
+        except CircuitOpenError:
+            # Each slide fails fast on its own below while the circuit stays open
+            pass
+        except Exception as e:
+            print(f"  ❌ Batch request failed: {e}; retrying individually")
+
+    for slide_index, prompt, output_path, _, _ in pending:
+        results[slide_index] = generate_image_with_imagen(prompt, output_path, api_key, cache, stats,
+                                                          f"Slide {slide_index+1}", streaming, deadline=deadline,
+                                                          picker=picker, output_mime_type=output_mime_type)
+    return results
+
+def add_text_boxes(slide, slide_data, font_sizes=None):
+    """Add the title and content boxes; font_sizes is a fitted (title, content) pair in points"""
+    title_size, content_size = font_sizes or (40, 20)
+    # Title
+    title_left = Inches(0.5)
+    title_top = Inches(0.3)
+    title_width = Inches(12)
+    title_height = Inches(1.0)
+    
+    title_box = slide.shapes.add_textbox(title_left, title_top, title_width, title_height)
+    title_tf = title_box.text_frame
+    title_tf.text = slide_data.get('title', 'No Title')
+    title_tf.paragraphs[0].font.size = Pt(title_size)
+    title_tf.paragraphs[0].font.bold = True
+    if font_sizes:
+        # A fitted title may need a second line
+        title_tf.word_wrap = True
+
+    # Content (Text) - Left side
+    left = Inches(0.5)
+    top = Inches(1.5)
+    width = Inches(6.0)
+    height = Inches(5.0)
+    
+    txBox = slide.shapes.add_textbox(left, top, width, height)
+    tf = txBox.text_frame
+    
+    # Handle content as either string or list
+    content = slide_data.get('content', '')
+    if isinstance(content, list):
+        content_text = '\n'.join([f"• {item}" for item in content])
+    else:
+        content_text = content
+        
+    tf.text = content_text
+    tf.word_wrap = True
+    
+    for paragraph in tf.paragraphs:
+        paragraph.font.size = Pt(content_size)
 
+def add_image_or_placeholder(slide, image_stream, img_prompt):
+    if image_stream:
+        # Add the generated image
+        img_left = Inches(7.0)
+        img_top = Inches(1.5)
+        img_width = IMAGE_FRAME_WIDTH
+        # Add picture with preserved aspect ratio
+        pic = slide.shapes.add_picture(image_stream, img_left, img_top, width=img_width)
+        
+        # Add caption
+        caption_left = img_left
+        caption_top = img_top + pic.height + Inches(0.1)
+        caption_width = img_width
+        caption_height = Inches(0.5)
+        
+        caption_box = slide.shapes.add_textbox(caption_left, caption_top, caption_width, caption_height)
+        caption_tf = caption_box.text_frame
+        caption_tf.text = "Generated by Imagen 4.0"
+        caption_tf.paragraphs[0].font.size = Pt(10)
+        caption_tf.paragraphs[0].font.italic = True
+        caption_tf.paragraphs[0].alignment = PP_ALIGN.CENTER
+        
+    else:
+        # Create placeholder
+        placeholder_left = Inches(7.0)
+        placeholder_top = Inches(1.5)
+        placeholder_width = Inches(5.8)
+        placeholder_height = Inches(4.0)
+        
+        shape = slide.shapes.add_shape(
+            1, # msoShapeRectangle
+            placeholder_left, placeholder_top, placeholder_width, placeholder_height
+        )
+        shape.fill.solid()
+        shape.fill.fore_color.rgb = RGBColor(238, 238, 238)
+        shape.line.color.rgb = RGBColor(136, 136, 136)
+        
+        p_tf = shape.text_frame
+        p_tf.text = f"Image Placeholder\n\nPrompt:\n{img_prompt}" if img_prompt else "No Image Prompt"
+        p_tf.paragraphs[0].alignment = PP_ALIGN.CENTER
+        p_tf.paragraphs[0].font.bold = True
+        p_tf.paragraphs[0].font.size = Pt(14)
+
+def add_notes(slide, img_prompt):
+    notes_slide = slide.notes_slide
+    text_frame = notes_slide.notes_text_frame
+    text_frame.text = f"Image Prompt: {img_prompt}"
+
+def load_slides(json_file):
+    """Read the slide list from a JSON file holding a list or a {"slides": [...]} object"""
     try:
-        with open(json_file, 'r', encoding='utf-8') as f:
+        with tracing.span('json.load', file=json_file), open(json_file, 'r', encoding='utf-8') as f:
             data = json.load(f)
             if isinstance(data, dict) and 'slides' in data:
-                slides_data = data['slides']
+                return data['slides']
             elif isinstance(data, list):
-                slides_data = data
+                return data
             else:
                 print(f"Error: Unexpected JSON format in {json_file}")
-                return
+                return None
     except FileNotFoundError:
         print(f"Error: {json_file} not found.")
-        return
+        return None
+
+def write_deadline_report(output_file_base, output_file, deadline, elapsed, slide_count, missed):
+    """Write <output_file_base>.deadline.json listing the slides that got a placeholder instead of their image"""
+    path = f"{output_file_base}.deadline.json"
+    report = {
+        "output_file": output_file,
+        "budget_seconds": deadline,
+        "elapsed_seconds": round(elapsed, 3),
+        "slides": slide_count,
+        "missed": [{"slide": i + 1, "reason": reason} for i, reason in sorted(missed.items())],
+    }
+    atomic_write(path, json.dumps(report, ensure_ascii=False, indent=2).encode('utf-8'))
+    return path
+
+def create_presentation(json_file='slides.json', output_file_base='nano_banana_presentation', generate_images=True, max_workers=4, use_cache=True,
+                        save_images=True, streaming=True, batch_size=1, incremental=False, slides=None,
+                        trace_file=None, stream_input=None, max_in_flight=None, resume=False,
+                        stream_output=False, api_key=None, cache=None, prs=None, progress=None, fit_text=True,
+                        deadline=None, candidates=1, image_dpi=None, output_mime_type=None, image_pool=None):
+    """Build the deck and return the output file name (None if the slides could not be loaded)
+
+    slides may be a list or any iterable of slide dicts. With stream_input (the default for
+    .jsonl files and '-'), json_file is parsed incrementally and slides are laid out as they
+    are read, keeping at most max_in_flight slides between parsing and their finished picture.
+    With save_images, every image is kept in the AssetStore (generated_images.db) and
+    checkpointed in <output_file_base>.journal.jsonl; with resume, slides whose checkpointed
+    image is still stored are not sent to the API again. use_cache decides whether images
+    stored by earlier builds are reused. With stream_output, each
+    finished slide is written straight into the .pptx and released instead of being held
+    until the end, so memory stays flat as the deck grows. With fit_text, title and content
+    font sizes are shrunk as far as needed for the text to fit its box.
+
+    deadline is a time budget in seconds for the whole build. Images that have not arrived
+    when it is nearly spent are cancelled and their slides get the placeholder, so the deck
+    is saved within the budget; the slides that missed are listed in
+    <output_file_base>.deadline.json.
+
+    With candidates > 1, that many images are requested per slide and the one leaving the
+    most clear space for text is embedded; every candidate's scores and the decode/score
+    timings are written to <output_file_base>.candidates.json.
+
+    With image_dpi, each image is downscaled to the pixel size of its frame at that DPI and
+    re-encoded (palette PNG for flat artwork, JPEG otherwise) in a process pool before it is
+    embedded; bytes saved and time spent are reported per slide. output_mime_type asks the
+    API for that format (e.g. image/jpeg) where it supports outputOptions.
+
+    A long-running caller can pass a preloaded api_key, a shared AssetStore as cache, a
+    fresh Presentation as prs and a warm image_optimize.make_pool() as image_pool, and
+    receives progress(slides_done, total) after each slide.
+    """
+    tracer = tracing.start() if trace_file else None
+    try:
+        # The build registers its worker threads, optimizer, journal and output zip here,
+        # so an error cannot leave them running or open
+        with ExitStack() as cleanup:
+            output_file = _build_presentation(
+                cleanup, json_file=json_file, output_file_base=output_file_base, generate_images=generate_images,
+                max_workers=max_workers, use_cache=use_cache, save_images=save_images, streaming=streaming,
+                batch_size=batch_size, incremental=incremental, slides=slides, stream_input=stream_input,
+                max_in_flight=max_in_flight, resume=resume, stream_output=stream_output, api_key=api_key, cache=cache,
+                prs=prs, progress=progress, fit_text=fit_text, deadline=deadline, candidates=candidates,
+                image_dpi=image_dpi, output_mime_type=output_mime_type, image_pool=image_pool)
+    finally:
+        if tracer:
+            tracing.stop()
+
+    if tracer and output_file:
+        tracer.write_chrome_trace(trace_file)
+        tracer.print_summary()
+        print(f"🧭 Trace written to {trace_file} (open in ui.perfetto.dev or chrome://tracing)")
+    return output_file
+
+def _build_presentation(cleanup, *, json_file, output_file_base, generate_images, max_workers, use_cache, save_images,
+                        streaming, batch_size, incremental, slides, stream_input, max_in_flight, resume, stream_output,
+                        api_key, cache, prs, progress, fit_text, deadline, candidates, image_dpi, output_mime_type,
+                        image_pool):
+    """Body of create_presentation; resources that must be released however it ends go on cleanup"""
+    build_start = time.monotonic()
+    image_deadline = None
+    if deadline:
+        # Images must be in early enough to leave time for saving the deck inside the budget
+        image_deadline = build_start + deadline - min(deadline / 2, max(DEADLINE_SAVE_RESERVE, deadline * 0.1))
+    missed = {}
+    if generate_images:
+        api_key = api_key or get_api_key()
+        if not api_key:
+            print("⚠️  No API key found. Will create placeholders instead.")
+            generate_images = False
+    picker = CandidatePicker(candidates) if generate_images and candidates > 1 else None
+
+    if slides is not None:
+        slides_data = slides
+    elif stream_input or (stream_input is None and is_jsonl(json_file)):
+        if json_file != '-' and not os.path.exists(json_file):
+            print(f"Error: {json_file} not found.")
+            slides_data = None
+        else:
+            slides_data = iter_slides(json_file)
+    else:
+        slides_data = load_slides(json_file)
+    if slides_data is None:
+        return None
+
+    total = len(slides_data) if hasattr(slides_data, '__len__') else None
+    if max_in_flight is None:
+        # A list is already in memory, so every image request can go out up front
+        max_in_flight = total if total is not None else max(16, 4 * max_workers)
+    max_in_flight = max(1, max_in_flight)
 
     # Generate a timestamp for the output file
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     output_file = f"{output_file_base}_{timestamp}.pptx"
 
-    # Create images directory if it doesn't exist
-    if generate_images and not os.path.exists('generated_images'):
-        os.makedirs('generated_images')
+    # In incremental mode, start from the previous build and keep slides whose content hash is unchanged
+    manifest = load_manifest(output_file_base) if incremental else None
+    if manifest:
+        prs = Presentation(manifest['output_file'])
+    elif prs is None:
+        prs = Presentation()
+    previous = manifest['slides'][:len(prs.slides)] if manifest else []
+    slide_entries = []
+    reuse_slide = set()
+    reuse_image = set()
 
-    prs = Presentation()
     # Set slide dimensions to 16:9 aspect ratio
     prs.slide_width = Inches(13.333)
     prs.slide_height = Inches(7.5)
 
-    print(f"\n🎨 Creating presentation with {len(slides_data)} slides...\n")
+    writer = StreamingPptxWriter(prs, output_file) if stream_output else None
+    # Leave no half-written .pptx behind; writer is cleared once the deck is closed
+    cleanup.callback(lambda: writer and writer.abort())
+    # Slides are released from prs as they are written, so keep the previous build's slides by position
+    existing = list(prs.slides)
 
-    for i, slide_data in enumerate(slides_data):
-        print(f"📄 Slide {i+1}/{len(slides_data)}: {slide_data.get('title', 'No Title')[:50]}...")
-        
-        # Use a blank layout for custom positioning
-        slide_layout = prs.slide_layouts[6] 
-        slide = prs.slides.add_slide(slide_layout)
-
-        # Title
-        title_left = Inches(0.5)
-        title_top = Inches(0.3)
-        title_width = Inches(12)
-        title_height = Inches(1.0)
-        
-        title_box = slide.shapes.add_textbox(title_left, title_top, title_width, title_height)
-        title_tf = title_box.text_frame
-        title_tf.text = slide_data.get('title', 'No Title')
-        title_tf.paragraphs[0].font.size = Pt(40)
-        title_tf.paragraphs[0].font.bold = True
-
-        # Content (Text) - Left side
-        left = Inches(0.5)
-        top = Inches(1.5)
-        width = Inches(6.0)
-        height = Inches(5.0)
-        
-        txBox = slide.shapes.add_textbox(left, top, width, height)
-        tf = txBox.text_frame
-        
-        # Handle content as either string or list
-        content = slide_data.get('content', '')
-        if isinstance(content, list):
-            content_text = '\n'.join([f"• {item}" for item in content])
-        else:
-            content_text = content
-            
-        tf.text = content_text
-        tf.word_wrap = True
-        
-        for paragraph in tf.paragraphs:
-            paragraph.font.size = Pt(20)
+    if total is not None:
+        print(f"\n🎨 Creating presentation with {total} slides...\n")
+    else:
+        print(f"\n🎨 Creating presentation from streamed slides ({max_in_flight} in flight)...\n")
 
-        # Image generation - Right side
+    # Image requests go out as slides are read, ahead of the slide being laid out
+    executor = None
+    optimizer = None
+    store = None
+    image_futures = {}
+    batch_jobs = []
+    journal = None
+    image_jobs = {}
+    resumed_images = {}
+    if generate_images and api_key:
+        if cache is None and (use_cache or save_images):
+            cache = AssetStore(reuse=use_cache)
+        store = cache if isinstance(cache, AssetStore) else None
+        stats = CallStats()
+        executor = ThreadPoolExecutor(max_workers=max(1, max_workers))
+        cleanup.callback(executor.shutdown, wait=False, cancel_futures=True)
+        if image_dpi:
+            optimizer = ImageOptimizer(IMAGE_FRAME_WIDTH, image_dpi, pool=image_pool)
+            cleanup.callback(optimizer.close, wait=False)
+        if save_images and store:
+            journal = RunJournal(output_file_base, resume=resume)
+            cleanup.callback(journal.close)
+            checkpointed = sum(1 for entry in journal.entries.values() if entry['stored'])
+            if checkpointed:
+                print(f"⏯️  Resuming from {journal.path}: {checkpointed} slide images checkpointed")
+        elif resume:
+            print("⚠️  --resume needs saved images; nothing to resume from with save_images=False")
+
+    def flush_batch():
+        label = f"Slides {batch_jobs[0][0]+1}-{batch_jobs[-1][0]+1}"
+        generate = optimizer.wrap(generate_images_batch, label) if optimizer else generate_images_batch
+        future = executor.submit(tracing.queued(generate, label=label), list(batch_jobs), api_key, cache, stats,
+                                 label, streaming, image_deadline, picker, output_mime_type)
+        for job in batch_jobs:
+            image_futures[job[0]] = future
+        batch_jobs.clear()
+
+    def submit_image(i, slide_data):
         img_prompt = slide_data.get('image_prompt', '')
-        img_filename = f"generated_images/slide_{i+1}_{timestamp}.png"
-        
-        image_generated = False
-        if generate_images and api_key and img_prompt:
-            image_generated = generate_image_with_imagen(img_prompt, img_filename, api_key)
-        
-        if image_generated and os.path.exists(img_filename):
-            # Add the generated image
-            img_left = Inches(7.0)
-            img_top = Inches(1.5)
-            img_width = Inches(5.8)
-            # Add picture with preserved aspect ratio
-            pic = slide.shapes.add_picture(img_filename, img_left, img_top, width=img_width)
-            
-            # Add caption
-            caption_left = img_left
-            caption_top = img_top + pic.height + Inches(0.1)
-            caption_width = img_width
-            caption_height = Inches(0.5)
-            
-            caption_box = slide.shapes.add_textbox(caption_left, caption_top, caption_width, caption_height)
-            caption_tf = caption_box.text_frame
-            caption_tf.text = "Generated by Imagen 4.0"
-            caption_tf.paragraphs[0].font.size = Pt(10)
-            caption_tf.paragraphs[0].font.italic = True
-            caption_tf.paragraphs[0].alignment = PP_ALIGN.CENTER
-            
+        if not executor or not img_prompt or i in reuse_image:
+            return
+        image_key = make_cache_key(IMAGEN_MODEL, build_image_prompt(img_prompt),
+                                   image_parameters(picker, output_mime_type))
+        if journal and journal.has_image(i, image_key) and store.contains(image_key):
+            resumed_images[i] = image_key
+            return
+        if image_deadline and time.monotonic() >= image_deadline:
+            # Too late to ask; the slide gets the placeholder and is reported as missed
+            return
+        image_jobs[i] = image_key
+        if batch_size > 1:
+            batch_jobs.append((i, img_prompt, None))
+            if len(batch_jobs) >= batch_size:
+                flush_batch()
         else:
-            # Create placeholder
-            placeholder_left = Inches(7.0)
-            placeholder_top = Inches(1.5)
-            placeholder_width = Inches(5.8)
-            placeholder_height = Inches(4.0)
-            
-            shape = slide.shapes.add_shape(
-                1, # msoShapeRectangle
-                placeholder_left, placeholder_top, placeholder_width, placeholder_height
-            )
-            shape.fill.solid()
-            shape.fill.fore_color.rgb = RGBColor(238, 238, 238)
-            shape.line.color.rgb = RGBColor(136, 136, 136)
-            
-            p_tf = shape.text_frame
-            p_tf.text = f"Image Placeholder\n\nPrompt:\n{img_prompt}" if img_prompt else "No Image Prompt"
-            p_tf.paragraphs[0].alignment = PP_ALIGN.CENTER
-            p_tf.paragraphs[0].font.bold = True
-            p_tf.paragraphs[0].font.size = Pt(14)
-        
+            generate = generate_image_with_imagen
+            if optimizer:
+                generate = optimizer.wrap(generate, f"Slide {i+1}")
+            image_futures[i] = executor.submit(tracing.queued(generate, slide=i),
+                                               img_prompt, None, api_key, cache, stats,
+                                               f"Slide {i+1}", streaming, deadline=image_deadline, picker=picker,
+                                               output_mime_type=output_mime_type)
+
+    def check_reuse(i, slide_data):
+        entry = {"hash": slide_hash(slide_data), "image_hash": image_hash(slide_data), "has_image": False}
+        slide_entries.append(entry)
+        if i >= len(previous):
+            return
+        if entry['image_hash'] == previous[i]['image_hash'] and previous[i]['has_image']:
+            reuse_image.add(i)
+            if entry['hash'] == previous[i]['hash']:
+                reuse_slide.add(i)
+        elif entry['hash'] == previous[i]['hash'] and not (generate_images and slide_data.get('image_prompt')):
+            # A placeholder slide is only final when no image could be generated for it anyway
+            reuse_slide.add(i)
+
+    # Lay out text and notes for every slide now; pictures are inserted as their requests complete
+    waiting_slides = {}
+
+    def finish_slide(i, image_stream):
+        slide, img_prompt, reused_image = waiting_slides.pop(i)
+        image_stream = image_stream or reused_image
+        if image_stream:
+            with tracing.span('slide.add_picture', slide=i, bytes=image_stream.getbuffer().nbytes):
+                add_image_or_placeholder(slide, image_stream, img_prompt)
+        else:
+            with tracing.span('slide.placeholder', slide=i):
+                add_image_or_placeholder(slide, image_stream, img_prompt)
+        if incremental:
+            slide_entries[i]['has_image'] = bool(image_stream)
+        if image_deadline and not image_stream and img_prompt and executor:
+            missed[i] = "deadline" if time.monotonic() >= image_deadline else "failed"
+        if journal and i in image_jobs:
+            image_key = image_jobs.pop(i)
+            journal.record(i, image_key, bool(image_stream) and store.contains(image_key))
+        if writer:
+            with tracing.span('pptx.write_slide', slide=i):
+                writer.write_slide(slide, i)
+        print(f"  ✅ Slide {i+1} completed")
+        report_progress()
+
+    slides_done = 0
+
+    def report_progress():
+        nonlocal slides_done
+        slides_done += 1
+        if progress:
+            progress(slides_done, total)
+
+    pipeline = SlidePipeline(finish_slide)
+    font_sizes = {}
+    source = iter(slides_data)
+    ahead = deque()
+    slide_count = 0
+    exhausted = False
+    while True:
+        # Read and submit ahead while fewer than max_in_flight slides are between parsing and finishing
+        while not exhausted and len(ahead) + pipeline.pending < max_in_flight:
+            with tracing.span('json.read_slide', slide=slide_count):
+                slide_data = next(source, None)
+            if slide_data is None:
+                exhausted = True
+                break
+            if incremental:
+                check_reuse(slide_count, slide_data)
+            submit_image(slide_count, slide_data)
+            ahead.append((slide_count, slide_data))
+            slide_count += 1
+        if not ahead:
+            if exhausted:
+                break
+            if not pipeline.wait_one(image_deadline):
+                pipeline.expire()
+            continue
+
+        i, slide_data = ahead.popleft()
+        if batch_jobs and batch_jobs[0][0] <= i:
+            flush_batch()
+        if i in reuse_slide:
+            font_sizes.pop(i, None)
+            slide_entries[i]['has_image'] = previous[i]['has_image']
+            if writer:
+                writer.write_slide(existing[i], i)
+            report_progress()
+            continue
+
+        position = f"{i+1}/{total}" if total is not None else f"{i+1}"
+        print(f"📄 Slide {position}: {slide_data.get('title', 'No Title')[:50]}...")
+    
+        reused_image = None
+        if i in resumed_images:
+            data = store.read(resumed_images.pop(i))
+            # None if the store was garbage collected since the check at submit time
+            reused_image = io.BytesIO(data) if data else None
+            print("  ⏭️  Image restored from checkpoint" if data else "  ⚠️  Checkpointed image is gone from the store")
+            if optimizer and reused_image:
+                # Checkpoints hold the image as the API returned it
+                reused_image = optimizer.optimize(reused_image, f"Slide {i+1}")
+        if i < len(existing):
+            slide = existing[i]
+            if i in reuse_image:
+                # Only the text changed: keep the picture the previous build paid for
+                picture = find_picture(slide)
+                reused_image = io.BytesIO(picture.image.blob) if picture else None
+            clear_slide(slide)
+        else:
+            # Use a blank layout for custom positioning
+            slide_layout = prs.slide_layouts[6] 
+            slide = prs.slides.add_slide(slide_layout)
+
+        if fit_text and i not in font_sizes:
+            # Fit the whole read-ahead window in one pass; that is the entire deck for a list
+            window = [(i, slide_data)] + list(ahead)
+            with tracing.span('text.fit', slides=len(window)):
+                font_sizes.update(zip([j for j, _ in window], text_fit.fit_deck([d for _, d in window])))
+        with tracing.span('slide.layout', slide=i):
+            add_text_boxes(slide, slide_data, font_sizes.pop(i, None))
+
         # Add notes
-        notes_slide = slide.notes_slide
-        text_frame = notes_slide.notes_text_frame
-        text_frame.text = f"Image Prompt: {img_prompt}"
-        
-        print(f"  ✅ Slide {i+1} completed\n")
+        img_prompt = slide_data.get('image_prompt', '')
+        with tracing.span('slide.notes', slide=i):
+            add_notes(slide, img_prompt)
+
+        # Image generation - Right side
+        waiting_slides[i] = (slide, img_prompt, reused_image)
+        future = image_futures.pop(i, None)
+        if image_deadline and future is not None and (
+                future.cancelled() or (not future.done() and time.monotonic() >= image_deadline)):
+            future.cancel()
+            future = None
+        pipeline.add(i, future)
+        pipeline.poll()
+
+    with tracing.span('image.wait_remaining', pending=pipeline.pending):
+        if not pipeline.wait_all(image_deadline):
+            pipeline.expire()
+
+    if executor:
+        # Requests still running past the deadline end on their own cut-down timeouts; don't wait for them
+        expired = image_deadline is not None and time.monotonic() >= image_deadline
+        executor.shutdown(wait=not expired, cancel_futures=expired)
+        if optimizer:
+            optimizer.close(wait=not expired)
+        stats.print_summary()
+        if isinstance(api_key, KeyPool):
+            api_key.print_summary()
+        if picker and picker.records:
+            picker.print_summary()
+            print(f"  Scores written to {picker.write_report(f'{output_file_base}.candidates.json')}")
+        if optimizer:
+            optimizer.print_summary()
 
-    prs.save(output_file)
+    if manifest:
+        # Written slides are already gone from prs when streaming, leaving only the surplus ones
+        truncate_slides(prs, 0 if writer else slide_count)
+        print(f"\n♻️  Incremental build from {manifest['output_file']}: "
+              f"{len(reuse_slide)} of {slide_count} slides unchanged")
+
+    with tracing.span('prs.save', streamed=bool(writer)) as save_span:
+        if writer:
+            writer.close()
+            # The deck is complete; an error after this point must not delete it
+            writer = None
+        else:
+            prs.save(output_file)
+        save_span.set(bytes=os.path.getsize(output_file))
+    if incremental:
+        save_manifest(output_file_base, output_file, slide_entries)
+    if journal:
+        journal.finish(output_file)
+        journal.close()
     print(f"\n✅ Presentation saved to {output_file}")
-    print(f"📊 Created {len(slides_data)} slides")
+    print(f"📊 Created {slide_count} slides")
+    if deadline:
+        elapsed = time.monotonic() - build_start
+        report_path = write_deadline_report(output_file_base, output_file, deadline, elapsed, slide_count, missed)
+        print(f"⏱️  Built in {elapsed:.1f}s of a {deadline:g}s budget; "
+              f"{len(missed)} slides without their image (see {report_path})")
+    return output_file
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a PowerPoint deck with Imagen images over REST.")
+    parser.add_argument('json_file', nargs='?', default='slides.json', help="slides JSON or JSONL ('-' for stdin)")
+    parser.add_argument('--output', default='nano_banana_presentation', help="output file name prefix")
+    parser.add_argument('--resume', action='store_true',
+                        help="reuse the images checkpointed by an interrupted run with the same --output")
+    parser.add_argument('--stream-output', action='store_true',
+                        help="write slides into the .pptx as they finish to keep memory flat on huge decks")
+    parser.add_argument('--no-fit-text', action='store_true',
+                        help="keep the fixed 40pt titles and 20pt content instead of shrinking long text to fit")
+    parser.add_argument('--deadline', type=float, default=None,
+                        help="time budget in seconds; images still missing by then become placeholders")
+    parser.add_argument('--candidates', type=int, default=1, choices=range(1, MAX_CANDIDATES + 1), metavar='N',
+                        help="images to request per slide (up to 4); the one leaving the most room for text is used")
+    parser.add_argument('--image-dpi', type=int, default=None,
+                        help="downscale and recompress images to their frame size at this DPI (e.g. 150)")
+    parser.add_argument('--api-mime-type', choices=['image/png', 'image/jpeg'], default=None,
+                        help="image format to ask the API for, where it supports outputOptions")
+    parser.add_argument('--progressive', action='store_true',
+                        help="save the deck with fast draft images, then upgrade them in place in the background")
+    parser.add_argument('--upgrade-model', default=None, help="model for the background upgrade pass")
+    parser.add_argument('--upgrade-slides', default=None, help="slide numbers to upgrade, e.g. 1,3,5-8 (default: all)")
+    args = parser.parse_args()
+    # PPT_TRACE=trace.json records a Chrome/Perfetto trace of the build stages
+    output_file = create_presentation(args.json_file, args.output, generate_images=True, resume=args.resume,
+                                      trace_file=os.environ.get('PPT_TRACE'), stream_output=args.stream_output,
+                                      fit_text=not args.no_fit_text, deadline=args.deadline,
+                                      candidates=args.candidates, image_dpi=args.image_dpi,
+                                      output_mime_type=args.api_mime_type)
+    if output_file and args.progressive:
+        # Imported here because deck_upgrade builds on this module
+        import deck_upgrade
+        slide_numbers = deck_upgrade.parse_slide_numbers(args.upgrade_slides) if args.upgrade_slides else None
+        log_path = deck_upgrade.start_background_upgrade(
+            output_file, args.upgrade_model or deck_upgrade.UPGRADE_MODEL, slide_numbers,
+            image_dpi=args.image_dpi, output_mime_type=args.api_mime_type)
+        print(f"⬆️  Draft deck is ready; upgrading its images in the background (log: {log_path})")
 
 if __name__ == "__main__":
-    create_presentation(generate_images=True)
+    main()
@@ -0,0 +1,248 @@
+import email.utils
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import tracing
+from circuit_breaker import CircuitOpenError
+from key_pool import KeyPool
+
+CONNECT_TIMEOUT = 10    # seconds to establish the TLS connection
+READ_TIMEOUT = 120      # seconds to wait for the response body
+MAX_RETRIES = 4
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 30.0
+RETRY_AFTER_MAX = 120.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+_session = None
+_session_lock = threading.Lock()
+_request_limiter = None
+
+
+def get_session(pool_size=16):
+    """Return the process-wide keep-alive session shared by all API calls"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _session = session
+    return _session
+
+
+def set_request_limiter(semaphore):
+    """Cap concurrent requests in this process with a semaphore, which may be shared with other processes"""
+    global _request_limiter
+    _request_limiter = semaphore
+
+
+def parse_retry_after(value):
+    """Return the Retry-After header as seconds to wait, or None if absent or invalid"""
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            when = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        seconds = when.timestamp() - time.time()
+    return min(max(seconds, 0.0), RETRY_AFTER_MAX)
+
+
+def backoff_delay(attempt):
+    """Exponential backoff with full jitter for the given retry attempt (0-based)"""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+
+class CallStats:
+    """Thread-safe record of retry counts and latencies for each API call"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = []
+
+    def record(self, label, retries, latency, status):
+        with self._lock:
+            self.calls.append({"label": label, "retries": retries, "latency": latency, "status": status})
+
+    def print_summary(self):
+        with self._lock:
+            calls = list(self.calls)
+        if not calls:
+            return
+        latencies = sorted(call['latency'] for call in calls)
+        total_retries = sum(call['retries'] for call in calls)
+
+        def percentile(p):
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))]
+
+        print(f"\n🌐 API calls: {len(calls)}, retries: {total_retries}, "
+              f"latency p50 {percentile(0.5):.2f}s / p95 {percentile(0.95):.2f}s / max {latencies[-1]:.2f}s")
+        failed_fast = 0
+        for call in calls:
+            if call['status'] == 'circuit open' and not call['retries']:
+                failed_fast += 1
+            elif call['retries'] or call['status'] != 200:
+                print(f"  {call['label']}: status {call['status']}, {call['retries']} retries, {call['latency']:.2f}s")
+        if failed_fast:
+            print(f"  {failed_fast} calls not made while the backend's circuit was open")
+
+
+def is_key_rejected(response):
+    """True if the API refused the key itself rather than the request"""
+    if response.status_code == 403:
+        return True
+    return response.status_code == 400 and 'API_KEY_INVALID' in response.text
+
+
+class DeadlineExceeded(Exception):
+    """The caller's deadline passed before the request could be sent or retried"""
+
+
+def time_left(deadline):
+    """Seconds until deadline (a time.monotonic() value), or None without one"""
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def cut_short(error, timeout, request_timeout):
+    """True if error is a timeout that fired only because a deadline shortened the configured one"""
+    # ConnectTimeout is also a ConnectionError, so it is checked first
+    if isinstance(error, requests.ConnectTimeout):
+        return request_timeout[0] < timeout[0]
+    if isinstance(error, requests.Timeout):
+        return request_timeout[1] < timeout[1]
+    return False
+
+
+def post_with_retry(url, payload, api_key=None, stats=None, label='', max_retries=MAX_RETRIES,
+                    timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), stream=False, deadline=None, breaker=None):
+    """POST JSON through the shared session, retrying 429/5xx and network errors with backoff
+
+    api_key may be a KeyPool, in which case each attempt goes out on whichever key has
+    budget. A key that returns 429 is rested and the request is retried at once on another
+    key; a key the API rejects is dropped from the pool while others remain.
+
+    With a deadline (a time.monotonic() value), timeouts are cut to the time left, no retry
+    is started that could not finish its backoff in time, and DeadlineExceeded is raised
+    if the deadline passes before a request goes out.
+
+    With a CircuitBreaker, network errors and 5xx responses count as backend failures, and
+    CircuitOpenError is raised instead of sending while the circuit is open. A 429, or a
+    timeout that only fired because the deadline shortened it, counts as neither: a slow
+    but healthy backend must not be cut off for every other caller of the shared breaker.
+    """
+    session = get_session()
+    pool = api_key if isinstance(api_key, KeyPool) else None
+    params = {"key": api_key} if api_key and not pool else None
+    start = time.perf_counter()
+    retries = 0
+
+    def give_up(reason):
+        if stats:
+            stats.record(label, retries, time.perf_counter() - start, reason)
+        raise DeadlineExceeded(f"{label or 'Request'}: deadline passed before the request was sent")
+
+    while True:
+        key = None
+        if pool:
+            with tracing.span('http.key_wait', label=label):
+                key = pool.acquire(deadline)
+            if key is None:
+                give_up('deadline')
+            params = {"key": key.key}
+        remaining = time_left(deadline)
+        if remaining is not None and remaining <= 0:
+            if key:
+                pool.release(key)
+            give_up('deadline')
+        request_timeout = timeout if remaining is None else (min(timeout[0], remaining), min(timeout[1], remaining))
+        if breaker and not breaker.allow():
+            if key:
+                pool.release(key)
+            if stats:
+                stats.record(label, retries, time.perf_counter() - start, 'circuit open')
+            raise CircuitOpenError(f"{breaker.name} is failing, not calling it")
+        try:
+            # With stream=True this covers the request up to the response headers; the body is read by the caller
+            with tracing.span('http.post', label=label, attempt=retries) as post_span:
+                if _request_limiter is not None:
+                    if not _request_limiter.acquire(timeout=time_left(deadline)):
+                        if key:
+                            pool.release(key)
+                        give_up('deadline')
+                    try:
+                        response = session.post(url, params=params, json=payload, timeout=request_timeout,
+                                                stream=stream)
+                    finally:
+                        _request_limiter.release()
+                else:
+                    response = session.post(url, params=params, json=payload, timeout=request_timeout, stream=stream)
+                post_span.set(status=response.status_code)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if key:
+                pool.release(key)
+            if breaker:
+                if cut_short(e, timeout, request_timeout):
+                    breaker.record_neutral()
+                else:
+                    breaker.record_failure()
+            delay = backoff_delay(retries)
+            remaining = time_left(deadline)
+            if retries >= max_retries or (remaining is not None and delay >= remaining):
+                if stats:
+                    stats.record(label, retries, time.perf_counter() - start, type(e).__name__)
+                raise
+            reason = type(e).__name__
+        else:
+            if breaker:
+                if response.status_code >= 500:
+                    breaker.record_failure()
+                elif response.status_code == 429:
+                    # Throttled: the backend is up, but that is no sign it has recovered
+                    breaker.record_neutral()
+                else:
+                    breaker.record_success()
+            if key and is_key_rejected(response) and pool.disable(key):
+                print(f"  🔑 {label or 'Request'}: key {key.name} rejected ({response.status_code}), dropped from the pool")
+                response.close()
+                continue
+            if key and response.status_code == 429:
+                pool.release(key, throttled=True, retry_after=parse_retry_after(response.headers.get('Retry-After')))
+                if retries < max_retries:
+                    # The other keys still have budget, so retry now instead of sleeping
+                    retries += 1
+                    print(f"  🔁 {label or 'Request'}: 429 on key {key.name}, retry {retries}/{max_retries} on another key")
+                    response.close()
+                    continue
+            elif key:
+                pool.release(key)
+            delay = None
+            if response.status_code in RETRY_STATUSES and retries < max_retries:
+                delay = parse_retry_after(response.headers.get('Retry-After'))
+                if delay is None:
+                    delay = backoff_delay(retries)
+                remaining = time_left(deadline)
+                if remaining is not None and delay >= remaining:
+                    delay = None
+            if delay is None:
+                if stats:
+                    stats.record(label, retries, time.perf_counter() - start, response.status_code)
+                return response
+            reason = response.status_code
+            response.close()
+
+        retries += 1
+        print(f"  🔁 {label or 'Request'}: {reason}, retry {retries}/{max_retries} in {delay:.1f}s")
+        with tracing.span('http.backoff', label=label, attempt=retries):
+            if breaker:
+                breaker.sleep(delay)
+            else:
+                time.sleep(delay)
@@ -0,0 +1,162 @@
+import io
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+import tracing
+
+DEFAULT_DPI = 150
+JPEG_QUALITY = 85
+PALETTE_COLORS = 256
+# An image whose FLAT_TOP_COLORS most common colours cover FLAT_COVERAGE of its pixels is
+# flat artwork (diagrams, schematics): a palette PNG keeps its lines crisp where JPEG would ring
+FLAT_TOP_COLORS = 64
+FLAT_COVERAGE = 0.9
+
+
+def is_flat(pixels):
+    """True if an (height, width, 3) uint8 array is dominated by a few exact colours"""
+    sample = pixels[::2, ::2].reshape(-1, 3).astype(np.uint32)
+    packed = (sample[:, 0] << 16) | (sample[:, 1] << 8) | sample[:, 2]
+    counts = np.unique(packed, return_counts=True)[1]
+    if len(counts) <= FLAT_TOP_COLORS:
+        return True
+    top = np.partition(counts, len(counts) - FLAT_TOP_COLORS)[-FLAT_TOP_COLORS:]
+    return top.sum() >= FLAT_COVERAGE * len(packed)
+
+
+def optimize_image(data, max_width, quality=JPEG_QUALITY):
+    """Downscale image bytes to max_width pixels and re-encode them for their content
+
+    Flat artwork becomes a palette PNG, images with transparency a PNG and everything else
+    a JPEG. The original bytes are kept if re-encoding saved nothing. Runs in a worker
+    process; returns (bytes, info) where info holds the format, pixel size, byte counts and
+    the milliseconds spent.
+    """
+    start = time.perf_counter()
+    with Image.open(io.BytesIO(data)) as img:
+        original_format = img.format
+        original_size = img.size
+        # JPEG from the API decodes straight at a reduced scale
+        img.draft('RGB', (max_width, max(1, img.height * max_width // img.width)))
+        has_alpha = img.mode in ('RGBA', 'LA', 'PA') or 'transparency' in img.info
+        img = img.convert('RGBA' if has_alpha else 'RGB')
+    if img.width > max_width:
+        height = max(1, round(img.height * max_width / img.width))
+        img = img.resize((max_width, height), Image.Resampling.LANCZOS, reducing_gap=3.0)
+
+    out = io.BytesIO()
+    if is_flat(np.asarray(img.convert('RGB'))):
+        fmt = 'PNG'
+        img.quantize(PALETTE_COLORS, method=Image.Quantize.FASTOCTREE, dither=Image.Dither.NONE).save(
+            out, 'PNG', optimize=True)
+    elif has_alpha:
+        fmt = 'PNG'
+        img.save(out, 'PNG', optimize=True)
+    else:
+        fmt = 'JPEG'
+        img.save(out, 'JPEG', quality=quality, optimize=True)
+    result = out.getvalue()
+    if len(result) >= len(data) and img.size == original_size:
+        result, fmt = data, original_format
+    return result, {
+        "format": fmt,
+        "width": img.width,
+        "height": img.height,
+        "original_bytes": len(data),
+        "bytes": len(result),
+        "ms": round((time.perf_counter() - start) * 1000, 1),
+    }
+
+
+def make_pool(max_workers=None):
+    """Process pool for optimize_image; workers start from a clean forkserver (or spawn) process
+
+    Forking the caller instead would copy its threads' locks and open connections, which in
+    a server with HTTP, job and SQLite threads can leave a worker deadlocked at birth.
+    """
+    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return ProcessPoolExecutor(max_workers=max_workers or os.cpu_count() or 1,
+                               mp_context=multiprocessing.get_context(method))
+
+
+class ImageOptimizer:
+    """Shrink images to the pixel size of their frame in a process pool before they are embedded
+
+    optimize() is called from the image worker threads, so each one waits only for its own
+    image while the pool re-encodes several slides' images on separate cores. Every image is
+    recorded with its byte counts and time for the per-slide report and print_summary.
+
+    A long-running process passes one warm pool from make_pool to every build; without one,
+    the optimizer starts its own and shuts it down in close().
+    """
+
+    def __init__(self, frame_width, dpi=DEFAULT_DPI, quality=JPEG_QUALITY, pool=None):
+        self.dpi = dpi
+        self.quality = quality
+        # frame_width is in EMU (914400 per inch)
+        self.max_width = max(1, round(frame_width / 914400 * dpi))
+        self._owns_pool = pool is None
+        self._pool = pool or make_pool()
+        # Requests of this build still queued or running, cancelled by close(wait=False)
+        self._pending = set()
+        # list.append is atomic, so worker threads need no lock
+        self.records = []
+
+    def optimize(self, image_stream, label=''):
+        """Return an optimized copy of image_stream, or image_stream itself if that fails"""
+        if image_stream is None:
+            return None
+        data = image_stream.getvalue()
+        with tracing.span('image.optimize', label=label, bytes=len(data)) as span:
+            future = self._pool.submit(optimize_image, data, self.max_width, self.quality)
+            self._pending.add(future)
+            try:
+                result, info = future.result()
+            except Exception as e:
+                print(f"  ⚠️  {label}: image embedded as is, optimizing it failed: {e}")
+                return image_stream
+            finally:
+                self._pending.discard(future)
+            span.set(optimized_bytes=info['bytes'], format=info['format'])
+        info['label'] = label
+        self.records.append(info)
+        print(f"  🗜️  {label}: {info['original_bytes'] // 1024} KB -> {info['bytes'] // 1024} KB "
+              f"{info['format']} {info['width']}x{info['height']} in {info['ms']:.0f} ms")
+        return io.BytesIO(result)
+
+    def wrap(self, generate, label):
+        """Wrap an image request so its result is optimized on the worker thread that made it
+
+        A batched request returns {slide_index: stream}; each slide's image is then labelled
+        by its slide number.
+        """
+        def run(*args, **kwargs):
+            result = generate(*args, **kwargs)
+            if isinstance(result, dict):
+                return {i: self.optimize(stream, f"Slide {i+1}") for i, stream in result.items()}
+            return self.optimize(result, label)
+        return run
+
+    def print_summary(self):
+        if not self.records:
+            return
+        before = sum(record['original_bytes'] for record in self.records)
+        after = sum(record['bytes'] for record in self.records)
+        cpu_ms = sum(record['ms'] for record in self.records)
+        print(f"🗜️  Images optimized for {self.dpi} dpi: {len(self.records)} images, "
+              f"{before / 1e6:.1f} MB -> {after / 1e6:.1f} MB "
+              f"(saved {(before - after) / 1e6:.1f} MB, {1 - after / max(1, before):.0%}), "
+              f"{cpu_ms / 1000:.1f}s of encoding")
+
+    def close(self, wait=True):
+        """Finish (or with wait=False, cancel) this build's requests; a shared pool stays up"""
+        if self._owns_pool:
+            self._pool.shutdown(wait=wait, cancel_futures=not wait)
+        elif not wait:
+            for future in list(self._pending):
+                future.cancel()
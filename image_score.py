@@ -0,0 +1,156 @@
+import io
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+import tracing
+from run_journal import atomic_write
+
+# Imagen returns at most four images per prompt (sampleCount)
+MAX_CANDIDATES = 4
+# Candidates are compared on a small grayscale copy; layout-level metrics don't need full resolution
+SCORE_SIZE = (256, 144)
+# Threads decoding one pass of more than MAX_CANDIDATES images
+DECODE_WORKERS = min(8, os.cpu_count() or 1)
+# Middle of the card, where the style prompt asks for room for text: left, top, right, bottom fractions
+TEXT_REGION = (0.1, 0.15, 0.9, 0.85)
+# A pixel counts as blank when it is this bright (0-1 luma) and not on an edge
+WHITE_LEVEL = 0.8
+# Sum of horizontal and vertical luma steps above which a pixel is on an edge
+EDGE_LEVEL = 0.08
+# Weights of whitespace in the text region, overall contrast and calm (1 - edge density)
+WEIGHTS = (0.6, 0.25, 0.15)
+
+
+def _decode_one(blob):
+    try:
+        with Image.open(io.BytesIO(blob)) as img:
+            # draft lets JPEG decode luma only, at a reduced scale; reducing_gap box-filters first
+            img.draft('L', SCORE_SIZE)
+            return np.asarray(img.convert('L').resize(SCORE_SIZE, Image.Resampling.BILINEAR, reducing_gap=2.0))
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None
+
+
+def decode_candidates(blobs):
+    """Decode image bytes into an (N, height, width) uint8 stack of SCORE_SIZE grayscale copies
+
+    Also returns a boolean array marking the images that could be decoded. Pillow releases
+    the GIL while decoding, so a large pass is spread over a few threads.
+    """
+    stack = np.zeros((len(blobs), SCORE_SIZE[1], SCORE_SIZE[0]), dtype=np.uint8)
+    valid = np.zeros(len(blobs), dtype=bool)
+    if len(blobs) > MAX_CANDIDATES:
+        with ThreadPoolExecutor(max_workers=min(DECODE_WORKERS, len(blobs))) as executor:
+            decoded = list(executor.map(_decode_one, blobs))
+    else:
+        decoded = [_decode_one(blob) for blob in blobs]
+    for n, pixels in enumerate(decoded):
+        if pixels is not None:
+            stack[n] = pixels
+            valid[n] = True
+    return stack, valid
+
+
+def score_candidates(stack):
+    """Score every image of an (N, height, width) luma stack at once; higher fits the layout better
+
+    Returns a dict of arrays of length N: whitespace (blank share of the text region),
+    contrast (RMS contrast, 1.0 at a standard deviation of half the range), edge_density
+    (share of edge pixels) and score, their weighted sum.
+    """
+    luma = stack.astype(np.float32) / 255.0
+    # Forward differences, cropped to a common (height-1, width-1) grid
+    steps = np.abs(np.diff(luma, axis=2))[:, :-1, :] + np.abs(np.diff(luma, axis=1))[:, :, :-1]
+    edges = steps > EDGE_LEVEL
+
+    _, height, width = edges.shape
+    left, top, right, bottom = TEXT_REGION
+    rows = slice(int(top * height), int(bottom * height))
+    cols = slice(int(left * width), int(right * width))
+    blank = (luma[:, :-1, :-1] > WHITE_LEVEL) & ~edges
+    whitespace = blank[:, rows, cols].mean(axis=(1, 2))
+    contrast = np.minimum(1.0, luma.std(axis=(1, 2)) / 0.5)
+    edge_density = edges.mean(axis=(1, 2))
+    score = WEIGHTS[0] * whitespace + WEIGHTS[1] * contrast + WEIGHTS[2] * (1.0 - edge_density)
+    return {"whitespace": whitespace, "contrast": contrast, "edge_density": edge_density, "score": score}
+
+
+class CandidatePicker:
+    """Ask for several images per prompt and keep the one that leaves the most room for text
+
+    pick() decodes and scores the candidates of any number of prompts in one vectorized pass,
+    so a batched request scores all of its slides together. Every pick is recorded with its
+    scores and timings for print_summary and write_report. Safe to share between threads;
+    decoding and the numpy work release the GIL, so workers score in parallel.
+    """
+
+    def __init__(self, count):
+        if not 1 <= count <= MAX_CANDIDATES:
+            raise ValueError(f"candidates must be between 1 and {MAX_CANDIDATES}")
+        self.count = count
+        # list.append is atomic, so worker threads need no lock
+        self.records = []
+        self.passes = []
+
+    def pick(self, groups, labels):
+        """Return the index of the best image in each group of image bytes"""
+        blobs = [blob for group in groups for blob in group]
+        start = time.perf_counter()
+        with tracing.span('image.score_decode', images=len(blobs)):
+            stack, valid = decode_candidates(blobs)
+        decoded = time.perf_counter()
+        with tracing.span('image.score', images=len(blobs)):
+            metrics = score_candidates(stack)
+            # An image that could not be decoded is only chosen if none could
+            scores = np.where(valid, metrics['score'], -np.inf)
+            ends = np.cumsum([len(group) for group in groups])
+            choices = [int(np.argmax(scores[end - len(group):end])) for group, end in zip(groups, ends)]
+        scored = time.perf_counter()
+
+        decode_ms = (decoded - start) * 1000
+        score_ms = (scored - decoded) * 1000
+        self.passes.append((decode_ms, score_ms))
+        for label, group, end, best in zip(labels, groups, ends, choices):
+            first = end - len(group)
+            self.records.append({
+                "label": label,
+                "chosen": best,
+                "candidates": [
+                    {name: round(float(values[n]), 4) for name, values in metrics.items()} if valid[n] else None
+                    for n in range(first, end)
+                ],
+                # Timings of the whole pass, shared by every prompt scored in it
+                "pass_images": len(blobs),
+                "decode_ms": round(decode_ms, 2),
+                "score_ms": round(score_ms, 2),
+            })
+        return choices
+
+    def summary(self):
+        return {
+            "prompts": len(self.records),
+            "images": sum(len(record['candidates']) for record in self.records),
+            "passes": len(self.passes),
+            "decode_ms": round(sum(decode_ms for decode_ms, _ in self.passes), 2),
+            "score_ms": round(sum(score_ms for _, score_ms in self.passes), 2),
+            "improved": sum(1 for record in self.records if record['chosen'] != 0),
+        }
+
+    def print_summary(self):
+        if not self.records:
+            return
+        totals = self.summary()
+        print(f"🎯 Picked the best of {self.count} for {totals['prompts']} images: "
+              f"{totals['images']} candidates decoded in {totals['decode_ms']:.0f} ms, "
+              f"scored in {totals['score_ms']:.0f} ms; {totals['improved']} picks beat the first candidate")
+
+    def write_report(self, path):
+        report = {"candidates": self.count, "weights": dict(zip(("whitespace", "contrast", "calm"), WEIGHTS)),
+                  **self.summary(), "picks": self.records}
+        atomic_write(path, json.dumps(report, ensure_ascii=False, indent=2).encode('utf-8'))
+        return path
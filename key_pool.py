@@ -0,0 +1,179 @@
+import threading
+import time
+
+# A key's bucket holds this many seconds of its budget, so a fresh key can burst briefly
+BURST_SECONDS = 1.0
+# A key that returns 429 without Retry-After rests 1s, 2s, 4s... while the 429s continue
+KEY_BACKOFF_BASE = 1.0
+KEY_BACKOFF_MAX = 60.0
+# .env lines starting with this list the keys to pool, comma-separated
+KEYS_PREFIX = 'GEMINI_API_KEYS='
+
+
+class ApiKey:
+    """One API key with an optional requests-per-minute budget tracked as a token bucket"""
+
+    def __init__(self, key, rpm=None):
+        self.key = key
+        self.rpm = rpm
+        self.capacity = max(1.0, rpm / 60.0 * BURST_SECONDS) if rpm else None
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.cooldown_until = 0.0
+        self.in_flight = 0
+        self.disabled = False
+        self.requests = 0
+        self.throttled = 0
+        self.strikes = 0
+
+    @property
+    def name(self):
+        return f"...{self.key[-4:]}"
+
+    def _refill(self, now):
+        if self.rpm:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rpm / 60.0)
+        self.updated = now
+
+    def wait_time(self, now):
+        """Seconds until this key may send a request (0 if it can send now)"""
+        wait = max(0.0, self.cooldown_until - now)
+        if self.rpm and self.tokens < 1.0:
+            wait = max(wait, (1.0 - self.tokens) * 60.0 / self.rpm)
+        return wait
+
+
+class KeyPool:
+    """Hands out whichever key has budget left, so throughput grows with the number of keys
+
+    acquire() blocks only when every key is out of tokens or cooling down after a 429.
+    A key that is throttled or rejected is set aside without stalling requests on the others.
+    """
+
+    def __init__(self, keys):
+        self.keys = [key if isinstance(key, ApiKey) else ApiKey(*key) for key in keys]
+        self._cond = threading.Condition()
+
+    def __len__(self):
+        return sum(1 for key in self.keys if not key.disabled)
+
+    def __getstate__(self):
+        # Only the configuration crosses process boundaries; each process keeps its own buckets
+        return [(key.key, key.rpm) for key in self.keys if not key.disabled]
+
+    def __setstate__(self, state):
+        self.__init__(state)
+
+    def split(self, parts):
+        """Return a pool with each key's budget divided by parts, for one of parts processes"""
+        return KeyPool([(key.key, key.rpm / parts if key.rpm else None)
+                        for key in self.keys if not key.disabled])
+
+    def acquire(self, deadline=None):
+        """Take a token from the least busy key that has one, waiting if none do
+
+        Returns None if no key frees up before deadline (a time.monotonic() value).
+        """
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                ready = []
+                wait = None
+                for key in self.keys:
+                    if key.disabled:
+                        continue
+                    key._refill(now)
+                    key_wait = key.wait_time(now)
+                    if key_wait == 0:
+                        ready.append(key)
+                    elif wait is None or key_wait < wait:
+                        wait = key_wait
+                if ready:
+                    key = min(ready, key=lambda key: (key.in_flight, -(key.tokens or 0)))
+                    if key.rpm:
+                        key.tokens -= 1.0
+                    key.in_flight += 1
+                    key.requests += 1
+                    return key
+                if wait is None:
+                    raise RuntimeError("every API key in the pool was rejected")
+                if deadline is not None and now + wait > deadline:
+                    return None
+                self._cond.wait(wait)
+
+    def release(self, key, throttled=False, retry_after=None):
+        """Return key after a request, resting it for retry_after seconds or a backoff if it was throttled"""
+        with self._cond:
+            key.in_flight -= 1
+            if throttled:
+                key.throttled += 1
+                if retry_after is None:
+                    retry_after = min(KEY_BACKOFF_MAX, KEY_BACKOFF_BASE * (2 ** key.strikes))
+                key.strikes += 1
+                key.cooldown_until = max(key.cooldown_until, time.monotonic() + retry_after)
+            else:
+                key.strikes = 0
+            self._cond.notify_all()
+
+    def disable(self, key):
+        """Drop a key the API rejected, unless it is the last usable one (then returns False)"""
+        with self._cond:
+            if len(self) < 2:
+                return False
+            key.in_flight -= 1
+            key.disabled = True
+            self._cond.notify_all()
+            return True
+
+    def print_summary(self):
+        if len(self.keys) < 2:
+            return
+        print(f"🔑 API keys: {len(self)} of {len(self.keys)} usable")
+        for key in self.keys:
+            budget = f"{key.rpm:g} rpm" if key.rpm else "no limit"
+            state = ", rejected" if key.disabled else ""
+            print(f"  {key.name} ({budget}): {key.requests} requests, {key.throttled} throttled{state}")
+
+
+def parse_key_line(line):
+    """Return (key, rpm) from a '<key>' or '<key> <requests per minute>' line"""
+    fields = line.split()
+    if len(fields) == 1:
+        return fields[0], None
+    if len(fields) == 2:
+        try:
+            rpm = float(fields[1])
+        except ValueError:
+            rpm = 0
+        if rpm > 0:
+            return fields[0], rpm
+    # The line holds a secret, so it is not echoed back
+    raise ValueError("expected '<key>' or '<key> <requests per minute>'")
+
+
+def load_key_pool(path='.env'):
+    """Build a KeyPool from the keys in path, or return None if there are no keys
+
+    Several keys are pooled only when listed after KEYS_PREFIX, comma-separated, on one or
+    more lines (e.g. "GEMINI_API_KEYS=key1 60, key2"). Without such a line the last
+    non-comment line is the only key, as it always was, so older keys left above it stay unused.
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            lines = [(number, line.strip()) for number, line in enumerate(f, start=1)
+                     if line.strip() and not line.strip().startswith('#')]
+    except FileNotFoundError:
+        print(f"Error: {path} file not found.")
+        return None
+    pooled = [(number, line[len(KEYS_PREFIX):]) for number, line in lines if line.startswith(KEYS_PREFIX)]
+    if pooled:
+        entries = [(number, entry) for number, keys in pooled for entry in keys.split(',') if entry.strip()]
+    else:
+        entries = lines[-1:]
+    keys = []
+    for number, entry in entries:
+        try:
+            keys.append(parse_key_line(entry))
+        except ValueError as e:
+            print(f"⚠️  Skipping a key on {path} line {number}: {e}")
+    return KeyPool(keys) if keys else None
@@ -0,0 +1,176 @@
+import hashlib
+import os
+import zipfile
+
+from pptx import Presentation
+from pptx.opc.constants import CONTENT_TYPE as CT
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+from pptx.opc.oxml import serialize_part_xml
+from pptx.opc.package import Part
+from pptx.opc.packuri import CONTENT_TYPES_URI, PACKAGE_URI, PackURI
+from pptx.opc.serialized import _ContentTypesItem
+
+# Relationships from a slide to parts the whole deck shares; they are written once by close()
+SHARED_RELTYPES = {RT.SLIDE_LAYOUT, RT.NOTES_MASTER, RT.SLIDE}
+MEDIA_RELTYPES = {RT.IMAGE, RT.MEDIA, RT.VIDEO}
+# Already compressed formats are stored rather than deflated again
+STORED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'mp4', 'mov', 'wmv'}
+FIRST_SLIDE_ID = 256
+
+
+class _WrittenPart:
+    """Partname and content type of a part already in the zip, for [Content_Types].xml"""
+    __slots__ = ('partname', 'content_type')
+
+    def __init__(self, partname, content_type):
+        self.partname = partname
+        self.content_type = content_type
+
+
+class StreamingPptxWriter:
+    """Write finished slides of prs straight into the .pptx zip and release them
+
+    python-pptx holds every slide, notes page and image until prs.save(). Here each
+    finished slide is written once, together with its notes and any media not already
+    in the file (media are deduplicated by SHA-1), and then removed from prs so it can
+    be garbage collected. close() writes the shared parts, presentation.xml with the
+    slide list, and [Content_Types].xml. Slides may be written in any order; index is
+    the slide's 0-based position in the deck. Slides may also come from other
+    presentations built on the same template (see merge_presentations).
+    """
+
+    def __init__(self, prs, path):
+        self.prs = prs
+        self.path = path
+        self._zip = zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED, strict_timestamps=False)
+        self._written_parts = []
+        self._slide_indices = []
+        self._media = {}
+        self._shared_partnames = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+    def write_slide(self, slide, index):
+        slide_part = slide.part
+        foreign = slide_part.package is not self.prs.part.package
+        notes_part = None
+        for rel in slide_part.rels.values():
+            if rel.is_external:
+                continue
+            if rel.reltype in SHARED_RELTYPES:
+                if foreign:
+                    self._check_shared(rel, index)
+            elif rel.reltype == RT.NOTES_SLIDE:
+                notes_part = rel.target_part
+                if foreign:
+                    for notes_rel in notes_part.rels.values():
+                        if notes_rel.reltype == RT.NOTES_MASTER:
+                            self._check_shared(notes_rel, index)
+            elif rel.reltype in MEDIA_RELTYPES:
+                self._write_media(rel.target_part)
+            else:
+                raise ValueError(f"Cannot stream slide {index+1}: unsupported relationship {rel.reltype}")
+
+        # Partnames are assigned at write time, as prs.save() would number them
+        slide_part.partname = PackURI(f"/ppt/slides/slide{index+1}.xml")
+        if notes_part is not None:
+            notes_part.partname = PackURI(f"/ppt/notesSlides/notesSlide{index+1}.xml")
+            self._write_part(notes_part)
+        self._write_part(slide_part)
+        self._slide_indices.append(index)
+        self._release(slide_part)
+
+    def _check_shared(self, rel, index):
+        # A slide from another presentation keeps pointing at its layout and notes master by
+        # partname, so the same parts must exist in the presentation being written
+        if self._shared_partnames is None:
+            self._shared_partnames = {part.partname for part in self.prs.part.package.iter_parts()}
+        if rel.target_partname not in self._shared_partnames:
+            raise ValueError(f"Cannot write slide {index+1}: {rel.target_partname} is not in the target presentation")
+
+    def _write_media(self, part):
+        sha1 = hashlib.sha1(part.blob).hexdigest()
+        partname = self._media.get(sha1)
+        if partname is None:
+            partname = PackURI(f"/ppt/media/image{len(self._media) + 1}.{part.partname.ext}")
+            self._media[sha1] = partname
+            part.partname = partname
+            self._write_part(part)
+        else:
+            part.partname = partname
+
+    def _write_part(self, part):
+        compress = zipfile.ZIP_STORED if part.partname.ext.lower() in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+        self._zip.writestr(part.partname.membername, part.blob, compress_type=compress)
+        if part._rels:
+            self._zip.writestr(part.partname.rels_uri.membername, part.rels.xml)
+        self._written_parts.append(_WrittenPart(part.partname, part.content_type))
+
+    def _release(self, slide_part):
+        prs_part = slide_part.package.presentation_part
+        sld_id_lst = prs_part._element.sldIdLst
+        for sld_id in sld_id_lst:
+            if prs_part.related_part(sld_id.rId) is slide_part:
+                sld_id_lst.remove(sld_id)
+                prs_part.drop_rel(sld_id.rId)
+                return
+
+    def close(self):
+        """Write the shared parts, the slide list and the content types, and close the file"""
+        prs_part = self.prs.part
+        package = prs_part.package
+        sld_id_lst = self.prs.slides._sldIdLst
+        if len(sld_id_lst):
+            raise ValueError(f"{len(sld_id_lst)} slides were added but never written")
+
+        # Stand-in parts let python-pptx serialize the presentation relationships to the written slides
+        stand_ins = set()
+        for position, index in enumerate(sorted(self._slide_indices)):
+            stand_in = Part(PackURI(f"/ppt/slides/slide{index+1}.xml"), CT.PML_SLIDE, package)
+            stand_ins.add(stand_in)
+            rId = prs_part.rels._add_relationship(RT.SLIDE, stand_in)
+            sld_id_lst._add_sldId(id=FIRST_SLIDE_ID + position, rId=rId)
+
+        parts = [part for part in package.iter_parts() if part not in stand_ins]
+        for part in parts:
+            self._zip.writestr(part.partname.membername, part.blob)
+            if part._rels:
+                self._zip.writestr(part.partname.rels_uri.membername, part.rels.xml)
+        self._zip.writestr(PACKAGE_URI.rels_uri.membername, package._rels.xml)
+        content_types = _ContentTypesItem.xml_for(self._written_parts + parts)
+        self._zip.writestr(CONTENT_TYPES_URI.membername, serialize_part_xml(content_types))
+        self._zip.close()
+
+    def abort(self):
+        """Close and delete the partly written file"""
+        self._zip.close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def merge_presentations(paths, output_file):
+    """Concatenate the slides of presentations made from the same template into output_file
+
+    The first file provides the masters, layouts and presentation properties. Slide, notes
+    and media relationships are renumbered for the merged package, identical media are
+    stored once, and only one input is held in memory at a time. Returns the slide count.
+    """
+    base = Presentation(paths[0])
+    count = 0
+    with StreamingPptxWriter(base, output_file) as writer:
+        for position, path in enumerate(paths):
+            prs = base if position == 0 else Presentation(path)
+            for slide in list(prs.slides):
+                writer.write_slide(slide, count)
+                count += 1
+    return count
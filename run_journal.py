@@ -0,0 +1,82 @@
+import json
+import os
+import threading
+from datetime import datetime
+
+# Version 2 checkpoints asset store keys; version 1 pointed at files under generated_images/
+JOURNAL_VERSION = 2
+
+
+def journal_path(output_file_base):
+    return f"{output_file_base}.journal.jsonl"
+
+
+def atomic_write(path, data):
+    """Write data to path so readers only ever see the old file or the complete new one"""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class RunJournal:
+    """Append-only log of each slide's finished image for one deck, synced to disk per entry
+
+    Entries are keyed by slide index and the image cache key, which is also the image's key in
+    the AssetStore, so a resumed run only trusts a checkpoint whose prompt, model and
+    parameters are unchanged.
+    """
+
+    def __init__(self, output_file_base, resume=False):
+        self.path = journal_path(output_file_base)
+        self.entries = {}
+        self._lock = threading.Lock()
+        if resume:
+            self._load()
+        fresh = not self.entries
+        self._file = open(self.path, 'w' if fresh else 'a', encoding='utf-8')
+        if fresh:
+            self._append({"version": JOURNAL_VERSION, "deck": output_file_base,
+                          "started": datetime.now().isoformat(timespec='seconds')})
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return
+        for number, line in enumerate(lines):
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # The last line may be cut short if the previous run died mid-write
+                continue
+            if number == 0 and entry.get('version') != JOURNAL_VERSION:
+                return
+            if 'slide' in entry:
+                self.entries[entry['slide']] = entry
+
+    def _append(self, entry):
+        with self._lock:
+            self._file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def has_image(self, slide_index, image_key):
+        """True if the slide's image for image_key was checkpointed as stored"""
+        entry = self.entries.get(slide_index)
+        return bool(entry and entry.get('image_key') == image_key and entry.get('stored'))
+
+    def record(self, slide_index, image_key, stored):
+        """Checkpoint whether a slide's image is in the asset store (False when none could be generated)"""
+        entry = {"slide": slide_index, "image_key": image_key, "stored": stored}
+        self.entries[slide_index] = entry
+        self._append(entry)
+
+    def finish(self, output_file):
+        self._append({"output_file": output_file, "completed": datetime.now().isoformat(timespec='seconds')})
+
+    def close(self):
+        self._file.close()
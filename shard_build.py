@@ -0,0 +1,149 @@
+import argparse
+import contextlib
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+
+import http_client
+from key_pool import load_key_pool
+from pptx_stream import merge_presentations
+from slide_source import iter_slides
+
+DEFAULT_SHARD_SIZE = 250
+
+
+def render_shard(shard_index, slides, shard_dir, options):
+    """Render one shard into its own .pptx in a worker process, logging to shard_<n>.log"""
+    # Imported here so the parent process does not pay for python-pptx
+    import generate_ppt_with_images_rest as generator
+
+    start = time.perf_counter()
+    base = os.path.join(shard_dir, f"shard_{shard_index:05d}")
+    with open(f"{base}.log", 'w', encoding='utf-8') as log, contextlib.redirect_stdout(log):
+        output_file = generator.create_presentation(slides=slides, output_file_base=base, **options)
+    if output_file is None:
+        raise RuntimeError(f"shard {shard_index} produced no presentation, see {base}.log")
+    return output_file, len(slides), time.perf_counter() - start
+
+
+def iter_shards(slides, shard_size):
+    shard = []
+    for slide_data in slides:
+        shard.append(slide_data)
+        if len(shard) >= shard_size:
+            yield shard
+            shard = []
+    if shard:
+        yield shard
+
+
+def create_presentation_sharded(json_file='slides.json', output_file_base='nano_banana_presentation', slides=None,
+                                shard_size=DEFAULT_SHARD_SIZE, workers=None, image_concurrency=8,
+                                keep_shards=False, **options):
+    """Render contiguous shards of the deck in a process pool and merge them into one .pptx
+
+    options are passed to generate_ppt_with_images_rest.create_presentation for each shard.
+    Slides are read lazily, so shards start rendering while the input is still being parsed,
+    and at most two shards per worker are read ahead of the pool, so memory stays bounded
+    however long the input is. Returns the merged output file name.
+    """
+    if slides is None:
+        if json_file != '-' and not os.path.exists(json_file):
+            print(f"Error: {json_file} not found.")
+            return None
+        slides = iter_slides(json_file)
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    output_file = f"{output_file_base}_{timestamp}.pptx"
+    shard_dir = tempfile.mkdtemp(prefix='shards_', dir=os.path.dirname(os.path.abspath(output_file)))
+    # Each shard's slides are released as they finish, so worker memory stays flat as well
+    options.setdefault('stream_output', True)
+    if options.get('generate_images', True) and 'api_key' not in options:
+        # Each process gets an equal share of every key's requests-per-minute budget
+        keys = load_key_pool()
+        if keys:
+            options['api_key'] = keys.split(workers or os.cpu_count() or 1)
+
+    context = multiprocessing.get_context()
+    # One semaphore for all workers keeps the total number of in-flight API calls bounded
+    request_limiter = context.BoundedSemaphore(image_concurrency)
+    max_pending = 2 * (workers or os.cpu_count() or 1)
+    start = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                 initializer=http_client.set_request_limiter,
+                                 initargs=(request_limiter,)) as pool:
+            shards = enumerate(iter_shards(slides, shard_size))
+            pending = {}
+            finished = {}
+            exhausted = False
+            try:
+                while True:
+                    # Read the next shard only when fewer than max_pending are queued or rendering
+                    while not exhausted and len(pending) < max_pending:
+                        next_shard = next(shards, None)
+                        if next_shard is None:
+                            exhausted = True
+                            break
+                        shard_index, shard = next_shard
+                        pending[pool.submit(render_shard, shard_index, shard, shard_dir, options)] = shard_index
+                    if not pending:
+                        break
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        shard_index = pending.pop(future)
+                        shard_file, count, seconds = future.result()
+                        print(f"  ✅ Shard {shard_index+1}: {count} slides in {seconds:.1f}s")
+                        finished[shard_index] = shard_file
+            except BaseException:
+                # Don't render the queued shards of a build that has already failed
+                for future in pending:
+                    future.cancel()
+                raise
+            shard_files = [finished[shard_index] for shard_index in sorted(finished)]
+        rendered = time.perf_counter()
+        if not shard_files:
+            print("Error: no slides to render")
+            return None
+
+        print(f"\n🧩 Merging {len(shard_files)} shards...")
+        count = merge_presentations(shard_files, output_file)
+    finally:
+        if keep_shards:
+            print(f"📁 Shards kept in {shard_dir}")
+        else:
+            shutil.rmtree(shard_dir, ignore_errors=True)
+
+    merged = time.perf_counter()
+    print(f"\n✅ Presentation saved to {output_file}")
+    print(f"📊 Created {count} slides: render {rendered - start:.1f}s "
+          f"({count / (rendered - start):.0f} slides/s), merge {merged - rendered:.1f}s")
+    return output_file
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render a large deck in parallel shards and merge them into one .pptx.")
+    parser.add_argument('json_file', nargs='?', default='slides.json', help="slides JSON or JSONL ('-' for stdin)")
+    parser.add_argument('--output', default='nano_banana_presentation', help="output file name prefix")
+    parser.add_argument('--shard-size', type=int, default=DEFAULT_SHARD_SIZE, help="slides per shard")
+    parser.add_argument('--workers', type=int, default=None, help="render processes (default: CPU count)")
+    parser.add_argument('--image-concurrency', type=int, default=8,
+                        help="maximum image requests in flight across all shards")
+    parser.add_argument('--no-images', action='store_true', help="build a text-only deck with placeholders")
+    parser.add_argument('--keep-shards', action='store_true', help="keep the per-shard decks and logs")
+    args = parser.parse_args()
+
+    output_file = create_presentation_sharded(
+        args.json_file, args.output, shard_size=args.shard_size, workers=args.workers,
+        image_concurrency=args.image_concurrency, keep_shards=args.keep_shards,
+        generate_images=not args.no_images, max_workers=args.image_concurrency, save_images=False)
+    sys.exit(0 if output_file else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import queue
+import time
+
+
+class SlidePipeline:
+    """Finish laid-out slides on the calling thread as soon as their image requests complete
+
+    The producer lays out each slide's text and then calls add() with the slide's image
+    future (or None). finish_slide(slide_index, image) is always called on the thread that
+    calls add/poll/wait_all, since python-pptx objects are not thread-safe. Several slides
+    may share one future whose result is a {slide_index: image} dict (batched requests).
+    """
+
+    def __init__(self, finish_slide):
+        self.finish_slide = finish_slide
+        self._done = queue.SimpleQueue()
+        self._waiting = {}
+
+    def add(self, slide_index, future):
+        if future is None or future.done():
+            self._finish(slide_index, future)
+            return
+        if future not in self._waiting:
+            self._waiting[future] = [slide_index]
+            future.add_done_callback(self._done.put)
+        else:
+            self._waiting[future].append(slide_index)
+
+    def poll(self):
+        """Finish every slide whose image has already arrived, without blocking"""
+        while True:
+            try:
+                future = self._done.get_nowait()
+            except queue.Empty:
+                return
+            self._finish_waiting(future)
+
+    def wait_one(self, deadline=None):
+        """Block until at least one waiting image arrives and finish its slides
+
+        Returns False if deadline (a time.monotonic() value) passed first.
+        """
+        if self._waiting:
+            future = self._next(deadline)
+            if future is None:
+                return False
+            self._finish_waiting(future)
+        self.poll()
+        return True
+
+    def wait_all(self, deadline=None):
+        """Block until every added slide has been finished; returns False if deadline passed first"""
+        while self._waiting:
+            future = self._next(deadline)
+            if future is None:
+                return False
+            self._finish_waiting(future)
+        return True
+
+    def expire(self):
+        """Finish every waiting slide without its image, cancelling requests that have not started"""
+        self.poll()
+        waiting, self._waiting = self._waiting, {}
+        for future, slide_indices in waiting.items():
+            future.cancel()
+            for slide_index in slide_indices:
+                self.finish_slide(slide_index, None)
+
+    def _next(self, deadline):
+        if deadline is None:
+            return self._done.get()
+        try:
+            return self._done.get(timeout=max(0.0, deadline - time.monotonic()))
+        except queue.Empty:
+            return None
+
+    @property
+    def pending(self):
+        return sum(len(indices) for indices in self._waiting.values())
+
+    def _finish_waiting(self, future):
+        for slide_index in self._waiting.pop(future, []):
+            self._finish(slide_index, future)
+
+    def _finish(self, slide_index, future):
+        image = None
+        if future is not None:
+            try:
+                image = future.result()
+            except Exception as e:
+                print(f"  ❌ Image request for slide {slide_index+1} failed: {e}")
+            if isinstance(image, dict):
+                image = image.pop(slide_index, None)
+        self.finish_slide(slide_index, image)
@@ -0,0 +1,127 @@
+import json
+import re
+import sys
+
+READ_SIZE = 64 * 1024
+JSONL_EXTENSIONS = ('.jsonl', '.ndjson')
+
+_decoder = json.JSONDecoder()
+# Only number characters left before the end of the buffer
+_NUMBER_TAIL = re.compile(r'[0-9+\-.eE]*\Z')
+
+
+def is_jsonl(json_file):
+    return json_file == '-' or json_file.lower().endswith(JSONL_EXTENSIONS)
+
+
+def iter_jsonl_slides(stream):
+    """Yield one slide per non-blank line"""
+    for line_number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            raise ValueError(f"line {line_number}: {e}") from None
+
+
+class _Reader:
+    """Text buffer over a stream, refilled on demand and trimmed behind the parse position"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        if self.eof:
+            return False
+        chunk = self.stream.read(READ_SIZE)
+        if not chunk:
+            self.eof = True
+            return False
+        if self.pos > READ_SIZE:
+            self.buffer = self.buffer[self.pos:]
+            self.pos = 0
+        self.buffer += chunk
+        return True
+
+    def peek(self):
+        """Return the next non-whitespace character without consuming it ('' at end of input)"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in ' \t\r\n':
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill():
+                return ''
+
+    def expect(self, chars):
+        char = self.peek()
+        if not char or char not in chars:
+            raise ValueError(f"expected one of {chars!r} but found {char or 'end of input'!r}")
+        self.pos += 1
+        return char
+
+    def value(self):
+        """Decode one complete JSON value, reading more input until it fits in the buffer"""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise
+                continue
+            # A number or literal cut off by the buffer end would decode as a shorter one,
+            # e.g. "12" of "12.5e3"; valid JSON never follows a value with these characters
+            if _NUMBER_TAIL.match(self.buffer, end) and self.fill():
+                continue
+            self.pos = end
+            return value
+
+
+def _iter_array(reader):
+    if reader.peek() == ']':
+        reader.pos += 1
+        return
+    while True:
+        yield reader.value()
+        if reader.expect(',]') == ']':
+            return
+
+
+def iter_json_slides(stream):
+    """Yield slides from a top-level list or {"slides": [...]} without parsing the whole document"""
+    reader = _Reader(stream)
+    if reader.expect('[{') == '[':
+        yield from _iter_array(reader)
+        return
+    if reader.peek() == '}':
+        raise ValueError('no "slides" key in the top-level object')
+    while True:
+        key = reader.value()
+        reader.expect(':')
+        if key == 'slides':
+            reader.expect('[')
+            # Anything after the slides array is never read
+            yield from _iter_array(reader)
+            return
+        reader.value()
+        if reader.expect(',}') == '}':
+            raise ValueError('no "slides" key in the top-level object')
+
+
+def iter_slides(json_file):
+    """Yield slides one at a time from a JSONL file (one slide per line, '-' for stdin) or a JSON file"""
+    stream = sys.stdin if json_file == '-' else open(json_file, 'r', encoding='utf-8')
+    try:
+        if is_jsonl(json_file):
+            yield from iter_jsonl_slides(stream)
+        else:
+            yield from iter_json_slides(stream)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
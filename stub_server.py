@@ -0,0 +1,387 @@
+import argparse
+import base64
+import json
+import math
+import random
+import re
+import struct
+import sys
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# /v1beta/models/<model>:<method>
+MODEL_PATH = re.compile(r'^/v1(?:beta)?/models/(?P<model>[^/:]+):(?P<method>predict|generateContent|streamGenerateContent)$')
+
+IMAGE_VARIANTS = 4
+# Characters per streamed text event
+TEXT_PIECE = 24
+SLIDE_SEPARATOR = ',\n  '
+
+
+def parse_latency(spec):
+    """Turn 'fixed:S', 'uniform:LO,HI', 'normal:MEAN,STDDEV' or 'lognormal:MEDIAN,SIGMA' into a sampler (seconds)"""
+    kind, _, args = spec.partition(':')
+    values = [float(v) for v in args.split(',')] if args else []
+    if kind == 'fixed':
+        (delay,) = values or [0.0]
+        return lambda rng: delay
+    if kind == 'uniform':
+        low, high = values
+        return lambda rng: rng.uniform(low, high)
+    if kind == 'normal':
+        mean, stddev = values
+        return lambda rng: max(0.0, rng.gauss(mean, stddev))
+    if kind == 'lognormal':
+        median, sigma = values
+        return lambda rng: rng.lognormvariate(0.0, sigma) * median
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+
+def make_png(width, height, seed=0, noise_bits=4):
+    """Gradient PNG with random low bits so it compresses about as badly as a generated photo"""
+    rng = random.Random(seed)
+    row_bytes = width * 3
+    ramp = bytes(255 * x // max(1, width - 1) for x in range(width))
+    mask = int.from_bytes(bytes([(1 << noise_bits) - 1]) * row_bytes, 'big') if noise_bits else 0
+    rows = []
+    for y in range(height):
+        row = bytearray(row_bytes)
+        row[0::3] = ramp
+        row[1::3] = bytes([255 * y // max(1, height - 1)]) * width
+        row[2::3] = bytes([(seed * 64) & 0xFF]) * width
+        if mask:
+            noisy = int.from_bytes(row, 'big') ^ (int.from_bytes(rng.randbytes(row_bytes), 'big') & mask)
+            row = noisy.to_bytes(row_bytes, 'big')
+        rows.append(b'\x00' + bytes(row))
+
+    def chunk(tag, data):
+        body = tag + data
+        return struct.pack('>I', len(data)) + body + struct.pack('>I', zlib.crc32(body) & 0xFFFFFFFF)
+
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header)
+            + chunk(b'IDAT', zlib.compress(b''.join(rows), 6)) + chunk(b'IEND', b''))
+
+
+def is_text_request(payload):
+    """True for a generateContent call asking for JSON text (a slide deck) rather than an image"""
+    return (payload.get('generationConfig') or {}).get('responseMimeType') == 'application/json'
+
+
+def requested_slides(payload):
+    """The slide count asked for in the prompt ('... 8 slides ...'), 5 if none is given"""
+    texts = [part.get('text', '') for content in payload.get('contents') or []
+             for part in content.get('parts') or []]
+    match = re.search(r'(\d+) slides', ' '.join(texts))
+    return int(match.group(1)) if match else 5
+
+
+def deck_text(slide_count):
+    """A JSON array of slides as a text model would write it, with quotes and braces inside strings"""
+    slides = [json.dumps({
+        "title": f"Stub slide {number}",
+        "content": [f"Point {number}.1 with \"quotes\"", f"Point {number}.2 with {{braces}}"],
+        "image_prompt": f"A schematic diagram for stub slide {number}",
+    }, ensure_ascii=False) for number in range(1, slide_count + 1)]
+    return '[\n  ' + SLIDE_SEPARATOR.join(slides) + '\n]'
+
+
+class StubConfig:
+    """Behaviour of the stub: latency distribution, injected failures, per-key quota, image size and text speed"""
+
+    def __init__(self, latency='fixed:0', rate_429=0.0, rate_5xx=0.0, retry_after=1,
+                 image_size=(1408, 768), noise_bits=4, seed=None, key_rpm=None, slide_seconds=0.0):
+        self.latency = latency
+        self.sample_latency = parse_latency(latency)
+        self.rate_429 = rate_429
+        self.rate_5xx = rate_5xx
+        self.retry_after = retry_after
+        self.image_size = image_size
+        self.rng = random.Random(seed)
+        self.rng_lock = threading.Lock()
+        # Like the real API, each key gets its own requests-per-minute quota (a two-second bucket)
+        self.key_rpm = key_rpm
+        self.key_buckets = {}
+        self.key_lock = threading.Lock()
+        # Time a text model takes to write each slide of a requested deck
+        self.slide_seconds = slide_seconds
+
+        width, height = image_size
+        # A few distinct images, encoded once: the stub should not be the bottleneck it measures
+        self.images = [base64.b64encode(make_png(width, height, seed=i, noise_bits=noise_bits)).decode('ascii')
+                       for i in range(IMAGE_VARIANTS)]
+
+    def draw(self):
+        """Return (delay seconds, injected status or None, image variant index) for one request"""
+        with self.rng_lock:
+            delay = self.sample_latency(self.rng)
+            roll = self.rng.random()
+            variant = self.rng.randrange(len(self.images))
+        status = None
+        if roll < self.rate_429:
+            status = 429
+        elif roll < self.rate_429 + self.rate_5xx:
+            status = 503
+        return delay, status, variant
+
+    def admit(self, key):
+        """Return 0 if key is within its quota, else the seconds until it is"""
+        if not self.key_rpm:
+            return 0
+        rate = self.key_rpm / 60.0
+        capacity = max(2.0, 2 * rate)
+        now = time.monotonic()
+        with self.key_lock:
+            tokens, updated = self.key_buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            if tokens < 1.0:
+                self.key_buckets[key] = (tokens, now)
+                return (1.0 - tokens) / rate
+            self.key_buckets[key] = (tokens - 1.0, now)
+            return 0
+
+
+class StubStats:
+    """Per-request log the benchmark reads back through GET /stats"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = []
+
+    def record(self, model, method, status, latency, images, response_bytes):
+        with self.lock:
+            self.requests.append({
+                "model": model, "method": method, "status": status,
+                "latency": round(latency, 6), "images": images, "bytes": response_bytes,
+            })
+
+    def snapshot(self):
+        with self.lock:
+            return list(self.requests)
+
+    def reset(self):
+        with self.lock:
+            self.requests.clear()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'GeminiStub/1.0'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status, body, headers=None):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=UTF-8')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+        return len(data)
+
+    def _error(self, status, message, headers=None):
+        statuses = {400: 'INVALID_ARGUMENT', 403: 'PERMISSION_DENIED', 404: 'NOT_FOUND',
+                    429: 'RESOURCE_EXHAUSTED', 503: 'UNAVAILABLE'}
+        return self._send_json(status, {"error": {"code": status, "message": message,
+                                                  "status": statuses.get(status, 'INTERNAL')}}, headers)
+
+    def do_GET(self):
+        if urlparse(self.path).path == '/stats':
+            self._send_json(200, {"requests": self.server.stats.snapshot()})
+        else:
+            self._error(404, "Not found")
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+
+        if url.path == '/stats/reset':
+            self.server.stats.reset()
+            self._send_json(200, {})
+            return
+
+        match = MODEL_PATH.match(url.path)
+        if not match:
+            self._error(404, f"Unknown path {url.path}")
+            return
+        model, method = match.group('model'), match.group('method')
+
+        start = time.perf_counter()
+        key = (parse_qs(url.query).get('key') or [self.headers.get('x-goog-api-key')])[0]
+        if not key:
+            sent = self._error(403, "Method doesn't allow unregistered callers")
+            self.server.stats.record(model, method, 403, time.perf_counter() - start, 0, sent)
+            return
+        quota_wait = self.server.config.admit(key)
+        if quota_wait:
+            sent = self._error(429, "Quota exceeded for requests per minute per key.",
+                               {"Retry-After": str(math.ceil(quota_wait))})
+            self.server.stats.record(model, method, 429, time.perf_counter() - start, 0, sent)
+            return
+        try:
+            payload = json.loads(body or b'{}')
+        except ValueError:
+            sent = self._error(400, "Invalid JSON payload")
+            self.server.stats.record(model, method, 400, time.perf_counter() - start, 0, sent)
+            return
+
+        config = self.server.config
+        delay, status, variant = config.draw()
+        time.sleep(delay)
+
+        if status == 429:
+            sent = self._error(429, "Resource has been exhausted (e.g. check quota).",
+                               {"Retry-After": str(config.retry_after)})
+            self.server.stats.record(model, method, 429, time.perf_counter() - start, 0, sent)
+            return
+        if status:
+            sent = self._error(status, "The service is currently unavailable.")
+            self.server.stats.record(model, method, status, time.perf_counter() - start, 0, sent)
+            return
+
+        if method != 'predict' and is_text_request(payload):
+            text = deck_text(requested_slides(payload))
+            if method == 'streamGenerateContent' and 'sse' in parse_qs(url.query).get('alt', []):
+                sent = self._stream_text_events(text)
+            else:
+                body = self._text_body(text)
+                sent = self._send_json(200, [body] if method == 'streamGenerateContent' else body)
+            self.server.stats.record(model, method, 200, time.perf_counter() - start, 0, sent)
+            return
+
+        if method == 'predict':
+            body, images = self._predict_body(payload, variant)
+        else:
+            body, images = self._generate_content_body(variant)
+
+        if method == 'streamGenerateContent':
+            sent = self._send_json(200, [body])
+        else:
+            sent = self._send_json(200, body)
+        self.server.stats.record(model, method, 200, time.perf_counter() - start, images, sent)
+
+    def _predict_body(self, payload, variant):
+        images = self.server.config.images
+        sample_count = int((payload.get('parameters') or {}).get('sampleCount', 1))
+        predictions = []
+        for index, _ in enumerate(payload.get('instances') or [{}]):
+            for sample in range(sample_count):
+                predictions.append({
+                    "mimeType": "image/png",
+                    "bytesBase64Encoded": images[(variant + index + sample) % len(images)],
+                })
+        return {"predictions": predictions}, len(predictions)
+
+    def _text_body(self, text, finished=True):
+        candidate = {"content": {"role": "model", "parts": [{"text": text}]}, "index": 0}
+        if finished:
+            candidate["finishReason"] = "STOP"
+        return {"candidates": [candidate]}
+
+    def _stream_text_events(self, text):
+        """Send text as server-sent events, one slide's worth every slide_seconds, in small pieces"""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        sent = 0
+        slides = text.split(SLIDE_SEPARATOR)
+        for number, slide in enumerate(slides):
+            time.sleep(self.server.config.slide_seconds)
+            piece_text = slide + (SLIDE_SEPARATOR if number < len(slides) - 1 else '')
+            # Pieces cut mid-token, the way a model's output arrives
+            for offset in range(0, len(piece_text), TEXT_PIECE):
+                last = number == len(slides) - 1 and offset + TEXT_PIECE >= len(piece_text)
+                event = json.dumps(self._text_body(piece_text[offset:offset + TEXT_PIECE], finished=last))
+                data = f"data: {event}\r\n\r\n".encode('utf-8')
+                self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+                sent += len(data)
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
+        return sent
+
+    def _generate_content_body(self, variant):
+        return {
+            "candidates": [{
+                "content": {"role": "model", "parts": [
+                    {"inlineData": {"mimeType": "image/png", "data": self.server.config.images[variant]}},
+                ]},
+                "finishReason": "STOP",
+                "index": 0,
+            }],
+        }, 1
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, config, verbose=False):
+        super().__init__(address, StubHandler)
+        self.config = config
+        self.stats = StubStats()
+        self.verbose = verbose
+
+    def handle_error(self, request, client_address):
+        # Clients killed mid-response (interrupted builds) are part of what the stub is for
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def start_stub_server(config=None, host='127.0.0.1', port=0, verbose=False):
+    """Start a stub server on a background thread; port=0 picks a free port. Returns the server"""
+    server = StubServer((host, port), config or StubConfig(), verbose=verbose)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def parse_size(value):
+    width, _, height = value.lower().partition('x')
+    return int(width), int(height)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Local stand-in for the Imagen :predict and Gemini generateContent endpoints.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', default='lognormal:1.5,0.4',
+                        help="fixed:S | uniform:LO,HI | normal:MEAN,STDDEV | lognormal:MEDIAN,SIGMA (seconds)")
+    parser.add_argument('--rate-429', type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument('--rate-5xx', type=float, default=0.0, help="fraction of requests answered with 503")
+    parser.add_argument('--retry-after', type=int, default=1, help="Retry-After seconds sent with 429s")
+    parser.add_argument('--key-rpm', type=float, default=None, help="requests per minute allowed per API key")
+    parser.add_argument('--slide-seconds', type=float, default=0.0,
+                        help="seconds a streamed text response takes per slide")
+    parser.add_argument('--image-size', type=parse_size, default=(1408, 768), help="WIDTHxHEIGHT of returned PNGs")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--verbose', action='store_true', help="log every request")
+    args = parser.parse_args()
+
+    config = StubConfig(latency=args.latency, rate_429=args.rate_429, rate_5xx=args.rate_5xx,
+                        retry_after=args.retry_after, image_size=args.image_size, seed=args.seed,
+                        key_rpm=args.key_rpm, slide_seconds=args.slide_seconds)
+    server = StubServer((args.host, args.port), config, verbose=args.verbose)
+    print(f"🧪 Stub Gemini API on {server.base_url} (latency {args.latency}, "
+          f"429 {args.rate_429:.0%}, 5xx {args.rate_5xx:.0%}, {args.image_size[0]}x{args.image_size[1]} PNGs)")
+    print(f"   export GEMINI_API_BASE_URL={server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
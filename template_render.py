@@ -0,0 +1,139 @@
+import copy
+
+from pptx import Presentation
+from pptx.opc.constants import CONTENT_TYPE as CT
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+from pptx.opc.packuri import PackURI
+from pptx.oxml.ns import qn
+from pptx.parts.slide import NotesSlidePart, SlidePart
+
+# Multi-line text in every field so the prototype yields both a first and a following paragraph
+PROTOTYPE_SLIDE = {"title": "T\nT", "content": ["C", "C"], "image_prompt": "P\nP"}
+
+
+def _split_text_body(txBody):
+    """Strip the paragraphs out of txBody and return (first, following) paragraph templates"""
+    paragraphs = txBody.findall(qn('a:p'))
+    templates = []
+    for p in paragraphs[:2]:
+        p = copy.deepcopy(p)
+        for child in list(p):
+            if child.tag != qn('a:pPr'):
+                p.remove(child)
+        templates.append(p)
+    for p in paragraphs:
+        txBody.remove(p)
+    return templates[0], templates[-1]
+
+
+def _fill_text_body(txBody, paragraph_templates, text, size=None):
+    first, following = paragraph_templates
+    for index, line in enumerate(text.split('\n')):
+        p = copy.deepcopy(first if index == 0 else following)
+        if size is not None:
+            # paragraph.font.size lives in the paragraph's default run properties; only the
+            # paragraphs the renderer gave a size get the new one, as in a rendered slide
+            defRPr = p.find(f"{qn('a:pPr')}/{qn('a:defRPr')}")
+            if defRPr is not None and defRPr.get('sz') is not None:
+                defRPr.set('sz', str(int(size * 100)))
+        if line:
+            p.append_text(line)
+        txBody.append(p)
+
+
+class SlideTemplate:
+    """Slide and notes shape XML built once per layout and cloned for every slide
+
+    The prototype is rendered by the regular python-pptx renderer, so cloned slides
+    come out identical to rendered ones. slide_texts(slide_data) must return the text
+    of each prototype shape in document order plus the notes text.
+    """
+
+    def __init__(self, render_slide, slide_texts, layout_index=6):
+        self.slide_texts = slide_texts
+        self.layout_index = layout_index
+
+        scratch = Presentation()
+        slide = scratch.slides.add_slide(scratch.slide_layouts[layout_index])
+        render_slide(slide, PROTOTYPE_SLIDE)
+
+        self._shapes = []
+        for sp in slide.shapes._spTree.iter_shape_elms():
+            sp = copy.deepcopy(sp)
+            txBody = sp.find(qn('p:txBody'))
+            self._shapes.append((sp, _split_text_body(txBody) if txBody is not None else None))
+
+        self._notes = copy.deepcopy(slide.notes_slide._element)
+        notes_body = self._notes.xpath('.//p:sp[p:nvSpPr/p:nvPr/p:ph[@type="body"]]/p:txBody')[0]
+        self._notes_paragraphs = _split_text_body(notes_body)
+        self._numbering = None
+
+    def add_slide(self, prs, slide_data, sizes=None):
+        """Append a slide for slide_data to prs by cloning the prototype shapes
+
+        sizes optionally gives a font size in points for each text shape, in the order of
+        slide_texts; it replaces the prototype's size on the paragraphs that have one, and
+        None keeps the prototype's size.
+        """
+        slide = self._new_slide(prs)
+        texts = self.slide_texts(slide_data)
+        notes_text = texts[-1]
+
+        spTree = slide.shapes._spTree
+        text_index = 0
+        for sp_template, paragraph_templates in self._shapes:
+            sp = copy.deepcopy(sp_template)
+            if paragraph_templates:
+                size = sizes[text_index] if sizes else None
+                _fill_text_body(sp.find(qn('p:txBody')), paragraph_templates, texts[text_index], size)
+                text_index += 1
+            spTree.append(sp)
+
+        self._add_notes(prs, slide, notes_text)
+        return slide
+
+    def _next_numbers(self, prs):
+        """Return [next slide id, next notes partname number, notes master part] for prs, scanning it only once"""
+        if self._numbering is None or self._numbering[0] is not prs.part:
+            notes_partname = prs.part.package.next_partname("/ppt/notesSlides/notesSlide%d.xml")
+            # The notes master is looked up on first use, after the first slide, as python-pptx does
+            self._numbering = (prs.part, [prs.slides._sldIdLst._next_id, notes_partname.idx, None])
+        return self._numbering[1]
+
+    def _new_slide(self, prs):
+        # Same as prs.slides.add_slide(), minus the scans over every existing slide
+        # relationship and slide id that make adding n slides O(n^2)
+        numbers = self._next_numbers(prs)
+        prs_part = prs.part
+        slide_layout = prs.slide_layouts[self.layout_index]
+        slide_part = SlidePart.new(prs_part._next_slide_partname, prs_part.package, slide_layout.part)
+        rId = prs_part.rels._add_relationship(RT.SLIDE, slide_part)
+        prs.slides._sldIdLst._add_sldId(id=numbers[0], rId=rId)
+        numbers[0] += 1
+        slide = slide_part.slide
+        slide.shapes.clone_layout_placeholders(slide_layout)
+        return slide
+
+    def _add_notes(self, prs, slide, notes_text):
+        # Equivalent to slide.notes_slide, without cloning master placeholders or
+        # scanning every package part for a free notes partname on each slide
+        numbers = self._next_numbers(prs)
+        package = prs.part.package
+        if numbers[2] is None:
+            numbers[2] = prs.part.notes_master_part
+        notes_master_part = numbers[2]
+
+        notes = copy.deepcopy(self._notes)
+        notes_body = notes.xpath('.//p:sp[p:nvSpPr/p:nvPr/p:ph[@type="body"]]/p:txBody')[0]
+        _fill_text_body(notes_body, self._notes_paragraphs, notes_text)
+
+        notes_part = NotesSlidePart(
+            PackURI(f"/ppt/notesSlides/notesSlide{numbers[1]}.xml"),
+            CT.PML_NOTES_SLIDE,
+            package,
+            notes,
+        )
+        numbers[1] += 1
+        notes_part.relate_to(notes_master_part, RT.NOTES_MASTER)
+        notes_part.relate_to(slide.part, RT.SLIDE)
+        slide.part.relate_to(notes_part, RT.NOTES_SLIDE)
@@ -0,0 +1,120 @@
+import threading
+
+import pytest
+
+import asset_store
+from asset_store import TOUCH_INTERVAL, AssetStore, make_cache_key
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(asset_store.time, 'time', clock)
+    return clock
+
+
+@pytest.fixture
+def open_store(tmp_path):
+    stores = []
+
+    def open_store(**kwargs):
+        store = AssetStore(str(tmp_path / 'assets.db'), **kwargs)
+        stores.append(store)
+        return store
+
+    yield open_store
+    for store in stores:
+        store.close()
+
+
+def keys(store):
+    return sorted(entry['key'] for entry in store.entries())
+
+
+def test_put_and_get(open_store, clock):
+    store = open_store()
+    assert store.get('a') is None
+    store.put('a', b'x' * 10, prompt='A cat', model='imagen')
+    assert store.get('a') == b'x' * 10
+    assert store.contains('a') and not store.contains('b')
+    [entry] = store.entries()
+    assert (entry['prompt'], entry['model'], entry['bytes'], entry['mime_type']) == ('A cat', 'imagen', 10, None)
+    store.put('a', b'yy')
+    assert store.read('a') == b'yy'
+    assert store.stats()['assets'] == 1
+
+
+def test_reuse_false_misses_but_still_stores(open_store, clock):
+    store = open_store(reuse=False)
+    store.put('a', b'data')
+    assert store.get('a') is None
+    assert store.read('a') == b'data'
+    assert open_store().get('a') == b'data'
+
+
+def test_put_evicts_least_recently_used(open_store, clock):
+    store = open_store(max_bytes=30)
+    for key in 'abc':
+        store.put(key, b'x' * 10)
+        clock.now += TOUCH_INTERVAL
+    # Reading a makes b the least recently used
+    store.get('a')
+    store.put('d', b'x' * 10)
+    assert keys(store) == ['a', 'c', 'd']
+    # The new image is kept even when it alone is over the limit
+    store.put('e', b'x' * 50)
+    assert keys(store) == ['e']
+
+
+def test_recent_reads_do_not_rewrite_last_used(open_store, clock):
+    store = open_store()
+    store.put('a', b'x')
+    clock.now += TOUCH_INTERVAL / 2
+    store.get('a')
+    assert store.entries()[0]['last_used'] == 1_000_000.0
+    clock.now += TOUCH_INTERVAL
+    store.get('a')
+    assert store.entries()[0]['last_used'] == clock.now
+
+
+def test_gc_by_age_then_size(open_store, clock):
+    store = open_store(max_bytes=None)
+    for key in 'abcde':
+        store.put(key, b'x' * 10)
+        clock.now += 3600
+    assert store.gc(unused_for=2.5 * 3600) == (3, 30)
+    assert keys(store) == ['d', 'e']
+    assert store.gc(max_bytes=15) == (1, 10)
+    assert keys(store) == ['e']
+    assert store.gc(unused_for=10 * 3600, max_bytes=100) == (0, 0)
+
+
+def test_connections_per_thread(open_store, clock):
+    store = open_store()
+
+    def put(key):
+        store.put(key, b'x')
+
+    threads = [threading.Thread(target=put, args=(str(n),)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert keys(store) == ['0', '1', '2', '3']
+
+
+def test_cache_key():
+    key = make_cache_key('imagen', 'A cat', {'aspectRatio': '16:9', 'sampleCount': 1})
+    assert key == make_cache_key('imagen', 'A cat', {'sampleCount': 1, 'aspectRatio': '16:9'})
+    assert len(key) == 64
+    assert make_cache_key('imagen', 'A cat') == make_cache_key('imagen', 'A cat', {})
+    assert key != make_cache_key('imagen', 'A dog', {'aspectRatio': '16:9', 'sampleCount': 1})
+    assert key != make_cache_key('gemini', 'A cat', {'aspectRatio': '16:9', 'sampleCount': 1})
@@ -0,0 +1,27 @@
+import json
+
+from batch_build import deck_file_name, iter_decks
+
+
+def test_names_stay_inside_the_output_directory():
+    used = set()
+    assert deck_file_name('../x', used, 'deck_1') == 'x'
+    assert deck_file_name('/abs/path', used, 'deck_2') == 'abs_path'
+    assert deck_file_name('..', used, 'deck_3') == 'deck_3'
+    assert deck_file_name('분기 보고서: 2분기', used, 'deck_4') == '분기_보고서_2분기'
+
+
+def test_repeated_names_get_a_suffix():
+    used = set()
+    names = [deck_file_name(name, used, 'deck') for name in ('Q3', 'Q3', 'q3', 'Q3_2', 'Q3')]
+    assert names == ['Q3', 'Q3_2', 'q3_3', 'Q3_2_2', 'Q3_4']
+
+
+def test_jsonl_deck_names(tmp_path):
+    source = tmp_path / 'decks.jsonl'
+    lines = [{"name": "../escape", "slides": [{"title": "a"}]}, [{"title": "b"}],
+             {"name": "deck_2", "slides": []}, {"slides": [{"title": "c"}]}]
+    source.write_text('\n'.join(json.dumps(line) for line in lines), encoding='utf-8')
+    decks = list(iter_decks(str(source)))
+    assert [name for name, _ in decks] == ['escape', 'deck_2', 'deck_2_2', 'deck_4']
+    assert decks[1][1] == {"slides": [{"title": "b"}]}
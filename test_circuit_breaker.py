@@ -0,0 +1,141 @@
+import threading
+import time
+
+import pytest
+
+import circuit_breaker
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+RESET = 10.0
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(circuit_breaker.time, 'monotonic', clock)
+    return clock
+
+
+def open_breaker(threshold=3):
+    breaker = CircuitBreaker('test', failure_threshold=threshold, reset_timeout=RESET)
+    for _ in range(threshold):
+        assert breaker.allow()
+        breaker.record_failure()
+    return breaker
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker('test', failure_threshold=3, reset_timeout=RESET)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.opened.is_set()
+    assert not breaker.allow()
+    clock.now += RESET - 0.1
+    assert not breaker.allow()
+
+
+def test_half_open_lets_one_probe_through(clock):
+    breaker = open_breaker()
+    clock.now += RESET
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()
+
+
+def test_other_callers_are_refused_without_waiting(clock):
+    breaker = open_breaker()
+    clock.now += RESET
+    assert breaker.allow()
+    # The clock does not move, so any wait for the probe would never end
+    results = []
+    caller = threading.Thread(target=lambda: results.append(breaker.allow()))
+    caller.start()
+    caller.join(5)
+    assert results == [False]
+
+
+def test_probe_success_closes(clock):
+    breaker = open_breaker()
+    clock.now += RESET
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.failures == 0
+    assert not breaker.opened.is_set()
+    assert breaker.allow()
+
+
+def test_probe_failure_reopens_for_twice_as_long(clock):
+    breaker = open_breaker()
+    clock.now += RESET
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.reset_timeout == RESET * 2
+    clock.now += RESET
+    assert not breaker.allow()
+    clock.now += RESET
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.reset_timeout == RESET
+
+
+def test_reset_timeout_is_capped(clock, monkeypatch):
+    monkeypatch.setattr(circuit_breaker, 'MAX_RESET_TIMEOUT', RESET * 3)
+    breaker = open_breaker()
+    for _ in range(3):
+        clock.now += breaker.reset_timeout
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.reset_timeout == RESET * 3
+
+
+def test_neutral_probe_hands_over_to_the_next_caller(clock):
+    breaker = open_breaker()
+    clock.now += RESET
+    assert breaker.allow()
+    breaker.record_neutral()
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow()
+    assert not breaker.allow()
+
+
+def test_abandoned_probe_is_replaced(clock):
+    breaker = open_breaker()
+    clock.now += RESET
+    assert breaker.allow()
+    clock.now += RESET - 0.1
+    assert not breaker.allow()
+    clock.now += 0.1
+    assert breaker.allow()
+
+
+def test_neutral_calls_keep_the_failure_count(clock):
+    breaker = CircuitBreaker('test', failure_threshold=2, reset_timeout=RESET)
+    breaker.record_failure()
+    breaker.record_neutral()
+    assert breaker.failures == 1
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+
+def test_sleep_wakes_when_the_circuit_opens():
+    breaker = CircuitBreaker('test', failure_threshold=1, reset_timeout=RESET)
+    threading.Timer(0.05, breaker.record_failure).start()
+    start = time.monotonic()
+    breaker.sleep(5)
+    assert time.monotonic() - start < 2
@@ -0,0 +1,69 @@
+import json
+import time
+
+import pytest
+from pptx import Presentation
+
+import circuit_breaker
+import generate_ppt_with_images_rest as generator
+import http_client
+from deck_manifest import find_picture
+from stub_server import parse_latency
+
+SLIDES = [{"title": f"Slide {i}", "content": ["point"], "image_prompt": f"picture {i}"} for i in range(4)]
+
+
+@pytest.fixture(autouse=True)
+def fresh_breakers(monkeypatch):
+    # Failures injected here must not open the process-wide breaker for later tests
+    monkeypatch.setattr(circuit_breaker, '_breakers', {})
+
+
+def build(deadline, **options):
+    start = time.monotonic()
+    output_file = generator.create_presentation(slides=SLIDES, output_file_base='deck', api_key='stub-key',
+                                                use_cache=False, save_images=False, deadline=deadline, **options)
+    return output_file, time.monotonic() - start
+
+
+def read_report():
+    with open('deck.deadline.json', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def pictures(output_file):
+    return [find_picture(slide) is not None for slide in Presentation(output_file).slides]
+
+
+def test_slow_images_miss_the_deadline(stub):
+    stub.config.sample_latency = parse_latency('fixed:5')
+    output_file, elapsed = build(1.0)
+    assert elapsed < 2.0
+    assert pictures(output_file) == [False] * 4
+    report = read_report()
+    assert report['output_file'] == output_file
+    assert report['budget_seconds'] == 1.0
+    assert report['slides'] == 4
+    assert report['missed'] == [{"slide": i + 1, "reason": "deadline"} for i in range(4)]
+
+
+def test_images_in_time_are_kept(stub):
+    output_file, _ = build(30, stream_output=True)
+    assert pictures(output_file) == [True] * 4
+    assert read_report()['missed'] == []
+
+
+def test_failed_images_are_reported_as_failed(stub, monkeypatch):
+    monkeypatch.setattr(http_client, 'BACKOFF_BASE', 0.01)
+    stub.config.rate_5xx = 1.0
+    output_file, elapsed = build(30, max_workers=1)
+    assert elapsed < 30
+    assert pictures(output_file) == [False] * 4
+    assert {entry['reason'] for entry in read_report()['missed']} == {"failed"}
+
+
+def test_no_report_without_a_deadline(stub):
+    generator.create_presentation(slides=SLIDES[:1], output_file_base='deck', api_key='stub-key', use_cache=False,
+                                  save_images=False)
+    with pytest.raises(FileNotFoundError):
+        read_report()
@@ -0,0 +1,137 @@
+import datetime as dt
+import json
+
+import pytest
+from PIL import Image
+from pptx import Presentation
+
+import generate_ppt_with_images_rest as generator
+from deck_manifest import (MANIFEST_VERSION, clear_slide, find_picture, image_hash, load_manifest,
+                           manifest_path, save_manifest, slide_hash, truncate_slides)
+
+SLIDE = {"title": "Intro", "content": ["a", "b"], "image_prompt": "a lighthouse"}
+
+
+def test_slide_hash_covers_what_is_rendered():
+    assert slide_hash(SLIDE) == slide_hash(dict(SLIDE, notes="not rendered"))
+    assert slide_hash(SLIDE) == slide_hash(dict(reversed(list(SLIDE.items()))))
+    for field, value in (("title", "Outro"), ("content", ["a"]), ("content", "a\nb"), ("image_prompt", "a boat")):
+        assert slide_hash(SLIDE) != slide_hash(dict(SLIDE, **{field: value}))
+    # Missing fields hash like the defaults the generators render
+    assert slide_hash({}) == slide_hash({"title": "No Title", "content": "", "image_prompt": ""})
+
+
+def test_image_hash_covers_only_the_prompt():
+    assert image_hash(SLIDE) == image_hash(dict(SLIDE, title="Outro", content="changed"))
+    assert image_hash(SLIDE) != image_hash(dict(SLIDE, image_prompt="a boat"))
+
+
+def test_manifest_round_trip(tmp_path):
+    base = str(tmp_path / 'deck')
+    output_file = tmp_path / 'deck_1.pptx'
+    entries = [{"hash": slide_hash(SLIDE), "image_hash": image_hash(SLIDE), "has_image": True}]
+    save_manifest(base, str(output_file), entries)
+    # The deck it describes must still exist
+    assert load_manifest(base) is None
+    output_file.write_bytes(b'')
+    assert load_manifest(base) == {"version": MANIFEST_VERSION, "output_file": str(output_file), "slides": entries}
+
+
+@pytest.mark.parametrize('content', ['{"version": 1, "output_file": ', '{"version": 0, "output_file": "deck_1.pptx"}'])
+def test_unusable_manifest(tmp_path, monkeypatch, content):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'deck_1.pptx').write_bytes(b'')
+    (tmp_path / manifest_path('deck')).write_text(content, encoding='utf-8')
+    assert load_manifest('deck') is None
+
+
+def test_clear_and_truncate_slides(tmp_path):
+    prs = Presentation()
+    image = tmp_path / 'image.png'
+    Image.new('RGB', (8, 8), 'red').save(image)
+    for i in range(3):
+        slide = prs.slides.add_slide(prs.slide_layouts[6])
+        slide.shapes.add_picture(str(image), 0, 0)
+        slide.shapes.add_textbox(0, 0, 100, 100).text_frame.text = f"Slide {i}"
+    slide = prs.slides[0]
+    clear_slide(slide)
+    assert len(slide.shapes) == 0
+    assert find_picture(slide) is None
+    assert not any('image' in rel.reltype for rel in slide.part.rels.values())
+    assert find_picture(prs.slides[1]) is not None
+    truncate_slides(prs, 1)
+    assert len(prs.slides) == 1
+    path = tmp_path / 'deck.pptx'
+    prs.save(path)
+    assert len(Presentation(path).slides) == 1
+
+
+@pytest.fixture
+def timestamps(monkeypatch):
+    # Builds in the same second would otherwise get the same output file name
+    class Clock(dt.datetime):
+        tick = 0
+
+        @classmethod
+        def now(cls, tz=None):
+            cls.tick += 1
+            return dt.datetime(2026, 1, 1, 0, 0, cls.tick)
+
+    monkeypatch.setattr(generator, 'datetime', Clock)
+
+
+def build(slides, **options):
+    return generator.create_presentation(slides=slides, output_file_base='deck', incremental=True, api_key='stub-key',
+                                         use_cache=False, save_images=False, **options)
+
+
+def image_requests(stub):
+    requests = [r for r in stub.stats.snapshot() if r['method'] == 'predict']
+    stub.stats.reset()
+    return len(requests)
+
+
+def slide_summary(path):
+    summary = []
+    for slide in Presentation(path).slides:
+        picture = find_picture(slide)
+        texts = [shape.text_frame.text for shape in slide.shapes if shape.has_text_frame]
+        summary.append((texts[0], picture.image.sha1 if picture else None))
+    return summary
+
+
+def test_incremental_rebuild_reuses_unchanged_work(stub, timestamps):
+    slides = [{"title": f"Slide {i}", "content": ["point"], "image_prompt": f"picture {i}"} for i in range(4)]
+    first = build(slides)
+    assert image_requests(stub) == 4
+    before = slide_summary(first)
+    assert all(sha1 for _, sha1 in before)
+
+    slides[1] = dict(slides[1], title="Slide 1, retitled")
+    slides[2] = dict(slides[2], image_prompt="another picture")
+    second = build(slides[:3])
+    # Only the slide whose prompt changed goes back to the API
+    assert image_requests(stub) == 1
+    after = slide_summary(second)
+    assert [title for title, _ in after] == ["Slide 0", "Slide 1, retitled", "Slide 2"]
+    assert after[0] == before[0]
+    assert after[1][1] == before[1][1]
+    assert after[2][1] is not None
+    manifest = load_manifest('deck')
+    assert manifest['output_file'] == second
+    assert [entry['hash'] for entry in manifest['slides']] == [slide_hash(slide) for slide in slides[:3]]
+
+    third = build(slides[:3], stream_output=True)
+    assert image_requests(stub) == 0
+    assert slide_summary(third) == after
+
+
+def test_placeholder_slides_are_retried(stub, timestamps):
+    slides = [{"title": "Slide", "image_prompt": "picture"}]
+    build(slides, generate_images=False)
+    with open(manifest_path('deck'), encoding='utf-8') as f:
+        manifest = json.load(f)
+    assert manifest['slides'][0]['has_image'] is False
+    output_file = build(slides)
+    assert image_requests(stub) == 1
+    assert slide_summary(output_file)[0][1] is not None
@@ -0,0 +1,53 @@
+import json
+
+import pytest
+
+from generate_from_topic import SlideStreamParser, validate_slide
+
+SLIDES = [
+    {"title": "Braces {in} titles", "content": ["a \"quoted\" }", "back\\slash"], "image_prompt": "C:\\"},
+    {"title": "Ünïcode ✅", "content": "line\nbreak", "image_prompt": "{\"not\": \"an object\"}"},
+    {"title": "Nested", "content": [], "image_prompt": "ends with a quote \""},
+]
+TEXT = "```json\n" + json.dumps(SLIDES, ensure_ascii=False, indent=1) + "\n```"
+
+
+def parse(pieces):
+    parser = SlideStreamParser()
+    objects = []
+    for piece in pieces:
+        objects += parser.feed(piece)
+    assert not parser.incomplete
+    return [json.loads(text) for text in objects]
+
+
+def test_whole_text():
+    assert parse([TEXT]) == SLIDES
+
+
+@pytest.mark.parametrize('size', [1, 2, 3, 7])
+def test_fixed_size_pieces(size):
+    assert parse([TEXT[i:i + size] for i in range(0, len(TEXT), size)]) == SLIDES
+
+
+def test_every_split_point():
+    # Covers a piece ending inside a string, right after a backslash, and between an object's braces
+    for cut in range(len(TEXT) + 1):
+        assert parse([TEXT[:cut], TEXT[cut:]]) == SLIDES, cut
+
+
+def test_slides_arrive_as_soon_as_they_close():
+    parser = SlideStreamParser()
+    first_end = TEXT.index('}', TEXT.index('"C:\\\\"')) + 1
+    assert parser.feed(TEXT[:first_end - 1]) == []
+    assert parser.incomplete
+    assert [json.loads(text) for text in parser.feed(TEXT[first_end - 1:first_end])] == SLIDES[:1]
+    assert not parser.incomplete
+
+
+def test_validate_slide():
+    slide = validate_slide({"title": " T ", "content": [" a ", " "], "image_prompt": " p "})
+    assert slide == {"title": "T", "content": ["a"], "image_prompt": "p"}
+    for bad in ([], {"content": "x"}, {"title": "T", "content": [1]}, {"title": "T", "image_prompt": 3}):
+        with pytest.raises(ValueError):
+            validate_slide(bad)
@@ -0,0 +1,50 @@
+import base64
+import json
+
+import pytest
+from PIL import Image
+
+import generate_ppt_with_images_rest as generator
+from generate_ppt_with_images_rest import decode_image_stream
+
+IMAGE = bytes(range(256)) * 3 + b'\xff\xfe\xfd'
+ENCODED = base64.b64encode(IMAGE).decode('ascii')
+
+
+def response_bodies():
+    plain = json.dumps({"predictions": [{"mimeType": "image/png", "bytesBase64Encoded": ENCODED}]})
+    # Some encoders escape "/" in strings
+    escaped = plain.replace('/', '\\/')
+    spaced = json.dumps({"predictions": [{"bytesBase64Encoded": ENCODED, "mimeType": "image/png"}]}, indent=2)
+    return [body.encode('ascii') for body in (plain, escaped, spaced)]
+
+
+@pytest.mark.parametrize('body', response_bodies())
+def test_every_split_point(body):
+    # Covers the key, its closing quote, the value's opening quote and each base64 quantum split across chunks
+    for cut in range(len(body) + 1):
+        image, _ = decode_image_stream(iter([body[:cut], body[cut:]]))
+        assert image.getvalue() == IMAGE, cut
+
+
+@pytest.mark.parametrize('size', [1, 2, 3, 5, 64 * 1024])
+def test_fixed_size_chunks(size):
+    for body in response_bodies():
+        image, _ = decode_image_stream(body[i:i + size] for i in range(0, len(body), size))
+        assert image.getvalue() == IMAGE
+        assert image.tell() == 0
+
+
+def test_response_without_an_image():
+    body = json.dumps({"error": {"message": "x" * 500}}).encode('ascii')
+    image, head = decode_image_stream(body[i:i + 7] for i in range(0, len(body), 7))
+    assert image is None
+    assert head == body[:200]
+
+
+def test_streamed_and_buffered_images_match(stub):
+    images = [generator.generate_image_with_imagen("a lighthouse", None, 'stub-key', streaming=streaming)
+              for streaming in (True, False)]
+    for image in images:
+        assert base64.b64encode(image.getvalue()).decode('ascii') in stub.config.images
+        assert Image.open(image).size == (320, 180)
@@ -0,0 +1,157 @@
+import email.utils
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+import http_client
+from circuit_breaker import CLOSED, OPEN, CircuitBreaker
+from http_client import CallStats, backoff_delay, parse_retry_after, post_with_retry
+from key_pool import KeyPool
+
+
+class ScriptedServer(ThreadingHTTPServer):
+    """Answers each POST with the next (status, headers) of a script, then 200"""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), ScriptedHandler)
+        self.script = []
+        self.keys = []
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/v1beta/models/m:predict"
+
+
+class ScriptedHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        with self.server.lock:
+            self.server.keys.append(self.path.partition('key=')[2])
+            status, headers = self.server.script.pop(0) if self.server.script else (200, {})
+        body = json.dumps({"status": status}).encode()
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ScriptedServer()
+    threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(http_client.time, 'sleep', sleeps.append)
+    return sleeps
+
+
+def test_parse_retry_after(monkeypatch):
+    assert parse_retry_after(None) is None
+    assert parse_retry_after('') is None
+    assert parse_retry_after('soon') is None
+    assert parse_retry_after('3') == 3.0
+    assert parse_retry_after('1.5') == 1.5
+    assert parse_retry_after('-4') == 0.0
+    assert parse_retry_after('100000') == http_client.RETRY_AFTER_MAX
+    now = 1_700_000_000.0
+    monkeypatch.setattr(http_client.time, 'time', lambda: now)
+    assert parse_retry_after(email.utils.formatdate(now + 30, usegmt=True)) == pytest.approx(30.0)
+    assert parse_retry_after(email.utils.formatdate(now - 30, usegmt=True)) == 0.0
+
+
+def test_backoff_is_full_jitter_up_to_the_cap(monkeypatch):
+    bounds = []
+    monkeypatch.setattr(http_client.random, 'uniform', lambda low, high: bounds.append((low, high)) or high)
+    delays = [backoff_delay(attempt) for attempt in range(7)]
+    assert bounds == [(0, min(http_client.BACKOFF_MAX, http_client.BACKOFF_BASE * 2 ** n)) for n in range(7)]
+    assert delays[-1] == http_client.BACKOFF_MAX
+
+
+def test_retry_after_is_honoured(server, sleeps):
+    server.script = [(429, {'Retry-After': '7'}), (503, {'Retry-After': '2'})]
+    stats = CallStats()
+    response = post_with_retry(server.url, {}, api_key='k', stats=stats, label='Slide 1')
+    assert response.status_code == 200
+    assert sleeps == [7.0, 2.0]
+    assert stats.calls[0]['retries'] == 2
+    assert stats.calls[0]['status'] == 200
+
+
+def test_backoff_without_retry_after(server, sleeps, monkeypatch):
+    monkeypatch.setattr(http_client.random, 'uniform', lambda low, high: high)
+    server.script = [(503, {}), (502, {}), (500, {})]
+    assert post_with_retry(server.url, {}, api_key='k').status_code == 200
+    assert sleeps == [1.0, 2.0, 4.0]
+
+
+def test_gives_up_after_max_retries(server, sleeps):
+    server.script = [(503, {'Retry-After': '0'})] * 5
+    stats = CallStats()
+    response = post_with_retry(server.url, {}, api_key='k', stats=stats, max_retries=2)
+    assert response.status_code == 503
+    assert len(sleeps) == 2
+    assert stats.calls[0]['retries'] == 2
+
+
+def test_client_errors_are_not_retried(server, sleeps):
+    server.script = [(400, {})]
+    assert post_with_retry(server.url, {}, api_key='k').status_code == 400
+    assert sleeps == []
+
+
+def test_no_retry_that_would_outlast_the_deadline(server, sleeps):
+    server.script = [(429, {'Retry-After': '30'})]
+    response = post_with_retry(server.url, {}, api_key='k', deadline=time.monotonic() + 5)
+    assert response.status_code == 429
+    assert sleeps == []
+
+
+def test_deadline_already_passed(server):
+    with pytest.raises(http_client.DeadlineExceeded):
+        post_with_retry(server.url, {}, api_key='k', deadline=time.monotonic() - 1)
+    assert server.keys == []
+
+
+def test_throttled_key_is_retried_at_once_on_another(server, sleeps):
+    server.script = [(429, {'Retry-After': '20'})]
+    pool = KeyPool([('key-a', None), ('key-b', None)])
+    assert post_with_retry(server.url, {}, api_key=pool).status_code == 200
+    assert sleeps == []
+    assert len(set(server.keys)) == 2
+
+
+def test_breaker_counts_only_backend_failures(server, sleeps):
+    breaker = CircuitBreaker('test', failure_threshold=2, reset_timeout=60)
+    server.script = [(429, {'Retry-After': '0'})] * 3
+    post_with_retry(server.url, {}, api_key='k', max_retries=2, breaker=breaker)
+    assert breaker.state == CLOSED and breaker.failures == 0
+    server.script = [(503, {'Retry-After': '0'})] * 3
+    with pytest.raises(http_client.CircuitOpenError):
+        post_with_retry(server.url, {}, api_key='k', max_retries=2, breaker=breaker)
+    assert breaker.state == OPEN
+
+
+def test_network_errors_are_retried(sleeps, monkeypatch):
+    monkeypatch.setattr(http_client.random, 'uniform', lambda low, high: high)
+    with pytest.raises(requests.ConnectionError):
+        # Nothing listens on port 9 of localhost
+        post_with_retry('http://127.0.0.1:9/', {}, api_key='k', max_retries=2)
+    assert sleeps == [1.0, 2.0]
@@ -0,0 +1,114 @@
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+
+from image_optimize import ImageOptimizer, is_flat, make_pool, optimize_image
+
+# A 5.8" frame, as on the generated slides
+FRAME_WIDTH = int(5.8 * 914400)
+
+
+def encode(img, format='PNG'):
+    buffer = io.BytesIO()
+    img.save(buffer, format)
+    return buffer.getvalue()
+
+
+def photo(size=(1408, 768)):
+    """Smooth gradients plus sensor-like noise: many distinct colours"""
+    x = np.linspace(0, 1, size[0])[None, :, None]
+    y = np.linspace(0, 1, size[1])[:, None, None]
+    base = np.concatenate([x * 255 + 0 * y, y * 255 + 0 * x, (x + y) * 127], axis=2)
+    noise = np.random.default_rng(0).normal(0, 12, base.shape)
+    return Image.fromarray(np.clip(base + noise, 0, 255).astype(np.uint8))
+
+
+def diagram(size=(1408, 768)):
+    img = Image.new('RGB', size, 'white')
+    draw = ImageDraw.Draw(img)
+    for n in range(12):
+        draw.rectangle((40 + n * 110, 100, 120 + n * 110, 600), outline='black', fill=('red', 'blue', 'green')[n % 3],
+                       width=4)
+    return img
+
+
+@pytest.fixture(scope='module')
+def threads():
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        yield pool
+
+
+def test_photo_becomes_a_downscaled_jpeg():
+    data = encode(photo())
+    result, info = optimize_image(data, 870)
+    with Image.open(io.BytesIO(result)) as img:
+        assert (img.format, img.size) == ('JPEG', (870, 475))
+    assert info['format'] == 'JPEG'
+    assert (info['width'], info['height']) == (870, 475)
+    assert info['original_bytes'] == len(data)
+    assert info['bytes'] == len(result) < len(data) // 4
+
+
+def test_flat_artwork_becomes_a_palette_png():
+    assert is_flat(np.asarray(diagram()))
+    assert not is_flat(np.asarray(photo()))
+    result, info = optimize_image(encode(diagram()), 870)
+    with Image.open(io.BytesIO(result)) as img:
+        assert (img.format, img.mode, img.width) == ('PNG', 'P', 870)
+    assert info['format'] == 'PNG'
+
+
+def test_transparency_is_kept():
+    img = photo((400, 200)).convert('RGBA')
+    img.putalpha(Image.linear_gradient('L').resize((400, 200)))
+    result, info = optimize_image(encode(img), 200)
+    with Image.open(io.BytesIO(result)) as out:
+        assert (out.format, out.mode, out.size) == ('PNG', 'RGBA', (200, 100))
+    assert info['format'] == 'PNG'
+
+
+def test_small_image_that_cannot_shrink_is_kept_as_is():
+    data = encode(photo((64, 36)), 'JPEG')
+    result, info = optimize_image(data, 870, quality=100)
+    assert result == data
+    assert (info['format'], info['width'], info['height']) == ('JPEG', 64, 36)
+
+
+def test_optimizer_sizes_images_to_their_frame(threads):
+    optimizer = ImageOptimizer(FRAME_WIDTH, dpi=150, pool=threads)
+    assert optimizer.max_width == 870
+    stream = optimizer.optimize(io.BytesIO(encode(photo())), 'Slide 1')
+    with Image.open(stream) as img:
+        assert img.width == 870
+    assert [record['label'] for record in optimizer.records] == ['Slide 1']
+    assert optimizer.optimize(None) is None
+    broken = io.BytesIO(b'not an image')
+    assert optimizer.optimize(broken, 'Slide 2') is broken
+    optimizer.close(wait=False)
+    # A shared pool stays up for the next build
+    assert threads.submit(int, '7').result() == 7
+
+
+def test_wrap_optimizes_single_and_batched_results(threads):
+    optimizer = ImageOptimizer(FRAME_WIDTH, dpi=72, pool=threads)
+    image = encode(photo())
+    single = optimizer.wrap(lambda prompt: io.BytesIO(image), 'Slide 3')
+    batched = optimizer.wrap(lambda prompts: {0: io.BytesIO(image), 4: None}, 'Slides 1-5')
+    assert Image.open(single('p')).width == 418
+    results = batched(['p'])
+    assert Image.open(results[0]).width == 418 and results[4] is None
+    assert [record['label'] for record in optimizer.records] == ['Slide 3', 'Slide 1']
+
+
+def test_process_pool():
+    pool = make_pool(max_workers=1)
+    try:
+        optimizer = ImageOptimizer(FRAME_WIDTH, dpi=96, pool=pool)
+        assert Image.open(optimizer.optimize(io.BytesIO(encode(photo())))).width == 557
+        optimizer.close()
+        assert pool.submit(optimize_image, encode(diagram()), 100).result()[1]['format'] == 'PNG'
+    finally:
+        pool.shutdown()
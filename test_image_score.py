@@ -0,0 +1,101 @@
+import io
+import json
+
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+
+from image_score import SCORE_SIZE, CandidatePicker, decode_candidates, score_candidates
+
+
+def encode(img, format='PNG'):
+    buffer = io.BytesIO()
+    img.save(buffer, format)
+    return buffer.getvalue()
+
+
+def card(size=(512, 288)):
+    """White card with a dark frame and clear middle, what the style prompt asks for"""
+    img = Image.new('RGB', size, 'white')
+    draw = ImageDraw.Draw(img)
+    draw.rectangle((0, 0, size[0] - 1, size[1] - 1), outline='navy', width=size[1] // 12)
+    return img
+
+
+def busy(size=(512, 288), seed=0):
+    pixels = np.random.default_rng(seed).integers(0, 256, (size[1], size[0], 3), dtype=np.uint8)
+    return Image.fromarray(pixels)
+
+
+def flat(size=(512, 288)):
+    return Image.new('RGB', size, (128, 128, 128))
+
+
+CARD, BUSY, FLAT = encode(card()), encode(busy()), encode(flat())
+
+
+def test_decode_to_small_grayscale():
+    blobs = [CARD, encode(busy((1408, 768)), 'JPEG'), b'not an image', encode(card((64, 36)))]
+    stack, valid = decode_candidates(blobs)
+    assert stack.shape == (4, SCORE_SIZE[1], SCORE_SIZE[0])
+    assert stack.dtype == np.uint8
+    assert valid.tolist() == [True, True, False, True]
+    assert not stack[2].any()
+
+
+def test_threaded_decode_matches_serial():
+    blobs = [CARD, BUSY, FLAT, b'', encode(busy(seed=1)), encode(card(), 'JPEG')]
+    stack, valid = decode_candidates(blobs)
+    for n, blob in enumerate(blobs):
+        one, one_valid = decode_candidates([blob])
+        assert one_valid[0] == valid[n]
+        assert np.array_equal(one[0], stack[n])
+
+
+def test_metrics():
+    metrics = score_candidates(decode_candidates([CARD, BUSY, FLAT])[0])
+    card_, busy_, flat_ = (dict((name, values[n]) for name, values in metrics.items()) for n in range(3))
+    assert card_['whitespace'] > 0.95
+    assert busy_['whitespace'] < 0.2
+    assert flat_['whitespace'] == 0
+    assert flat_['contrast'] == pytest.approx(0)
+    assert flat_['edge_density'] == 0
+    assert busy_['edge_density'] > 0.5
+    assert card_['score'] > flat_['score']
+    assert card_['score'] > busy_['score']
+    for values in metrics.values():
+        assert values.shape == (3,)
+
+
+def test_pick_the_card_in_every_group():
+    picker = CandidatePicker(3)
+    groups = [[BUSY, FLAT, CARD], [CARD, BUSY], [b'broken', CARD, FLAT], [FLAT]]
+    assert picker.pick(groups, ['a', 'b', 'c', 'd']) == [2, 0, 1, 0]
+    assert [record['label'] for record in picker.records] == ['a', 'b', 'c', 'd']
+    assert picker.records[2]['candidates'][0] is None
+    assert all(record['pass_images'] == 9 for record in picker.records)
+
+
+def test_undecodable_images_are_picked_only_when_nothing_else_is():
+    picker = CandidatePicker(2)
+    assert picker.pick([[b'broken', FLAT], [b'x', b'y']], ['a', 'b']) == [1, 0]
+
+
+def test_summary_and_report(tmp_path):
+    picker = CandidatePicker(2)
+    picker.pick([[BUSY, CARD], [CARD, FLAT]], ['Slide 1', 'Slide 2'])
+    picker.pick([[FLAT, CARD]], ['Slide 3'])
+    summary = picker.summary()
+    assert (summary['prompts'], summary['images'], summary['passes'], summary['improved']) == (3, 6, 2, 2)
+    path = picker.write_report(str(tmp_path / 'deck.candidates.json'))
+    with open(path, encoding='utf-8') as f:
+        report = json.load(f)
+    assert report['candidates'] == 2
+    assert [pick['chosen'] for pick in report['picks']] == [1, 0, 1]
+    assert set(report['picks'][0]['candidates'][1]) == {'whitespace', 'contrast', 'edge_density', 'score'}
+
+
+@pytest.mark.parametrize('count', [0, 5])
+def test_candidate_count_is_limited(count):
+    with pytest.raises(ValueError):
+        CandidatePicker(count)
@@ -0,0 +1,131 @@
+import pickle
+
+import pytest
+
+import key_pool
+from key_pool import KeyPool, load_key_pool, parse_key_line
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(key_pool.time, 'monotonic', clock)
+    return clock
+
+
+def test_budget_refills_over_time(clock):
+    pool = KeyPool([('key-a', 60)])
+    key = pool.acquire()
+    pool.release(key)
+    # One request per second: the bucket is empty until a second has passed
+    assert pool.acquire(deadline=clock.now + 0.5) is None
+    clock.now += 1.0
+    assert pool.acquire(deadline=clock.now) is key
+
+
+def test_burst_is_bounded_by_the_bucket(clock):
+    pool = KeyPool([('key-a', 600)])
+    clock.now += 3600
+    for _ in range(10):
+        pool.release(pool.acquire(deadline=clock.now))
+    assert pool.acquire(deadline=clock.now) is None
+
+
+def test_least_busy_key_is_picked():
+    pool = KeyPool([('key-a', None), ('key-b', None)])
+    first = pool.acquire()
+    second = pool.acquire()
+    assert {first.key, second.key} == {'key-a', 'key-b'}
+    pool.release(first)
+    assert pool.acquire() is first
+
+
+def test_throttled_key_rests_while_others_serve(clock):
+    pool = KeyPool([('key-a', None), ('key-b', None)])
+    a = pool.keys[0]
+    pool.release(pool.acquire())
+    a.in_flight += 1
+    pool.release(a, throttled=True)
+    assert a.cooldown_until == clock.now + key_pool.KEY_BACKOFF_BASE
+    for _ in range(3):
+        key = pool.acquire(deadline=clock.now)
+        assert key.key == 'key-b'
+        pool.release(key)
+    clock.now += key_pool.KEY_BACKOFF_BASE
+    assert pool.acquire(deadline=clock.now).key == 'key-a'
+
+
+def test_backoff_doubles_until_a_success(clock):
+    pool = KeyPool([('key-a', None)])
+    key = pool.keys[0]
+    for expected in (1.0, 2.0, 4.0):
+        key.in_flight += 1
+        pool.release(key, throttled=True)
+        assert key.cooldown_until == pytest.approx(clock.now + expected * key_pool.KEY_BACKOFF_BASE)
+        clock.now = key.cooldown_until
+    key.in_flight += 1
+    pool.release(key, throttled=True, retry_after=7)
+    assert key.cooldown_until == clock.now + 7
+    key.in_flight += 1
+    pool.release(key)
+    assert key.strikes == 0
+
+
+def test_rejected_key_is_dropped_but_not_the_last():
+    pool = KeyPool([('key-a', None), ('key-b', None)])
+    key = pool.acquire()
+    assert pool.disable(key)
+    assert len(pool) == 1
+    other = pool.acquire()
+    assert other is not key
+    assert not pool.disable(other)
+    assert len(pool) == 1
+
+
+def test_split_and_pickle_keep_the_configuration():
+    pool = KeyPool([('key-a', 60), ('key-b', None)])
+    pool.disable(pool.acquire())
+    share = pool.split(4)
+    assert [(key.key, key.rpm) for key in share.keys] == [(key.key, key.rpm and key.rpm / 4) for key in pool.keys
+                                                          if not key.disabled]
+    copy = pickle.loads(pickle.dumps(pool))
+    assert [(key.key, key.rpm, key.requests) for key in copy.keys] == [
+        (key.key, key.rpm, 0) for key in pool.keys if not key.disabled]
+
+
+def test_parse_key_line():
+    assert parse_key_line('key-a') == ('key-a', None)
+    assert parse_key_line('key-a 30') == ('key-a', 30.0)
+    for line in ('key-a 0', 'key-a many', 'key-a 30 extra'):
+        with pytest.raises(ValueError):
+            parse_key_line(line)
+
+
+def load(tmp_path, text):
+    path = tmp_path / '.env'
+    path.write_text(text, encoding='utf-8')
+    pool = load_key_pool(str(path))
+    return pool and [(key.key, key.rpm) for key in pool.keys]
+
+
+def test_last_line_wins_without_a_keys_line(tmp_path):
+    assert load(tmp_path, "old-key\n# comment\n\nnew-key\n") == [('new-key', None)]
+
+
+def test_keys_line_lists_the_pool(tmp_path):
+    text = "# comment\nGEMINI_API_KEYS=key-a 60, key-b,key-c 30\nGEMINI_API_KEYS=key-d\nplain-key\n"
+    assert load(tmp_path, text) == [('key-a', 60.0), ('key-b', None), ('key-c', 30.0), ('key-d', None)]
+
+
+def test_bad_keys_are_skipped(tmp_path):
+    assert load(tmp_path, "GEMINI_API_KEYS=key-a x, key-b\n") == [('key-b', None)]
+    assert load(tmp_path, "# nothing here\n") is None
+    assert load_key_pool(str(tmp_path / 'missing')) is None
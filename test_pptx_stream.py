@@ -0,0 +1,112 @@
+import io
+import random
+import zipfile
+
+import pytest
+from PIL import Image
+from pptx import Presentation
+from pptx.util import Inches
+
+from pptx_stream import StreamingPptxWriter, merge_presentations
+
+
+def make_png(color):
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 36), color).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+IMAGES = [make_png('red'), make_png('blue')]
+
+
+def add_slide(prs, title, image=None):
+    slide = prs.slides.add_slide(prs.slide_layouts[6])
+    slide.shapes.add_textbox(Inches(0.5), Inches(0.3), Inches(8), Inches(1)).text_frame.text = title
+    if image is not None:
+        slide.shapes.add_picture(io.BytesIO(image), Inches(1), Inches(2), width=Inches(4))
+    slide.notes_slide.notes_text_frame.text = f"Notes for {title}"
+    return slide
+
+
+def titles(path):
+    return [slide.shapes[0].text_frame.text for slide in Presentation(path).slides]
+
+
+def check_package(path):
+    with zipfile.ZipFile(path) as deck:
+        assert deck.testzip() is None
+        names = deck.namelist()
+    assert len(names) == len(set(names))
+    return names
+
+
+def test_streamed_deck_reopens_with_every_slide(tmp_path):
+    path = tmp_path / 'deck.pptx'
+    prs = Presentation()
+    with StreamingPptxWriter(prs, str(path)) as writer:
+        for i in range(6):
+            slide = add_slide(prs, f"Slide {i+1}", IMAGES[i % 2] if i != 3 else None)
+            writer.write_slide(slide, i)
+        assert len(prs.slides) == 0
+
+    names = check_package(path)
+    # The two distinct images are stored once each, uncompressed
+    assert sorted(name for name in names if name.startswith('ppt/media/')) == [
+        'ppt/media/image1.png', 'ppt/media/image2.png']
+    with zipfile.ZipFile(path) as deck:
+        assert deck.getinfo('ppt/media/image1.png').compress_type == zipfile.ZIP_STORED
+    reopened = Presentation(str(path))
+    assert titles(path) == [f"Slide {i+1}" for i in range(6)]
+    assert [slide.notes_slide.notes_text_frame.text for slide in reopened.slides] == [
+        f"Notes for Slide {i+1}" for i in range(6)]
+    blobs = [shape.image.blob for slide in reopened.slides for shape in slide.shapes if shape.shape_type == 13]
+    assert blobs == [IMAGES[i % 2] for i in range(6) if i != 3]
+
+
+def test_slides_may_be_written_in_any_order(tmp_path):
+    path = tmp_path / 'deck.pptx'
+    prs = Presentation()
+    slides = [add_slide(prs, f"Slide {i+1}", IMAGES[0]) for i in range(5)]
+    order = list(range(5))
+    random.Random(3).shuffle(order)
+    with StreamingPptxWriter(prs, str(path)) as writer:
+        for index in order:
+            writer.write_slide(slides[index], index)
+    check_package(path)
+    assert titles(path) == [f"Slide {i+1}" for i in range(5)]
+
+
+def test_unwritten_slides_are_an_error(tmp_path):
+    prs = Presentation()
+    writer = StreamingPptxWriter(prs, str(tmp_path / 'deck.pptx'))
+    writer.write_slide(add_slide(prs, "Written"), 0)
+    add_slide(prs, "Forgotten")
+    with pytest.raises(ValueError):
+        writer.close()
+    writer.abort()
+
+
+def test_failed_build_leaves_no_file(tmp_path):
+    path = tmp_path / 'deck.pptx'
+    prs = Presentation()
+    with pytest.raises(RuntimeError):
+        with StreamingPptxWriter(prs, str(path)) as writer:
+            writer.write_slide(add_slide(prs, "Slide 1", IMAGES[0]), 0)
+            raise RuntimeError("build failed")
+    assert not path.exists()
+
+
+def test_merge_presentations(tmp_path):
+    paths = []
+    for part in range(3):
+        prs = Presentation()
+        for i in range(part + 1):
+            add_slide(prs, f"Part {part+1} slide {i+1}", IMAGES[(part + i) % 2])
+        paths.append(str(tmp_path / f"part{part}.pptx"))
+        prs.save(paths[-1])
+
+    output = str(tmp_path / 'merged.pptx')
+    assert merge_presentations(paths, output) == 6
+    names = check_package(output)
+    assert len([name for name in names if name.startswith('ppt/media/')]) == 2
+    assert titles(output) == [title for path in paths for title in titles(path)]
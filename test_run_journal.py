@@ -0,0 +1,111 @@
+import json
+import os
+import threading
+
+import pytest
+
+import generate_ppt_with_images_rest as generator
+from run_journal import JOURNAL_VERSION, RunJournal, atomic_write, journal_path
+
+
+def test_checkpoints_survive_a_restart(tmp_path):
+    base = str(tmp_path / 'deck')
+    journal = RunJournal(base)
+    journal.record(0, 'key-0', True)
+    journal.record(1, 'key-1', False)
+    journal.record(2, 'key-2', True)
+    journal.close()
+
+    resumed = RunJournal(base, resume=True)
+    assert resumed.has_image(0, 'key-0')
+    # A slide whose image failed, or whose prompt or parameters changed, is not trusted
+    assert not resumed.has_image(1, 'key-1')
+    assert not resumed.has_image(2, 'key-changed')
+    assert not resumed.has_image(3, 'key-3')
+    resumed.record(3, 'key-3', True)
+    resumed.finish('deck_1.pptx')
+    resumed.close()
+
+    with open(journal_path(base), encoding='utf-8') as f:
+        lines = [json.loads(line) for line in f]
+    assert lines[0]['version'] == JOURNAL_VERSION
+    assert [line['slide'] for line in lines if 'slide' in line] == [0, 1, 2, 3]
+    assert lines[-1]['output_file'] == 'deck_1.pptx'
+
+
+def test_without_resume_the_journal_starts_over(tmp_path):
+    base = str(tmp_path / 'deck')
+    journal = RunJournal(base)
+    journal.record(0, 'key-0', True)
+    journal.close()
+    RunJournal(base).close()
+    assert not RunJournal(base, resume=True).has_image(0, 'key-0')
+
+
+def test_cut_off_last_line_and_other_versions(tmp_path):
+    base = str(tmp_path / 'deck')
+    header = json.dumps({"version": JOURNAL_VERSION})
+    entry = json.dumps({"slide": 0, "image_key": "key-0", "stored": True})
+    with open(journal_path(base), 'w', encoding='utf-8') as f:
+        f.write(f'{header}\n{entry}\n{{"slide": 1, "ima')
+    journal = RunJournal(base, resume=True)
+    assert journal.has_image(0, 'key-0')
+    assert 1 not in journal.entries
+    journal.close()
+
+    with open(journal_path(base), 'w', encoding='utf-8') as f:
+        f.write(json.dumps({"version": 1}) + '\n' + entry + '\n')
+    assert not RunJournal(base, resume=True).entries
+
+
+def test_atomic_write_leaves_no_temporary_file(tmp_path):
+    path = tmp_path / 'image.png'
+    atomic_write(str(path), b'first')
+    atomic_write(str(path), memoryview(b'second'))
+    assert path.read_bytes() == b'second'
+    assert os.listdir(tmp_path) == ['image.png']
+
+
+class Interrupted(BaseException):
+    pass
+
+
+def build(slides, **options):
+    return generator.create_presentation(slides=slides, output_file_base='deck', api_key='stub-key', use_cache=False,
+                                         max_workers=1, **options)
+
+
+def wait_for_abandoned_requests():
+    """An interrupted build does not wait for the request it already sent"""
+    for thread in threading.enumerate():
+        if thread.name.startswith('ThreadPoolExecutor'):
+            thread.join(timeout=5)
+
+
+def image_requests(stub):
+    count = sum(1 for r in stub.stats.snapshot() if r['method'] == 'predict')
+    stub.stats.reset()
+    return count
+
+
+def test_resume_skips_checkpointed_images(stub):
+    slides = [{"title": f"Slide {i}", "image_prompt": f"picture {i}"} for i in range(5)]
+
+    def interrupt(done, total):
+        if done == 2:
+            raise Interrupted()
+
+    with pytest.raises(Interrupted):
+        build(slides, progress=interrupt)
+    wait_for_abandoned_requests()
+    image_requests(stub)
+    journal = RunJournal('deck', resume=True)
+    assert sorted(slide for slide, entry in journal.entries.items() if entry['stored']) == [0, 1]
+    journal.close()
+
+    slides[4] = dict(slides[4], image_prompt="another picture")
+    output_file = build(slides, resume=True)
+    # Slides 0 and 1 come from the asset store; the rest are generated
+    assert image_requests(stub) == 3
+    assert output_file and os.path.exists(output_file)
+    assert build(slides, resume=True) and image_requests(stub) == 0
@@ -0,0 +1,86 @@
+import io
+import json
+
+import pytest
+
+import slide_source
+from slide_source import _Reader, iter_json_slides, iter_slides
+
+SLIDES = [
+    {"title": f"Slide {i}", "content": ["a", "b \"q\" ]}"], "image_prompt": "p" * (i % 7), "n": i * 1234.5e-3,
+     "flags": [True, False, None], "big": 10 ** 12 + i}
+    for i in range(40)
+]
+
+
+def parse(text, read_size, monkeypatch):
+    monkeypatch.setattr(slide_source, 'READ_SIZE', read_size)
+    return list(iter_json_slides(io.StringIO(text)))
+
+
+@pytest.mark.parametrize('read_size', list(range(1, 18)) + [64, 64 * 1024])
+def test_matches_json_load_for_any_read_size(read_size, monkeypatch):
+    # Small reads cut numbers, literals, strings and escapes at every possible point
+    for text in (json.dumps(SLIDES), json.dumps({"title": "Deck", "slides": SLIDES, "after": 1}, indent=2)):
+        assert parse(text, read_size, monkeypatch) == SLIDES
+
+
+@pytest.mark.parametrize('text', ['[]', ' [ ] ', '{"slides": []}', '[true, null, false]',
+                                  '{"meta": {"slides": 1}, "slides": [7, 1e3, -0.5, 12.25E-2, 10]}'])
+def test_small_documents(text, monkeypatch):
+    expected = json.loads(text)
+    expected = expected['slides'] if isinstance(expected, dict) else expected
+    for read_size in (1, 3, 64):
+        assert parse(text, read_size, monkeypatch) == expected
+
+
+@pytest.mark.parametrize('text', ['{}', '{"deck": [1, 2]}', ' { "a": 1 , "b": {"slides": []} } '])
+def test_missing_slides_key(text, monkeypatch):
+    with pytest.raises(ValueError, match='no "slides" key'):
+        parse(text, 4, monkeypatch)
+
+
+@pytest.mark.parametrize('text', ['', '"slides"', '[1, 2', '[1 2]', '{"slides" [1]}', '[{"title": "x"'])
+def test_malformed_input(text, monkeypatch):
+    with pytest.raises(ValueError):
+        parse(text, 4, monkeypatch)
+
+
+def test_buffer_is_trimmed_behind_the_parse_position(monkeypatch):
+    read_size = 32
+    sizes = []
+    fill = _Reader.fill
+
+    def recording_fill(self):
+        result = fill(self)
+        sizes.append(len(self.buffer))
+        return result
+
+    monkeypatch.setattr(_Reader, 'fill', recording_fill)
+    slides = SLIDES * 20
+    text = json.dumps(slides)
+    assert parse(text, read_size, monkeypatch) == slides
+    longest = max(len(json.dumps(slide)) for slide in slides)
+    assert max(sizes) <= 2 * read_size + longest + 2
+
+
+def test_slides_arrive_before_the_input_is_read(monkeypatch):
+    monkeypatch.setattr(slide_source, 'READ_SIZE', 64)
+    stream = io.StringIO(json.dumps({"slides": SLIDES}) + " trailing garbage is never parsed")
+    slides = iter_json_slides(stream)
+    assert next(slides) == SLIDES[0]
+    assert stream.tell() < len(stream.getvalue()) // 4
+    assert list(slides) == SLIDES[1:]
+
+
+def test_iter_slides_reads_json_and_jsonl_files(tmp_path):
+    json_file = tmp_path / 'slides.json'
+    json_file.write_text(json.dumps({"slides": SLIDES[:3]}), encoding='utf-8')
+    jsonl_file = tmp_path / 'slides.jsonl'
+    jsonl_file.write_text('\n'.join(json.dumps(slide) for slide in SLIDES[:3]) + '\n\n', encoding='utf-8')
+    assert list(iter_slides(str(json_file))) == SLIDES[:3]
+    assert list(iter_slides(str(jsonl_file))) == SLIDES[:3]
+
+    jsonl_file.write_text(json.dumps(SLIDES[0]) + '\n{"title": \n', encoding='utf-8')
+    with pytest.raises(ValueError, match='line 2'):
+        list(iter_slides(str(jsonl_file)))
@@ -0,0 +1,69 @@
+import math
+
+import pytest
+from pptx.util import Emu
+
+import text_fit
+from text_fit import CONTENT_BOX, TITLE_BOX, fit_deck, fit_font_sizes, paragraph_widths
+
+
+def reference_size(paragraphs, box):
+    """The fitting rule, one size and one paragraph at a time"""
+    widths = paragraph_widths(paragraphs, box.bold)
+    line_width = Emu(box.width - text_fit.INSET_X).pt * text_fit.WRAP_FILL
+    for size in range(box.max_size, box.min_size - 1, -1):
+        lines = sum(max(1, math.ceil(width * size / line_width)) for width in widths)
+        if lines * size * text_fit.LINE_SPACING <= Emu(box.height - text_fit.INSET_Y).pt:
+            return size
+    return box.min_size
+
+
+def test_glyph_widths():
+    assert paragraph_widths(['A']) == pytest.approx([1185 / 2048])
+    assert paragraph_widths(['A'], bold=True) == pytest.approx([1185 / 2048 * text_fit.BOLD_FACTOR])
+    # Hangul and CJK are one em wide, astral characters (emoji) too, whatever the weight
+    assert paragraph_widths(['한글', '漢字', '🎯'], bold=True) == pytest.approx([2.0, 2.0, 1.0])
+    assert paragraph_widths(['é✅']) == pytest.approx([2 * text_fit.DEFAULT_WIDTH])
+    assert paragraph_widths(['', 'ab', '', '']) == pytest.approx([0.0, (981 + 1076) / 2048, 0.0, 0.0])
+
+
+def test_short_text_keeps_the_largest_size():
+    assert fit_deck([{"title": "Intro", "content": ["One point"]}]) == [(TITLE_BOX.max_size, CONTENT_BOX.max_size)]
+
+
+def test_longer_text_shrinks():
+    sizes = [fit_font_sizes([["word " * words]], CONTENT_BOX)[0] for words in range(0, 400, 20)]
+    assert sizes == sorted(sizes, reverse=True)
+    assert sizes[0] == CONTENT_BOX.max_size
+    assert any(CONTENT_BOX.min_size < size < CONTENT_BOX.max_size for size in sizes)
+
+
+def test_size_never_drops_below_the_minimum():
+    assert fit_font_sizes([["x" * 100000], [""] * 500], CONTENT_BOX).tolist() == [CONTENT_BOX.min_size] * 2
+    assert fit_deck([{"title": "T" * 2000}])[0][0] == TITLE_BOX.min_size
+
+
+def test_empty_paragraphs_take_a_line():
+    few, many = fit_font_sizes([["a", "", "b"], ["a"] + [""] * 20 + ["b"]], CONTENT_BOX)
+    assert few == CONTENT_BOX.max_size
+    assert many < few
+
+
+def test_list_and_string_content_fit_alike():
+    items = ["Market share grew in every region we track"] * 20
+    as_list = fit_deck([{"title": "T", "content": items}])
+    as_string = fit_deck([{"title": "T", "content": '\n'.join(f"• {item}" for item in items)}])
+    assert as_list == as_string
+    assert as_list[0][1] < CONTENT_BOX.max_size
+
+
+def test_matches_the_rule_for_every_text():
+    texts = [["Lorem ipsum dolor sit amet " * n] + ["•  item"] * (n % 7) + ["슬라이드 내용 " * (n % 5)]
+             for n in range(60)]
+    assert fit_font_sizes(texts, CONTENT_BOX).tolist() == [reference_size(text, CONTENT_BOX) for text in texts]
+    titles = [["Quarterly results " * (n % 9)] * (1 + n % 2) for n in range(30)]
+    assert fit_font_sizes(titles, TITLE_BOX).tolist() == [reference_size(title, TITLE_BOX) for title in titles]
+
+
+def test_empty_deck():
+    assert fit_deck([]) == []
@@ -0,0 +1,110 @@
+import functools
+from collections import namedtuple
+
+import numpy as np
+from pptx.util import Emu, Inches
+
+# Advance widths of printable ASCII (0x20-0x7E) in Calibri, the default theme font, in 1/2048 em
+CALIBRI_ASCII = [
+    463, 544, 667, 1018, 1040, 1463, 1386, 361, 619, 619, 1018, 1018, 511, 627, 517, 791,
+    1038, 1038, 1038, 1038, 1038, 1038, 1038, 1038, 1038, 1038, 548, 548, 1018, 1018, 1018, 941,
+    1835, 1185, 1114, 1092, 1260, 1000, 941, 1292, 1276, 516, 653, 1064, 861, 1751, 1322, 1356,
+    1058, 1378, 1112, 941, 998, 1314, 1162, 1822, 1063, 998, 959, 628, 791, 628, 1018, 1018,
+    586, 981, 1076, 866, 1076, 1019, 625, 964, 1076, 470, 490, 931, 470, 1636, 1076, 1080,
+    1076, 1076, 714, 801, 686, 1076, 925, 1464, 887, 927, 809, 639, 948, 639, 1018,
+]
+# Hangul, kana, CJK ideographs and fullwidth forms are drawn one em wide by the East Asian
+# theme font (Malgun Gothic for Korean)
+FULL_WIDTH_RANGES = [
+    (0x1100, 0x11FF), (0x2E80, 0x303F), (0x3040, 0x30FF), (0x3130, 0x318F), (0x3200, 0x9FFF),
+    (0xAC00, 0xD7AF), (0xF900, 0xFAFF), (0xFE30, 0xFE4F), (0xFF01, 0xFF60), (0xFFE0, 0xFFE6),
+]
+HALF_WIDTH_RANGE = (0xFF61, 0xFFDC)
+BULLET_WIDTH = 733 / 2048
+# Other Latin, Greek and Cyrillic letters, roughly the average Calibri lowercase width
+DEFAULT_WIDTH = 0.5
+# Anything beyond the BMP is mostly emoji and rare ideographs
+ASTRAL_WIDTH = 1.0
+BOLD_FACTOR = 1.05
+
+LINE_SPACING = 1.2
+# Word wrap leaves the end of most lines empty, so a line holds less than its full width
+WRAP_FILL = 0.9
+# Default text box insets (0.1" left and right, 0.05" top and bottom)
+INSET_X = Inches(0.2)
+INSET_Y = Inches(0.1)
+
+TextBox = namedtuple('TextBox', 'width height max_size min_size bold')
+
+TITLE_BOX = TextBox(Inches(12), Inches(1.0), max_size=40, min_size=20, bold=True)
+CONTENT_BOX = TextBox(Inches(6.0), Inches(5.0), max_size=20, min_size=12, bold=False)
+
+
+@functools.lru_cache(maxsize=None)
+def glyph_widths(bold=False):
+    """Return the advance width in em of every BMP code point, built once per weight"""
+    widths = np.full(0x10000, DEFAULT_WIDTH, dtype=np.float32)
+    widths[:0x20] = 0.0
+    widths[0x20:0x7F] = np.array(CALIBRI_ASCII, dtype=np.float32) / 2048
+    widths[0x2022] = BULLET_WIDTH
+    if bold:
+        widths *= BOLD_FACTOR
+    for first, last in FULL_WIDTH_RANGES:
+        widths[first:last + 1] = 1.0
+    widths[HALF_WIDTH_RANGE[0]:HALF_WIDTH_RANGE[1] + 1] = 0.5
+    widths.setflags(write=False)
+    return widths
+
+
+def paragraph_widths(paragraphs, bold=False):
+    """Width in em of each string, measured in one pass over all of their characters"""
+    lengths = np.fromiter((len(p) for p in paragraphs), dtype=np.int64, count=len(paragraphs))
+    codes = np.frombuffer(''.join(paragraphs).encode('utf-32-le'), dtype=np.uint32)
+    table = glyph_widths(bold)
+    char_widths = np.where(codes < 0x10000, table[np.minimum(codes, 0xFFFF)], ASTRAL_WIDTH)
+    # Cumulative sums rather than reduceat, which mishandles empty paragraphs
+    ends = np.cumsum(lengths)
+    totals = np.concatenate(([0.0], np.cumsum(char_widths, dtype=np.float64)))
+    return totals[ends] - totals[ends - lengths]
+
+
+def fit_font_sizes(texts, box):
+    """Largest whole point size (down to box.min_size) at which each text fits box
+
+    texts holds one list of paragraphs per text box. Wrapped lines are estimated from the
+    total width of each paragraph, for every candidate size at once.
+    """
+    if not texts:
+        return np.zeros(0, dtype=np.int64)
+    counts = np.fromiter((len(paragraphs) for paragraphs in texts), dtype=np.int64, count=len(texts))
+    widths = paragraph_widths([p for paragraphs in texts for p in paragraphs], box.bold)
+
+    sizes = np.arange(box.max_size, box.min_size - 1, -1, dtype=np.float64)
+    line_width = Emu(box.width - INSET_X).pt * WRAP_FILL
+    # An empty paragraph still takes a line
+    lines = np.maximum(1.0, np.ceil(np.outer(widths, sizes) / line_width))
+    ends = np.cumsum(counts)
+    cumulative = np.vstack((np.zeros((1, len(sizes))), np.cumsum(lines, axis=0)))
+    box_lines = cumulative[ends] - cumulative[ends - counts]
+
+    fits = box_lines * sizes * LINE_SPACING <= Emu(box.height - INSET_Y).pt
+    # The first size that fits, or the smallest if none does
+    first = np.where(fits.any(axis=1), fits.argmax(axis=1), len(sizes) - 1)
+    return sizes[first].astype(np.int64)
+
+
+def slide_texts(slide_data):
+    """Return the title and content paragraphs exactly as the generators lay them out"""
+    content = slide_data.get('content', '')
+    if isinstance(content, list):
+        content = '\n'.join(f"• {item}" for item in content)
+    title = slide_data.get('title', 'No Title')
+    return title.split('\n'), content.split('\n')
+
+
+def fit_deck(slides):
+    """Return a (title size, content size) pair in points for every slide"""
+    titles, contents = zip(*(slide_texts(slide_data) for slide_data in slides)) if slides else ((), ())
+    title_sizes = fit_font_sizes(list(titles), TITLE_BOX)
+    content_sizes = fit_font_sizes(list(contents), CONTENT_BOX)
+    return list(zip(title_sizes.tolist(), content_sizes.tolist()))
@@ -0,0 +1,149 @@
+import json
+import os
+import threading
+import time
+
+# The active tracer, or None when tracing is off. Every helper checks it first, so
+# instrumented code pays one global lookup per span when nobody is tracing.
+_tracer = None
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **args):
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Span:
+    __slots__ = ('tracer', 'name', 'args', 'start')
+
+    def __init__(self, tracer, name, args):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.args['error'] = exc_type.__name__
+        self.tracer.add(self.name, self.start, time.perf_counter_ns(), self.args)
+        return False
+
+    def set(self, **args):
+        """Attach more arguments (e.g. byte counts known only at the end) to the span"""
+        self.args.update(args)
+
+
+class Tracer:
+    """Collects complete spans from any thread and exports them"""
+
+    def __init__(self):
+        self.origin = time.perf_counter_ns()
+        self.events = []
+        self.thread_names = {}
+
+    def add(self, name, start_ns, end_ns, args):
+        tid = threading.get_native_id()
+        if tid not in self.thread_names:
+            self.thread_names[tid] = threading.current_thread().name
+        # list.append is atomic, so worker threads need no lock
+        self.events.append((name, tid, start_ns, end_ns, args))
+
+    def write_chrome_trace(self, path):
+        """Write the spans as Chrome trace event JSON (chrome://tracing, ui.perfetto.dev)"""
+        pid = os.getpid()
+        trace_events = [
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+            for tid, name in self.thread_names.items()
+        ]
+        for name, tid, start_ns, end_ns, args in self.events:
+            trace_events.append({
+                "name": name, "cat": name.split('.')[0], "ph": "X", "pid": pid, "tid": tid,
+                "ts": (start_ns - self.origin) / 1000, "dur": (end_ns - start_ns) / 1000, "args": args,
+            })
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"traceEvents": trace_events, "displayTimeUnit": "ms"}, f)
+
+    def summary(self):
+        """Per-span-name rows of count, total/p50/p95/max milliseconds and total bytes, by total time"""
+        groups = {}
+        for name, _, start_ns, end_ns, args in self.events:
+            durations, byte_counts = groups.setdefault(name, ([], []))
+            durations.append((end_ns - start_ns) / 1e6)
+            if 'bytes' in args:
+                byte_counts.append(args['bytes'])
+        rows = []
+        for name, (durations, byte_counts) in groups.items():
+            durations.sort()
+
+            def percentile(p):
+                return durations[min(len(durations) - 1, int(p * len(durations)))]
+
+            rows.append({
+                "name": name, "count": len(durations), "total_ms": sum(durations),
+                "p50_ms": percentile(0.5), "p95_ms": percentile(0.95), "max_ms": durations[-1],
+                "bytes": sum(byte_counts) if byte_counts else None,
+            })
+        rows.sort(key=lambda row: row['total_ms'], reverse=True)
+        return rows
+
+    def print_summary(self):
+        if not self.events:
+            return
+        wall_ms = (max(event[3] for event in self.events) - self.origin) / 1e6
+        print(f"\n⏱️  Trace: {len(self.events)} spans over {wall_ms:.0f} ms (span totals overlap across threads)")
+        print(f"  {'Span':<22} {'Count':>6} {'Total ms':>10} {'p50 ms':>8} {'p95 ms':>8} {'Max ms':>8} {'MiB':>8}")
+        for row in self.summary():
+            mib = f"{row['bytes'] / (1024 * 1024):.1f}" if row['bytes'] is not None else '-'
+            print(f"  {row['name']:<22} {row['count']:>6} {row['total_ms']:>10.1f} {row['p50_ms']:>8.2f} "
+                  f"{row['p95_ms']:>8.2f} {row['max_ms']:>8.2f} {mib:>8}")
+
+
+def start():
+    """Turn tracing on for the whole process and return the new tracer"""
+    global _tracer
+    _tracer = Tracer()
+    return _tracer
+
+
+def stop():
+    """Turn tracing off and return the tracer that was active, if any"""
+    global _tracer
+    tracer, _tracer = _tracer, None
+    return tracer
+
+
+def enabled():
+    return _tracer is not None
+
+
+def span(name, **args):
+    """Context manager timing the enclosed block; args (slide, bytes, ...) go into the trace"""
+    tracer = _tracer
+    if tracer is None:
+        return NULL_SPAN
+    return Span(tracer, name, args)
+
+
+def queued(fn, name='image.queue', **args):
+    """Wrap fn for executor.submit so the time it waits for a worker is recorded as a span"""
+    tracer = _tracer
+    if tracer is None:
+        return fn
+    queued_at = time.perf_counter_ns()
+
+    def run(*fn_args, **fn_kwargs):
+        tracer.add(name, queued_at, time.perf_counter_ns(), args)
+        return fn(*fn_args, **fn_kwargs)
+    return run